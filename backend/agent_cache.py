@@ -0,0 +1,53 @@
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Callable
+
+try:
+    from .disk_cache import DiskBackedCache
+except ImportError:
+    from disk_cache import DiskBackedCache
+
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parent / "data" / "agent_cache"
+
+
+class AgentCache(DiskBackedCache):
+    """
+    Content-addressed cache for agent outputs.
+
+    Keys are hashes of the model plus the fully rendered prompts, so any change to
+    an agent's instructions, the user's idea or the shared context is a miss.
+    Entries expire `ttl_seconds` after they were written, in memory and on disk.
+    """
+
+    label = "agent cache"
+
+    def __init__(
+        self,
+        directory: Path = DEFAULT_CACHE_DIR,
+        max_entries: int = 512,
+        max_disk_bytes: int = 100 * 1024 * 1024,
+        ttl_seconds: float = 24 * 3600,
+        enabled: bool = True,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        super().__init__(
+            directory, max_entries, max_disk_bytes, ttl_seconds=ttl_seconds, enabled=enabled, clock=clock
+        )
+
+    @staticmethod
+    def make_key(model: str, system_prompt: str, user_prompt: str) -> str:
+        payload = json.dumps([model, system_prompt, user_prompt], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+agent_cache = AgentCache(
+    max_entries=int(os.getenv("AGENT_CACHE_MAX_ENTRIES", "512")),
+    max_disk_bytes=int(float(os.getenv("AGENT_CACHE_MAX_DISK_MB", "100")) * 1024 * 1024),
+    ttl_seconds=float(os.getenv("AGENT_CACHE_TTL_SECONDS", str(24 * 3600))),
+    enabled=os.getenv("AGENT_CACHE_ENABLED", "1").lower() not in ("0", "false", "no"),
+)
+
+__all__ = ["AgentCache", "agent_cache"]
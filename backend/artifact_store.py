@@ -0,0 +1,249 @@
+import hashlib
+import json
+import logging
+import os
+import time
+import uuid
+from pathlib import Path
+from threading import Lock
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ARTIFACTS_DIR = Path(__file__).resolve().parent / "data" / "artifacts"
+
+
+class ArtifactStore:
+    """
+    Content-addressed store for generated archives.
+
+    Each blob is saved once under its SHA-256 (which doubles as the artifact id
+    and ETag) in `blobs/<id[:2]>/<id>.zip`. `index.json` maps every artifact to
+    its size, timestamps and the (user_id, project_id) references that produced
+    it, so identical archives generated for several projects share one file.
+    `gc()` drops artifacts older than `max_age_seconds` and then the least
+    recently used ones until the store fits in `max_bytes`; it runs whenever
+    the store goes over budget, and the app also calls it periodically. Archives that are
+    streamed rather than built in memory go through `spool()`, which hashes
+    them as they are written.
+    """
+
+    def __init__(
+        self,
+        directory: Path = DEFAULT_ARTIFACTS_DIR,
+        max_bytes: int = 2 * 1024 * 1024 * 1024,
+        max_age_seconds: float = 30 * 24 * 3600,
+    ) -> None:
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self._lock = Lock()
+        self._index: Optional[Dict[str, Dict[str, Any]]] = None
+
+    def put(
+        self,
+        data: bytes,
+        user_id: Optional[str] = None,
+        project_id: Optional[str] = None,
+        filename: str = "web3-starter.zip",
+    ) -> Dict[str, Any]:
+        """Store `data` (if new) and record who it was generated for."""
+        artifact_id = hashlib.sha256(data).hexdigest()
+        path = self.path_for(artifact_id)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+            tmp_path.write_bytes(data)
+            os.replace(tmp_path, path)
+        return self._add_ref(artifact_id, len(data), user_id, project_id, filename)
+
+    def spool(self) -> "ArtifactSpool":
+        """Start writing an artifact piece by piece; `commit()` then stores it like `put()`."""
+        path = self.directory / "spool" / f"{uuid.uuid4().hex}.tmp"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return ArtifactSpool(self, path)
+
+    def put_file(
+        self,
+        source: Path,
+        artifact_id: str,
+        size: int,
+        user_id: Optional[str] = None,
+        project_id: Optional[str] = None,
+        filename: str = "web3-starter.zip",
+    ) -> Dict[str, Any]:
+        """Move `source` (whose SHA-256 is `artifact_id`) into the store, or drop it if already stored."""
+        path = self.path_for(artifact_id)
+        if path.exists():
+            self._unlink(source)
+        else:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(source, path)
+        return self._add_ref(artifact_id, size, user_id, project_id, filename)
+
+    def get(self, artifact_id: str, user_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """The artifact's record; with `user_id`, only if that user generated it."""
+        with self._lock:
+            record = self._load_index().get(artifact_id)
+            if record is None or not self.path_for(artifact_id).exists():
+                return None
+            if user_id is not None and not any(ref.get("user_id") == user_id for ref in record["refs"]):
+                return None
+            record["last_accessed"] = time.time()
+            return dict(record)
+
+    def list(self, user_id: Optional[str] = None, project_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Artifacts referenced by `user_id` (and `project_id`, if given), newest first."""
+        with self._lock:
+            records = [dict(r) for r in self._load_index().values()]
+        matches = []
+        for record in records:
+            for ref in record["refs"]:
+                if user_id is not None and ref.get("user_id") != user_id:
+                    continue
+                if project_id is not None and ref.get("project_id") != project_id:
+                    continue
+                matches.append(record)
+                break
+        return sorted(matches, key=lambda r: r["created_at"], reverse=True)
+
+    def path_for(self, artifact_id: str) -> Path:
+        return self.directory / "blobs" / artifact_id[:2] / f"{artifact_id}.zip"
+
+    def gc(self) -> Dict[str, int]:
+        """Remove expired artifacts, then least recently used ones over the size cap."""
+        now = time.time()
+        removed = 0
+        freed = 0
+        with self._lock:
+            index = self._load_index()
+            total = sum(r["size"] for r in index.values())
+            for record in sorted(index.values(), key=lambda r: r["last_accessed"]):
+                expired = record["created_at"] + self.max_age_seconds <= now
+                if not expired and total <= self.max_bytes:
+                    continue
+                del index[record["id"]]
+                self._unlink(self.path_for(record["id"]))
+                total -= record["size"]
+                freed += record["size"]
+                removed += 1
+            if removed:
+                self._write_index(index)
+        if removed:
+            logger.info("Artifact GC removed %d artifacts (%d bytes)", removed, freed)
+        return {"removed": removed, "freed_bytes": freed}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            index = self._load_index()
+            return {
+                "artifacts": len(index),
+                "bytes": sum(r["size"] for r in index.values()),
+                "max_bytes": self.max_bytes,
+            }
+
+    # ---------- internals ----------
+
+    def _add_ref(
+        self,
+        artifact_id: str,
+        size: int,
+        user_id: Optional[str],
+        project_id: Optional[str],
+        filename: str,
+    ) -> Dict[str, Any]:
+        now = time.time()
+        with self._lock:
+            index = self._load_index()
+            record = index.get(artifact_id)
+            if record is None:
+                record = index[artifact_id] = {
+                    "id": artifact_id,
+                    "size": size,
+                    "filename": filename,
+                    "created_at": now,
+                    "last_accessed": now,
+                    "refs": [],
+                }
+            record["last_accessed"] = now
+            ref = {"user_id": user_id, "project_id": project_id}
+            if (user_id or project_id) and not any(
+                r.get("user_id") == user_id and r.get("project_id") == project_id for r in record["refs"]
+            ):
+                record["refs"].append({**ref, "created_at": now})
+            self._write_index(index)
+            over_budget = sum(r["size"] for r in index.values()) > self.max_bytes
+            result = dict(record)
+        if over_budget:
+            self.gc()
+        return result
+
+    def _index_path(self) -> Path:
+        return self.directory / "index.json"
+
+    def _load_index(self) -> Dict[str, Dict[str, Any]]:
+        # Caller holds self._lock.
+        if self._index is None:
+            try:
+                with self._index_path().open("r", encoding="utf-8") as handle:
+                    self._index = json.load(handle).get("artifacts", {})
+            except FileNotFoundError:
+                self._index = {}
+            except (OSError, json.JSONDecodeError) as exc:
+                logger.warning("Ignoring unreadable artifact index: %s", exc)
+                self._index = {}
+        return self._index
+
+    def _write_index(self, index: Dict[str, Dict[str, Any]]) -> None:
+        # Caller holds self._lock.
+        path = self._index_path()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"index.json.{uuid.uuid4().hex}.tmp")
+        tmp_path.write_text(json.dumps({"artifacts": index}), encoding="utf-8")
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _unlink(path: Path) -> None:
+        try:
+            path.unlink()
+        except OSError:
+            pass
+
+
+class ArtifactSpool:
+    """An artifact being written in pieces, hashed as it goes."""
+
+    def __init__(self, store: ArtifactStore, path: Path) -> None:
+        self.store = store
+        self.path = path
+        self.size = 0
+        self._hash = hashlib.sha256()
+        self._file = path.open("wb")
+
+    def write(self, data: bytes) -> None:
+        self._file.write(data)
+        self._hash.update(data)
+        self.size += len(data)
+
+    def commit(
+        self,
+        user_id: Optional[str] = None,
+        project_id: Optional[str] = None,
+        filename: str = "web3-starter.zip",
+    ) -> Dict[str, Any]:
+        self._file.close()
+        return self.store.put_file(
+            self.path, self._hash.hexdigest(), self.size, user_id=user_id, project_id=project_id, filename=filename
+        )
+
+    def discard(self) -> None:
+        self._file.close()
+        ArtifactStore._unlink(self.path)
+
+
+artifact_store = ArtifactStore(
+    max_bytes=int(float(os.getenv("ARTIFACT_STORE_MAX_MB", "2048")) * 1024 * 1024),
+    max_age_seconds=float(os.getenv("ARTIFACT_STORE_MAX_AGE_DAYS", "30")) * 24 * 3600,
+)
+
+__all__ = ["ArtifactSpool", "ArtifactStore", "artifact_store"]
@@ -0,0 +1,83 @@
+import hashlib
+import json
+import os
+import re
+from pathlib import Path
+from typing import Any, Dict, Iterable, Union
+
+try:
+    from .disk_cache import DiskBackedCache
+except ImportError:
+    from disk_cache import DiskBackedCache
+
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parent / "data" / "compile_cache"
+
+# Comments, or string literals that have to be kept intact while skipping them.
+_COMMENT_OR_STRING_RE = re.compile(
+    r"""//[^\n]*|/\*.*?\*/|"(?:\\.|[^"\\\n])*"|'(?:\\.|[^'\\\n])*'""",
+    re.DOTALL,
+)
+
+
+def normalize_source(solidity_source: str) -> str:
+    """
+    Drop comments and indentation/blank lines so sources that differ only in
+    formatting share a cache entry. String literals are left untouched.
+    """
+
+    def _replace(match: "re.Match[str]") -> str:
+        token = match.group(0)
+        if token.startswith("//"):
+            return ""
+        if token.startswith("/*"):
+            # Keep line structure so the surrounding tokens stay separated.
+            return "\n" * token.count("\n") or " "
+        return token
+
+    stripped = _COMMENT_OR_STRING_RE.sub(_replace, solidity_source)
+    lines = (line.strip() for line in stripped.splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+class CompileCache(DiskBackedCache):
+    """
+    Cache of solc output keyed by (normalized source hash, solc version, output selection).
+
+    Compiling is deterministic, so entries never expire; disk hits refresh the
+    file's mtime so the size cap evicts least recently used output first.
+    Sources that differ only in comments or whitespace hit the same entry,
+    which means the returned bytecode carries the metadata hash of whichever
+    variant was compiled first; the executable code is identical.
+    """
+
+    label = "compile cache"
+
+    def __init__(
+        self,
+        directory: Path = DEFAULT_CACHE_DIR,
+        max_entries: int = 256,
+        max_disk_bytes: int = 200 * 1024 * 1024,
+        enabled: bool = True,
+    ) -> None:
+        super().__init__(directory, max_entries, max_disk_bytes, touch_on_read=True, enabled=enabled)
+
+    @staticmethod
+    def make_key(
+        sources: Union[str, Dict[str, str]], solc_version: Any, output_values: Iterable[str]
+    ) -> str:
+        """`sources` is one source, or {path: source} for a multi-file compile."""
+        if isinstance(sources, str):
+            normalized: Any = normalize_source(sources)
+        else:
+            normalized = sorted((path, normalize_source(source)) for path, source in sources.items())
+        payload = json.dumps([normalized, str(solc_version), sorted(output_values)], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+compile_cache = CompileCache(
+    max_entries=int(os.getenv("COMPILE_CACHE_MAX_ENTRIES", "256")),
+    max_disk_bytes=int(float(os.getenv("COMPILE_CACHE_MAX_DISK_MB", "200")) * 1024 * 1024),
+    enabled=os.getenv("COMPILE_CACHE_ENABLED", "1").lower() not in ("0", "false", "no"),
+)
+
+__all__ = ["CompileCache", "compile_cache", "normalize_source"]
@@ -1,68 +1,137 @@
+import asyncio
 import logging
 import os
 import re
-from typing import Dict
+from typing import Any, Dict, List, Optional, Tuple
 
+import rlp
 from eth_account import Account
-from solcx import compile_source, install_solc
+from solcx import compile_standard
 from web3 import Web3
+
+try:
+    from . import metrics
+except ImportError:
+    import metrics
+
+try:
+    from .compile_cache import compile_cache
+except ImportError:
+    from compile_cache import compile_cache
+
 try:
-    from web3.middleware import geth_poa_middleware as POA_MIDDLEWARE
-except ImportError:  # web3.py v7+
-    from web3.middleware.proof_of_authority import ExtraDataToPOAMiddleware as POA_MIDDLEWARE
+    from .deployment_registry import deployment_registry
+except ImportError:
+    from deployment_registry import deployment_registry
+
+try:
+    from .deployment_tracker import (
+        DEPLOYMENT_CONFIRMED,
+        DEPLOYMENT_PENDING,
+        deployment_tracker,
+    )
+except ImportError:
+    from deployment_tracker import (
+        DEPLOYMENT_CONFIRMED,
+        DEPLOYMENT_PENDING,
+        deployment_tracker,
+    )
+
+try:
+    from .nonce_manager import nonce_manager
+except ImportError:
+    from nonce_manager import nonce_manager
+
+try:
+    from .solc_manager import solc_manager
+except ImportError:
+    from solc_manager import solc_manager
+
+try:
+    from .web3_provider import ChainClient, provider_manager
+except ImportError:
+    from web3_provider import ChainClient, provider_manager
 
 logger = logging.getLogger(__name__)
 
-DEFAULT_SOLC_VERSION = "0.8.20"
 DEFAULT_NETWORK_NAME = os.getenv("CONTRACT_NETWORK_NAME", "Base Sepolia")
 DEFAULT_EXPLORER_TEMPLATE = os.getenv(
     "CONTRACT_EXPLORER_TEMPLATE",
     "https://sepolia.basescan.org/address/{address}",
 )
+# How long dependent contracts wait for the contracts they reference to be mined.
+DEPENDENCY_WAIT_SECONDS = float(os.getenv("DEPLOY_DEPENDENCY_WAIT_SECONDS", "180"))
+
+
+_CONTRACT_RE = re.compile(r"^\s*(?:abstract\s+)?contract\s+([A-Za-z_][A-Za-z0-9_]*)", re.MULTILINE)
 
 
 class DeploymentSkipped(RuntimeError):
     """Raised when deployment is skipped due to missing configuration."""
 
 
-def _detect_solc_version(solidity_source: str) -> str:
-    match = re.search(r"pragma\s+solidity\s+([^;]+);", solidity_source)
-    if not match:
-        return DEFAULT_SOLC_VERSION
+def _send_deployment(chain: ChainClient, account: Any, data: str) -> Tuple[str, int, str]:
+    """
+    Sign and broadcast the constructor transaction (init code plus encoded
+    arguments in `data`) without waiting for it to be mined. Returns the tx
+    hash, its nonce and the address the contract will be created at.
+    """
+    # Pending nonce, gas price, gas estimate (and chain id on first use) in one batch.
+    params = chain.deployment_params(account.address, data)
+    unsigned_txn = {
+        "from": account.address,
+        "gasPrice": params["gas_price"],
+        "gas": int(params["gas_estimate"] * 1.2),
+        "chainId": params["chain_id"],
+        "data": data,
+        "value": 0,
+    }
 
-    raw_version = match.group(1).strip()
-    cleaned = (
-        raw_version.replace("^", "")
-        .replace(">=", "")
-        .replace("<=", "")
-        .replace("~", "")
-        .strip()
-    )
+    # The nonce manager keeps concurrent deployments from this key on distinct nonces.
+    tx_hash, nonce = nonce_manager.send(chain, account, unsigned_txn, chain_nonce=params["nonce"])
+    return tx_hash, nonce, _create_address(account.address, nonce)
 
-    parts = cleaned.split()
-    version = parts[0] if parts else DEFAULT_SOLC_VERSION
-    return version if version.startswith("0.") else DEFAULT_SOLC_VERSION
 
+def _create_address(sender: str, nonce: int) -> str:
+    """CREATE address: keccak256(rlp([sender, nonce]))[12:]."""
+    encoded = rlp.encode([Web3.to_bytes(hexstr=sender), nonce])
+    return Web3.to_checksum_address(Web3.keccak(encoded)[12:])
 
-def _ensure_solc(version: str) -> None:
-    try:
-        install_solc(version)
-    except Exception as exc:  # pragma: no cover - best effort
-        logger.warning(
-            "Failed to install solc %s directly (%s). Using default %s.",
-            version,
-            exc,
-            DEFAULT_SOLC_VERSION,
-        )
-        install_solc(DEFAULT_SOLC_VERSION)
 
-
-def deploy_contract(solidity_source: str, contract_name: str) -> Dict[str, str]:
+def _compile(sources: Dict[str, str], label: str) -> Dict[str, Dict[str, Any]]:
     """
-    Compile and deploy the given Solidity contract to the network specified by RPC_URL.
-    Returns a dict with deployment metadata.
+    Compile every source in one solc invocation, reusing earlier output for the
+    same normalized sources and compiler. Returns {"<path>:<Contract>": {"abi", "bin"}}.
     """
+    # Resolved against already-installed compilers; downloads only if none fits.
+    version, solc_binary = solc_manager.resolve("\n".join(sources.values()))
+    output_values = ["abi", "evm.bytecode.object"]
+    cache_key = compile_cache.make_key(sources, version, output_values)
+    compiled = compile_cache.get(cache_key)
+    if compiled is not None:
+        logger.info("Using cached solc %s output for %s", version, label)
+        return compiled
 
+    logger.info("Compiling %s with solc %s", label, version)
+    with metrics.SOLC_COMPILE_SECONDS.time():
+        output = compile_standard(
+            {
+                "language": "Solidity",
+                "sources": {path: {"content": source} for path, source in sources.items()},
+                "settings": {"outputSelection": {"*": {"*": output_values}}},
+            },
+            solc_binary=solc_binary,
+        )
+    compiled = {
+        f"{path}:{name}": {"abi": artifact.get("abi", []), "bin": artifact["evm"]["bytecode"]["object"]}
+        for path, contracts in output.get("contracts", {}).items()
+        for name, artifact in contracts.items()
+    }
+    compile_cache.put(cache_key, compiled)
+    return compiled
+
+
+def _deployment_config() -> Tuple[str, str]:
     rpc_url = os.getenv("RPC_URL")
     private_key = os.getenv("PRIVATE_KEY")
 
@@ -70,15 +139,97 @@ def deploy_contract(solidity_source: str, contract_name: str) -> Dict[str, str]:
         raise DeploymentSkipped(
             "RPC_URL or PRIVATE_KEY not configured. Skipping on-chain deployment."
         )
+    return rpc_url, private_key
+
+
+def _submit(
+    rpc_url: str,
+    account: Any,
+    contract_name: str,
+    artifact: Dict[str, Any],
+    args: Optional[List[Any]] = None,
+    force_redeploy: bool = False,
+) -> Dict[str, Any]:
+    """
+    Broadcast one deployment and hand it to the tracker; returns its details.
+    With the deployment registry enabled, an identical earlier deployment
+    (same chain, bytecode and constructor arguments) is reused instead unless
+    `force_redeploy` is set.
+    """
+    chain = provider_manager.get(rpc_url)
+    bytecode = artifact["bin"]
+    data = chain.web3.eth.contract(abi=artifact["abi"], bytecode=bytecode).constructor(*(args or [])).data_in_transaction
 
-    version = _detect_solc_version(solidity_source)
-    _ensure_solc(version)
+    registry_key = None
+    if deployment_registry.enabled:
+        registry_key = deployment_registry.make_key(chain.chain_id, bytecode, data[2 + len(bytecode.removeprefix("0x")):])
+        if not force_redeploy:
+            existing = deployment_registry.lookup(registry_key, lambda entry: _still_deployed(chain, registry_key, entry))
+            if existing is not None:
+                logger.info("Reusing %s deployed at %s", contract_name, existing["address"])
+                record = deployment_tracker.get(existing["deployment_id"])
+                return {
+                    "address": existing["address"],
+                    "network": existing["network"],
+                    "explorer_url": existing["explorer_url"],
+                    "tx_hash": existing["tx_hash"],
+                    "status": record["status"] if record else DEPLOYMENT_CONFIRMED,
+                    "deployment_id": existing["deployment_id"],
+                    "reused": True,
+                }
 
-    compiled = compile_source(
-        solidity_source,
-        output_values=["abi", "bin"],
-        solc_version=version,
+    with metrics.CONTRACT_DEPLOY_SECONDS.time():
+        tx_hash, nonce, address = _send_deployment(chain, account, data)
+
+    # The receipt is awaited by the background tracker, not this request.
+    record = deployment_tracker.track(
+        rpc_url,
+        tx_hash,
+        address,
+        contract_name=contract_name,
+        network=DEFAULT_NETWORK_NAME,
+        sender=account.address,
+        nonce=nonce,
     )
+    logger.info("Submitted contract %s to %s at %s", contract_name, DEFAULT_NETWORK_NAME, address)
+    details = {
+        "address": address,
+        "network": DEFAULT_NETWORK_NAME,
+        "explorer_url": DEFAULT_EXPLORER_TEMPLATE.format(address=address),
+        "tx_hash": tx_hash,
+        "status": record["status"],
+        "deployment_id": record["deployment_id"],
+    }
+    if registry_key is not None:
+        deployment_registry.register(registry_key, {**details, "contract_name": contract_name})
+    return details
+
+
+def _still_deployed(chain: ChainClient, registry_key: str, entry: Dict[str, Any]) -> bool:
+    """Whether a registry entry still points at a live (or still pending) deployment."""
+    if entry.get("confirmed"):
+        return True
+    record = deployment_tracker.get(entry["deployment_id"])
+    if record is not None:
+        if record["status"] == DEPLOYMENT_CONFIRMED:
+            deployment_registry.mark_confirmed(registry_key)
+        return record["status"] in (DEPLOYMENT_PENDING, DEPLOYMENT_CONFIRMED)
+    # Not tracked by this process (e.g. after a restart): ask the chain.
+    (code,) = chain.batch([("eth_getCode", [entry["address"], "latest"])])
+    if code and code != "0x":
+        deployment_registry.mark_confirmed(registry_key)
+        return True
+    return False
+
+
+def deploy_contract(solidity_source: str, contract_name: str, force_redeploy: bool = False) -> Dict[str, str]:
+    """
+    Compile and deploy the given Solidity contract to the network specified by RPC_URL.
+    Returns as soon as the transaction is broadcast, with the predicted address
+    and a `deployment_id` whose confirmation `deployment_tracker` follows.
+    """
+    rpc_url, private_key = _deployment_config()
+    compiled = _compile({"<stdin>": solidity_source}, contract_name)
 
     contract_identifier = f"<stdin>:{contract_name}"
     if contract_identifier not in compiled:
@@ -96,59 +247,206 @@ def deploy_contract(solidity_source: str, contract_name: str) -> Dict[str, str]:
                 f"Contract '{contract_name}' not found in compiled artifacts."
             )
 
-    abi = compiled[contract_identifier]["abi"]
-    bytecode = compiled[contract_identifier]["bin"]
+    return _submit(
+        rpc_url, Account.from_key(private_key), contract_name, compiled[contract_identifier], force_redeploy=force_redeploy
+    )
 
-    web3 = Web3(Web3.HTTPProvider(rpc_url))
-    if not web3.is_connected():
-        raise RuntimeError("Failed to connect to RPC_URL endpoint.")
 
-    # Base Sepolia and many L2 testnets need the POA middleware
-    web3.middleware_onion.inject(POA_MIDDLEWARE, layer=0)
+async def deploy_contracts(sources: Dict[str, str], force_redeploy: bool = False) -> Dict[str, Any]:
+    """
+    Compile every contract file in one solc run and deploy one contract per
+    file, picked like scripts/deploy.js does (the contract named after the
+    file, else its first concrete contract).
 
+    Constructor arguments also follow the deploy script: address parameters
+    named after another generated contract get that contract's address, the
+    rest get placeholder values. Contracts that depend on no other contract are
+    submitted back to back on consecutive nonces. Dependents go out in later
+    waves, each only once the contracts it references are mined, because their
+    constructors may call those contracts (and gas estimation would revert
+    against an address with no code yet). Compiling and sending run in worker
+    threads; waiting for a wave's dependencies follows `deployment_tracker`
+    without holding a thread. Returns the first contract's details at the
+    top level (as `deploy_contract` does) plus a `contracts` entry per
+    deployment and the `skipped` ones with a reason; a dependency that reverts
+    or is never mined counts as skipped.
+    """
+    rpc_url, private_key = _deployment_config()
+    compiled = await asyncio.to_thread(_compile, sources, f"{len(sources)} contract files")
     account = Account.from_key(private_key)
-    contract = web3.eth.contract(abi=abi, bytecode=bytecode)
-
-    nonce = web3.eth.get_transaction_count(account.address)
-    gas_price = web3.eth.gas_price
-
-    unsigned_txn = contract.constructor().build_transaction(
-        {
-            "from": account.address,
-            "nonce": nonce,
-            "gasPrice": gas_price,
-            "chainId": web3.eth.chain_id,
-        }
-    )
-
-    estimated_gas = web3.eth.estimate_gas(unsigned_txn)
-    unsigned_txn["gas"] = int(estimated_gas * 1.2)
 
-    signed_txn = account.sign_transaction(unsigned_txn)
-    raw_tx = getattr(signed_txn, "rawTransaction", None) or getattr(
-        signed_txn, "raw_transaction", None
-    )
-    if raw_tx is None:
-        raise RuntimeError("Unable to access raw transaction bytes on SignedTransaction.")
+    specs = _deployable_contracts(sources, compiled)
+    names = [spec["name"] for spec in specs]
+    for spec in specs:
+        # Resolved once, so the wave order and the constructor arguments agree.
+        spec["references"] = _address_references(spec, names)
+        spec["depends_on"] = sorted(set(spec["references"].values()))
 
-    tx_hash = web3.eth.send_raw_transaction(raw_tx)
-    receipt = web3.eth.wait_for_transaction_receipt(tx_hash)
+    deployed: Dict[str, Dict[str, Any]] = {}
+    mined: List[str] = []
+    failed: List[str] = []
+    skipped: List[Dict[str, str]] = []
+    first_error: Optional[Exception] = None
+    remaining = list(specs)
+    while remaining:
+        # Drop contracts whose dependencies failed (transitively) before picking the next wave.
+        dropped = True
+        while dropped:
+            dropped = False
+            for spec in list(remaining):
+                blocked = [dep for dep in spec["depends_on"] if dep in failed]
+                if blocked:
+                    remaining.remove(spec)
+                    failed.append(spec["name"])
+                    skipped.append({
+                        "name": spec["name"],
+                        "path": spec["path"],
+                        "reason": f"Depends on {', '.join(blocked)}, which did not deploy",
+                    })
+                    dropped = True
+        ready = [s for s in remaining if all(dep in deployed for dep in s["depends_on"])]
+        if not ready:
+            for spec in remaining:
+                skipped.append({"name": spec["name"], "path": spec["path"], "reason": "Circular constructor dependency"})
+            break
+        unmined = sorted({dep for spec in ready for dep in spec["depends_on"] if dep not in mined})
+        if unmined:
+            errors = await _wait_until_mined([deployed[name] for name in unmined])
+            mined.extend(name for name in unmined if name not in errors)
+            for name, error in errors.items():
+                logger.error("Deployment of %s did not succeed: %s", name, error)
+                # No code at its address: keep it out of `contracts` and the generated config.
+                details = deployed.pop(name)
+                failed.append(name)
+                skipped.append({"name": name, "path": details["path"], "reason": error})
+                first_error = first_error or RuntimeError(f"Deployment of {name} did not succeed: {error}")
+            if errors:
+                # Re-plan: dependents of the failed contracts are dropped above.
+                continue
+        for spec in ready:
+            remaining.remove(spec)
+            try:
+                addresses = {index: deployed[ref]["address"] for index, ref in spec["references"].items()}
+                args = _constructor_args(spec["abi"], account.address, addresses)
+                details = await asyncio.to_thread(_submit, rpc_url, account, spec["name"], spec, args, force_redeploy)
+            except Exception as exc:
+                logger.error("Deployment of %s failed: %s", spec["name"], exc)
+                first_error = first_error or exc
+                skipped.append({"name": spec["name"], "path": spec["path"], "reason": str(exc)})
+                failed.append(spec["name"])
+                continue
+            deployed[spec["name"]] = {"name": spec["name"], "path": spec["path"], **details}
 
-    address = receipt.contractAddress
-    explorer_url = DEFAULT_EXPLORER_TEMPLATE.format(address=address)
+    if not deployed:
+        if first_error is not None:
+            raise first_error
+        raise RuntimeError("No deployable contract found in the generated sources.")
 
-    deployment_details = {
-        "address": Web3.to_checksum_address(address),
-        "network": DEFAULT_NETWORK_NAME,
-        "explorer_url": explorer_url,
-        "tx_hash": tx_hash.hex(),
+    # Report in file order, so the primary contract is the first generated file that deployed.
+    contracts = [deployed[spec["name"]] for spec in specs if spec["name"] in deployed]
+    result: Dict[str, Any] = {
+        **{k: v for k, v in contracts[0].items() if k not in ("name", "path")},
+        "contracts": contracts,
     }
+    if skipped:
+        result["skipped"] = skipped
+    return result
 
-    logger.info(
-        "Deployed contract %s to %s at %s",
-        contract_name,
-        deployment_details["network"],
-        deployment_details["address"],
-    )
 
-    return deployment_details
+async def _wait_until_mined(deployments: List[Dict[str, Any]]) -> Dict[str, str]:
+    """
+    Wait (through `deployment_tracker.watch()`) until every deployment in
+    `deployments` is mined. Returns {name: error} for those that reverted, were
+    replaced or were not mined within DEPENDENCY_WAIT_SECONDS; the others are
+    marked confirmed.
+    """
+
+    async def settled(details: Dict[str, Any]) -> Dict[str, Any]:
+        # Reused deployments the tracker no longer follows carry their own status.
+        record = details
+        async for record in deployment_tracker.watch(details["deployment_id"]):
+            pass
+        return record
+
+    waits = {asyncio.ensure_future(settled(details)): details for details in deployments}
+    done, pending = await asyncio.wait(waits, timeout=DEPENDENCY_WAIT_SECONDS)
+    errors: Dict[str, str] = {}
+    for task in pending:
+        task.cancel()
+        errors[waits[task]["name"]] = f"Not mined within {DEPENDENCY_WAIT_SECONDS:g}s"
+    for task in done:
+        details, record = waits[task], task.result()
+        if record["status"] == DEPLOYMENT_CONFIRMED:
+            details["status"] = DEPLOYMENT_CONFIRMED
+            if record["address"] != details["address"]:
+                details["address"] = record["address"]
+                details["explorer_url"] = DEFAULT_EXPLORER_TEMPLATE.format(address=record["address"])
+        else:
+            errors[details["name"]] = record.get("error") or record["status"]
+    return errors
+
+
+def _deployable_contracts(sources: Dict[str, str], compiled: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+    specs = []
+    for path, source in sources.items():
+        stem = path.rsplit("/", 1)[-1].rsplit(".", 1)[0]
+        concrete = [name for name in _CONTRACT_RE.findall(source) if _is_deployable(compiled.get(f"{path}:{name}"))]
+        if not concrete:
+            continue
+        name = stem if stem in concrete else concrete[0]
+        specs.append({"name": name, "path": path, **compiled[f"{path}:{name}"]})
+    return specs
+
+
+def _is_deployable(artifact: Optional[Dict[str, Any]]) -> bool:
+    # Abstract contracts have no bytecode; unlinked library references show up as __$...$__.
+    return bool(artifact and artifact.get("bin") and "__$" not in artifact["bin"])
+
+
+def _constructor_inputs(abi: List[Dict[str, Any]]) -> List[Tuple[str, str]]:
+    for entry in abi:
+        if entry.get("type") == "constructor":
+            return [(i.get("type", ""), i.get("name", "")) for i in entry.get("inputs", [])]
+    return []
+
+
+def _match_contract(param_name: str, names: List[str]) -> Optional[str]:
+    """Contract an address parameter refers to by name, as scripts/deploy.js resolves it."""
+    key = param_name.strip("_").lower()
+    if not key:
+        return None
+    return next((n for n in names if key in n.lower() or n.lower().endswith(key)), None)
+
+
+def _address_references(spec: Dict[str, Any], names: List[str]) -> Dict[int, str]:
+    """{constructor parameter index: contract name} for address parameters naming another contract."""
+    others = [name for name in names if name != spec["name"]]
+    references = {}
+    for index, (param_type, param_name) in enumerate(_constructor_inputs(spec["abi"])):
+        match = _match_contract(param_name, others) if param_type == "address" else None
+        if match:
+            references[index] = match
+    return references
+
+
+def _constructor_args(abi: List[Dict[str, Any]], deployer: str, addresses: Dict[int, str]) -> List[Any]:
+    """Placeholder constructor arguments; `addresses` fills address parameters by index (else the deployer)."""
+    args: List[Any] = []
+    for index, (param_type, name) in enumerate(_constructor_inputs(abi)):
+        if param_type.endswith("]"):
+            args.append([])
+        elif param_type == "address":
+            args.append(addresses.get(index, deployer))
+        elif param_type == "bool":
+            args.append(False)
+        elif param_type == "string":
+            args.append(name.strip("_") or "example")
+        elif param_type == "bytes":
+            args.append(b"")
+        elif param_type.startswith("bytes"):
+            args.append(bytes(int(param_type[len("bytes"):])))
+        elif param_type.startswith(("uint", "int")):
+            args.append(0)
+        else:
+            raise ValueError(f"Unsupported constructor parameter type {param_type}")
+    return args
@@ -0,0 +1,131 @@
+import hashlib
+import json
+import logging
+import os
+import time
+import uuid
+from pathlib import Path
+from threading import Lock
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REGISTRY_PATH = Path(__file__).resolve().parent / "data" / "deployment_registry.json"
+
+
+def strip_metadata(bytecode: str) -> str:
+    """
+    Creation bytecode without solc's trailing CBOR metadata (whose length is
+    stored in the last two bytes). The metadata hash changes with comments and
+    whitespace, the executable code does not.
+    """
+    code = bytecode[2:] if bytecode.startswith("0x") else bytecode
+    if len(code) < 4:
+        return code
+    try:
+        metadata_length = int(code[-4:], 16)
+    except ValueError:
+        return code
+    cut = (metadata_length + 2) * 2
+    # The metadata is a CBOR map (0xa1..0xa3 header); otherwise there is nothing to strip.
+    if cut >= len(code) or code[-cut:-cut + 2].lower() not in ("a1", "a2", "a3"):
+        return code
+    return code[:-cut]
+
+
+class DeploymentRegistry:
+    """
+    Maps (chain id, creation bytecode hash, constructor arguments) to a
+    contract already deployed with them, so an identical deployment can reuse
+    its address instead of paying gas and waiting for a block.
+
+    Entries are persisted in one JSON file. `lookup()` returns an entry only
+    while `is_valid(entry)` (supplied by the caller, e.g. "still pending or
+    confirmed, or has code on chain") holds; invalid entries are dropped.
+    """
+
+    def __init__(self, path: Path = DEFAULT_REGISTRY_PATH, enabled: bool = False) -> None:
+        self.path = Path(path)
+        self.enabled = enabled
+        self._lock = Lock()
+        self._entries: Optional[Dict[str, Dict[str, Any]]] = None
+        self._counters = {"hits": 0, "misses": 0, "registered": 0, "invalidated": 0}
+
+    @staticmethod
+    def make_key(chain_id: int, bytecode: str, constructor_args: str) -> str:
+        code_hash = hashlib.sha256(strip_metadata(bytecode).lower().encode("ascii")).hexdigest()
+        args = constructor_args[2:] if constructor_args.startswith("0x") else constructor_args
+        return hashlib.sha256(f"{chain_id}:{code_hash}:{args.lower()}".encode("ascii")).hexdigest()
+
+    def lookup(self, key: str, is_valid: Callable[[Dict[str, Any]], bool]) -> Optional[Dict[str, Any]]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            stored = self._load().get(key)
+            entry = dict(stored) if stored is not None else None
+        # Validation may query the chain, so it runs without the lock.
+        valid = entry is not None and is_valid(entry)
+        with self._lock:
+            if not valid:
+                self._counters["misses"] += 1
+                if entry is not None and self._load().pop(key, None) is not None:
+                    logger.info("Dropping stale registry entry for %s", entry.get("address"))
+                    self._counters["invalidated"] += 1
+                    self._write()
+                return None
+            stored = self._load().get(key)
+            if stored is not None:
+                stored["reuse_count"] = stored.get("reuse_count", 0) + 1
+                stored["last_reused_at"] = time.time()
+                self._write()
+            self._counters["hits"] += 1
+        return entry
+
+    def register(self, key: str, details: Dict[str, Any]) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._load()[key] = {**details, "registered_at": time.time(), "reuse_count": 0}
+            self._counters["registered"] += 1
+            self._write()
+
+    def mark_confirmed(self, key: str) -> None:
+        with self._lock:
+            entry = self._load().get(key)
+            if entry is not None and not entry.get("confirmed"):
+                entry["confirmed"] = True
+                self._write()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = len(self._load()) if self.enabled else 0
+            return {**self._counters, "entries": entries, "enabled": self.enabled}
+
+    # ---------- internals ----------
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        # Caller holds self._lock.
+        if self._entries is None:
+            try:
+                with self.path.open("r", encoding="utf-8") as handle:
+                    self._entries = json.load(handle).get("deployments", {})
+            except FileNotFoundError:
+                self._entries = {}
+            except (OSError, json.JSONDecodeError) as exc:
+                logger.warning("Ignoring unreadable deployment registry: %s", exc)
+                self._entries = {}
+        return self._entries
+
+    def _write(self) -> None:
+        # Caller holds self._lock.
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f"{self.path.name}.{uuid.uuid4().hex}.tmp")
+        tmp_path.write_text(json.dumps({"deployments": self._entries}), encoding="utf-8")
+        os.replace(tmp_path, self.path)
+
+
+deployment_registry = DeploymentRegistry(
+    enabled=os.getenv("DEPLOYMENT_REGISTRY_ENABLED", "0").lower() in ("1", "true", "yes"),
+)
+
+__all__ = ["DeploymentRegistry", "deployment_registry", "strip_metadata"]
@@ -0,0 +1,353 @@
+import asyncio
+import logging
+import os
+import time
+import uuid
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from web3 import Web3
+
+try:
+    from . import metrics
+except ImportError:
+    import metrics
+
+try:
+    from .nonce_manager import NonceManager, nonce_manager
+except ImportError:
+    from nonce_manager import NonceManager, nonce_manager
+
+try:
+    from .web3_provider import ProviderManager, provider_manager
+except ImportError:
+    from web3_provider import ProviderManager, provider_manager
+
+logger = logging.getLogger(__name__)
+
+DEPLOYMENT_PENDING = "pending"
+DEPLOYMENT_CONFIRMED = "confirmed"
+DEPLOYMENT_FAILED = "failed"
+DEPLOYMENT_TIMED_OUT = "timeout"
+DEPLOYMENT_REPLACED = "replaced"
+TERMINAL_STATUSES = (DEPLOYMENT_CONFIRMED, DEPLOYMENT_FAILED, DEPLOYMENT_TIMED_OUT, DEPLOYMENT_REPLACED)
+
+
+class DeploymentTracker:
+    """
+    Confirms submitted deployments in the background.
+
+    `track()` records a broadcast transaction (it is thread-safe, so the
+    blocking deploy code can call it from a worker thread). While started, one
+    task polls the receipts of every pending deployment, one JSON-RPC batch per
+    endpoint, and moves records to confirmed / failed, or to timeout after
+    `timeout_seconds`. For transactions sent through the nonce manager the
+    same batch reads each sender's mined nonce: a nonce used up without one of
+    our receipts on two polls in a row means the transaction was replaced, and
+    one still unmined after `stuck_after_seconds` is re-sent with a higher gas
+    price (at most `max_speed_ups` times). `watch()` yields a record each time it changes.
+    Records live in memory; the oldest finished ones are dropped past
+    `max_records`.
+    """
+
+    def __init__(
+        self,
+        providers: ProviderManager,
+        nonces: NonceManager,
+        poll_interval: float = 2.0,
+        timeout_seconds: float = 900.0,
+        stuck_after_seconds: float = 120.0,
+        max_speed_ups: int = 3,
+        max_records: int = 1000,
+    ) -> None:
+        self.providers = providers
+        self.nonces = nonces
+        self.poll_interval = poll_interval
+        self.timeout_seconds = timeout_seconds
+        self.stuck_after_seconds = stuck_after_seconds
+        self.max_speed_ups = max_speed_ups
+        self.max_records = max_records
+        self._records: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._changed: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._counters = {
+            "tracked": 0,
+            "confirmed": 0,
+            "failed": 0,
+            "timed_out": 0,
+            "replaced": 0,
+            "speed_ups": 0,
+            "polls": 0,
+        }
+
+    def track(
+        self,
+        rpc_url: str,
+        tx_hash: str,
+        address: str,
+        contract_name: Optional[str] = None,
+        network: Optional[str] = None,
+        sender: Optional[str] = None,
+        nonce: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """
+        Start confirming `tx_hash` and return the new (pending) record. Pass
+        the `sender` and `nonce` of transactions sent through the nonce manager
+        to get replacement detection and stuck-transaction speed-ups.
+        """
+        now = time.time()
+        record = {
+            "deployment_id": uuid.uuid4().hex,
+            "status": DEPLOYMENT_PENDING,
+            "tx_hash": tx_hash,
+            "address": address,
+            "contract_name": contract_name,
+            "network": network,
+            "submitted_at": now,
+            "confirmed_at": None,
+            "block_number": None,
+            "gas_used": None,
+            "error": None,
+            "speed_ups": 0,
+            "_rpc_url": rpc_url,
+            "_sender": sender,
+            "_nonce": nonce,
+            "_tx_hashes": [tx_hash],
+            "_last_sent_at": now,
+            "_nonce_used": False,
+        }
+        with self._lock:
+            self._records[record["deployment_id"]] = record
+            self._counters["tracked"] += 1
+            self._prune()
+        self._notify()
+        return _public(record)
+
+    def get(self, deployment_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            record = self._records.get(deployment_id)
+            return _public(record) if record is not None else None
+
+    async def watch(self, deployment_id: str) -> AsyncIterator[Dict[str, Any]]:
+        """Yield the record now and after every change, until it is finished."""
+        last = None
+        while True:
+            changed = self._changed_event()
+            record = self.get(deployment_id)
+            if record is None:
+                return
+            if record != last:
+                yield record
+                last = record
+            if record["status"] in TERMINAL_STATUSES:
+                return
+            await changed.wait()
+
+    async def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._changed = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            pending = sum(1 for r in self._records.values() if r["status"] == DEPLOYMENT_PENDING)
+            return {**self._counters, "pending": pending, "records": len(self._records)}
+
+    # ---------- internals ----------
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await self._poll_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Deployment receipt polling failed")
+
+    async def _poll_once(self) -> None:
+        with self._lock:
+            pending = [dict(r) for r in self._records.values() if r["status"] == DEPLOYMENT_PENDING]
+        if not pending:
+            return
+        by_endpoint: Dict[str, List[Dict[str, Any]]] = {}
+        for record in pending:
+            by_endpoint.setdefault(record["_rpc_url"], []).append(record)
+
+        await asyncio.gather(*(self._poll_endpoint(url, records) for url, records in by_endpoint.items()))
+        with self._lock:
+            self._counters["polls"] += 1
+        self._notify()
+
+    async def _poll_endpoint(self, rpc_url: str, records: List[Dict[str, Any]]) -> None:
+        client = self.providers.get(rpc_url)
+        # Nonces are read before receipts: a block landing between the two
+        # reads must show up as a receipt, not as a used nonce without one.
+        senders = sorted({r["_sender"] for r in records if r["_sender"] and r["_nonce"] is not None})
+        calls = [("eth_getTransactionCount", [sender, "latest"]) for sender in senders]
+        calls += [("eth_getTransactionReceipt", [h]) for r in records for h in r["_tx_hashes"]]
+        try:
+            results = await asyncio.to_thread(client.batch, calls)
+        except Exception as exc:
+            # Pending records are retried on the next tick (or time out).
+            logger.warning("Receipt poll failed: %s", exc)
+            results = [None] * len(calls)
+
+        mined_nonces = dict(zip(senders, results[:len(senders)]))
+        receipts = iter(results[len(senders):])
+        stuck = []
+        for record in records:
+            # Any of the hashes sent for this nonce (original or speed-ups) may be the one mined.
+            candidates = [next(receipts) for _ in record["_tx_hashes"]]
+            receipt = next((c for c in candidates if c), None)
+            mined_nonce = mined_nonces.get(record["_sender"])
+            if self._apply(record["deployment_id"], receipt, _to_int(mined_nonce)):
+                stuck.append(record)
+
+        for record in stuck:
+            try:
+                tx_hash = await asyncio.to_thread(
+                    self.nonces.speed_up, client, record["_sender"], record["_nonce"]
+                )
+            except Exception as exc:
+                logger.warning("Could not speed up deployment %s: %s", record["deployment_id"], exc)
+                continue
+            if tx_hash is None:
+                continue
+            with self._lock:
+                current = self._records.get(record["deployment_id"])
+                if current is None:
+                    continue
+                current["_tx_hashes"].append(tx_hash)
+                current["_last_sent_at"] = time.time()
+                current["tx_hash"] = tx_hash
+                current["speed_ups"] += 1
+                self._counters["speed_ups"] += 1
+
+    def _apply(self, deployment_id: str, receipt: Optional[Dict[str, Any]], mined_nonce: Optional[int]) -> bool:
+        """Update one record from a poll; returns True if it should be sped up."""
+        now = time.time()
+        with self._lock:
+            record = self._records.get(deployment_id)
+            if record is None or record["status"] != DEPLOYMENT_PENDING:
+                return False
+            nonce = record["_nonce"]
+            if receipt is None:
+                if nonce is not None and mined_nonce is not None and mined_nonce > nonce:
+                    # Batches are not guaranteed to run in order on every node,
+                    # so only a second poll without a receipt means replaced.
+                    if not record["_nonce_used"]:
+                        record["_nonce_used"] = True
+                        return False
+                    record["status"] = DEPLOYMENT_REPLACED
+                    record["error"] = f"Nonce {nonce} was used by another transaction"
+                    self._counters["replaced"] += 1
+                elif record["submitted_at"] + self.timeout_seconds <= now:
+                    record["status"] = DEPLOYMENT_TIMED_OUT
+                    record["error"] = f"No receipt after {int(self.timeout_seconds)}s"
+                    self._counters["timed_out"] += 1
+                else:
+                    return (
+                        nonce is not None
+                        and record["speed_ups"] < self.max_speed_ups
+                        and record["_last_sent_at"] + self.stuck_after_seconds <= now
+                    )
+                self._settle(record)
+                return False
+            record["tx_hash"] = receipt.get("transactionHash") or record["tx_hash"]
+            record["block_number"] = _to_int(receipt.get("blockNumber"))
+            record["gas_used"] = _to_int(receipt.get("gasUsed"))
+            record["confirmed_at"] = now
+            metrics.DEPLOY_CONFIRM_SECONDS.observe(now - record["submitted_at"])
+            self._settle(record)
+            if _to_int(receipt.get("status")) == 0:
+                record["status"] = DEPLOYMENT_FAILED
+                record["error"] = "Deployment transaction reverted"
+                self._counters["failed"] += 1
+                return False
+            contract_address = receipt.get("contractAddress")
+            if contract_address and Web3.to_checksum_address(contract_address) != record["address"]:
+                logger.warning(
+                    "Deployment %s landed at %s, not the predicted %s",
+                    deployment_id, contract_address, record["address"],
+                )
+                record["address"] = Web3.to_checksum_address(contract_address)
+            record["status"] = DEPLOYMENT_CONFIRMED
+            self._counters["confirmed"] += 1
+            return False
+
+    def _settle(self, record: Dict[str, Any]) -> None:
+        if record["_sender"] and record["_nonce"] is not None:
+            self.nonces.settle(record["_rpc_url"], record["_sender"], record["_nonce"])
+
+    def _prune(self) -> None:
+        # Caller holds self._lock.
+        excess = len(self._records) - self.max_records
+        if excess <= 0:
+            return
+        for deployment_id in [k for k, r in self._records.items() if r["status"] in TERMINAL_STATUSES][:excess]:
+            del self._records[deployment_id]
+
+    def _changed_event(self) -> asyncio.Event:
+        if self._changed is None:
+            self._changed = asyncio.Event()
+        return self._changed
+
+    def _notify(self) -> None:
+        """Wake every watcher; safe to call from any thread."""
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._swap_changed()
+        else:
+            loop.call_soon_threadsafe(self._swap_changed)
+
+    def _swap_changed(self) -> None:
+        changed, self._changed = self._changed, asyncio.Event()
+        if changed is not None:
+            changed.set()
+
+
+def _public(record: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: v for k, v in record.items() if not k.startswith("_")}
+
+
+def _to_int(value: Any) -> Optional[int]:
+    if value is None:
+        return None
+    return int(value, 16) if isinstance(value, str) else int(value)
+
+
+deployment_tracker = DeploymentTracker(
+    provider_manager,
+    nonce_manager,
+    poll_interval=float(os.getenv("DEPLOY_POLL_INTERVAL_SECONDS", "2")),
+    timeout_seconds=float(os.getenv("DEPLOY_CONFIRM_TIMEOUT_SECONDS", "900")),
+    stuck_after_seconds=float(os.getenv("DEPLOY_STUCK_AFTER_SECONDS", "120")),
+    max_speed_ups=int(os.getenv("DEPLOY_MAX_SPEED_UPS", "3")),
+    max_records=int(os.getenv("DEPLOYMENT_RECORDS_MAX", "1000")),
+)
+
+__all__ = [
+    "DeploymentTracker",
+    "deployment_tracker",
+    "DEPLOYMENT_PENDING",
+    "DEPLOYMENT_CONFIRMED",
+    "DEPLOYMENT_FAILED",
+    "DEPLOYMENT_TIMED_OUT",
+    "DEPLOYMENT_REPLACED",
+]
@@ -0,0 +1,246 @@
+import asyncio
+import copy
+import json
+import logging
+import os
+import time
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from threading import Lock
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class DiskBackedCache:
+    """
+    Bounded in-memory LRU in front of a size-capped directory of JSON files
+    (`<key[:2]>/<key>.json`), for JSON-serializable dict values.
+
+    With `ttl_seconds`, both tiers expire an entry that long after it was
+    written; without it entries never expire. With `touch_on_read`, a disk hit
+    refreshes the file's mtime so pruning drops least recently used files
+    first instead of the oldest ones. Coroutines use `aget()` / `aput()`,
+    which keep disk I/O off the event loop. `clock` (wall-clock seconds)
+    timestamps entries and decides when they expire.
+    """
+
+    # Used in log messages.
+    label = "cache"
+
+    def __init__(
+        self,
+        directory: Path,
+        max_entries: int,
+        max_disk_bytes: int,
+        ttl_seconds: Optional[float] = None,
+        touch_on_read: bool = False,
+        enabled: bool = True,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.directory = Path(directory)
+        self.max_entries = max_entries
+        self.max_disk_bytes = max_disk_bytes
+        self.ttl_seconds = ttl_seconds
+        self.touch_on_read = touch_on_read
+        self.enabled = enabled
+        self._clock = clock
+        self._memory: "OrderedDict[str, Tuple[Optional[float], Dict[str, Any]]]" = OrderedDict()
+        self._lock = Lock()
+        self._disk_bytes: Optional[int] = None
+        self._counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+        if ttl_seconds is not None:
+            self._counters["expired"] = 0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return a copy of the cached value for `key`, or None on a miss."""
+        if not self.enabled:
+            return None
+        value = self._get_memory(key)
+        return value if value is not None else self._get_disk(key)
+
+    async def aget(self, key: str) -> Optional[Dict[str, Any]]:
+        """`get()` for coroutines: memory hits inline, the disk tier in a worker thread."""
+        if not self.enabled:
+            return None
+        value = self._get_memory(key)
+        return value if value is not None else await asyncio.to_thread(self._get_disk, key)
+
+    def put(self, key: str, value: Dict[str, Any]) -> None:
+        if not self.enabled:
+            return
+        created_at, stored = self._put_memory(key, value)
+        self._write_disk(key, created_at, stored)
+
+    async def aput(self, key: str, value: Dict[str, Any]) -> None:
+        """`put()` for coroutines: the disk write (and any pruning) runs in a worker thread."""
+        if not self.enabled:
+            return
+        created_at, stored = self._put_memory(key, value)
+        await asyncio.to_thread(self._write_disk, key, created_at, stored)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+        for path in self._disk_files():
+            self._unlink(path)
+        self._disk_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+            memory_entries = len(self._memory)
+        lookups = counters["memory_hits"] + counters["disk_hits"] + counters["misses"]
+        hits = counters["memory_hits"] + counters["disk_hits"]
+        return {
+            **counters,
+            "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+            "memory_entries": memory_entries,
+            "disk_bytes": self._disk_bytes or 0,
+            "enabled": self.enabled,
+        }
+
+    # ---------- internals ----------
+
+    def _expires_at(self, created_at: float) -> Optional[float]:
+        return created_at + self.ttl_seconds if self.ttl_seconds is not None else None
+
+    def _get_memory(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at is None or expires_at > self._clock():
+                self._memory.move_to_end(key)
+                self._counters["memory_hits"] += 1
+                return copy.deepcopy(value)
+            del self._memory[key]
+            self._counters["expired"] += 1
+            return None
+
+    def _get_disk(self, key: str) -> Optional[Dict[str, Any]]:
+        record = self._read_disk(key)
+        with self._lock:
+            if record is None:
+                self._counters["misses"] += 1
+                return None
+            created_at, value = record
+            self._counters["disk_hits"] += 1
+            # Keep the entry's original expiry; a late read must not extend it.
+            self._remember(key, self._expires_at(created_at), value)
+        return copy.deepcopy(value)
+
+    def _put_memory(self, key: str, value: Dict[str, Any]) -> Tuple[float, Dict[str, Any]]:
+        created_at = self._clock()
+        stored = copy.deepcopy(value)
+        with self._lock:
+            self._remember(key, self._expires_at(created_at), stored)
+            self._counters["writes"] += 1
+        return created_at, stored
+
+    def _remember(self, key: str, expires_at: Optional[float], value: Dict[str, Any]) -> None:
+        # Caller holds self._lock.
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self._counters["evictions"] += 1
+
+    def _path_for(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.json"
+
+    def _disk_files(self) -> List[Path]:
+        if not self.directory.exists():
+            return []
+        return list(self.directory.glob("*/*.json"))
+
+    def _read_disk(self, key: str) -> Optional[Tuple[float, Dict[str, Any]]]:
+        path = self._path_for(key)
+        try:
+            with path.open("r", encoding="utf-8") as handle:
+                record = json.load(handle)
+        except FileNotFoundError:
+            return None
+        except (OSError, json.JSONDecodeError):
+            self._unlink(path)
+            return None
+        created_at = record.get("created_at", 0)
+        expires_at = self._expires_at(created_at)
+        if expires_at is not None and expires_at <= self._clock():
+            self._unlink(path)
+            with self._lock:
+                self._counters["expired"] += 1
+            return None
+        value = record.get("value")
+        if not isinstance(value, dict):
+            return None
+        if self.touch_on_read:
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+        return created_at, value
+
+    def _write_disk(self, key: str, created_at: float, value: Dict[str, Any]) -> None:
+        path = self._path_for(key)
+        data = json.dumps({"created_at": created_at, "value": value}, separators=(",", ":")).encode("utf-8")
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+            tmp_path.write_bytes(data)
+            # Overwriting a key replaces its old file rather than adding to it.
+            replaced = self._file_size(path)
+            os.replace(tmp_path, path)
+        except OSError as exc:
+            logger.warning("Failed to write %s entry %s: %s", self.label, key, exc)
+            return
+        with self._lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = sum(self._file_size(p) for p in self._disk_files())
+            else:
+                self._disk_bytes += len(data) - replaced
+            over_budget = self._disk_bytes > self.max_disk_bytes
+        if over_budget:
+            self._prune_disk()
+
+    def _prune_disk(self) -> None:
+        """Drop expired files, then the least recently touched ones, until under 90% of the cap."""
+        # Compared with file mtimes, so this is the real clock even when one is injected.
+        now = time.time()
+        files = []
+        for path in self._disk_files():
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        files.sort()
+        total = sum(size for _, size, _ in files)
+        target = int(self.max_disk_bytes * 0.9)
+        for mtime, size, path in files:
+            expired = self.ttl_seconds is not None and mtime + self.ttl_seconds <= now
+            if total <= target and not expired:
+                continue
+            self._unlink(path)
+            total -= size
+        with self._lock:
+            self._disk_bytes = max(total, 0)
+
+    @staticmethod
+    def _file_size(path: Path) -> int:
+        try:
+            return path.stat().st_size
+        except OSError:
+            return 0
+
+    @staticmethod
+    def _unlink(path: Path) -> None:
+        try:
+            path.unlink()
+        except OSError:
+            pass
+
+
+__all__ = ["DiskBackedCache"]
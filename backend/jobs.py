@@ -0,0 +1,255 @@
+import asyncio
+import logging
+import os
+import shutil
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_JOBS_DIR = Path(__file__).resolve().parent / "data" / "jobs"
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+
+
+class QueueFullError(RuntimeError):
+    """Raised when a job is submitted while the queue is at capacity."""
+
+
+class Job(BaseModel):
+    id: str
+    kind: str
+    status: str = JOB_QUEUED
+    stage: Optional[str] = None
+    # Output of every finished stage, so a restarted worker resumes after it.
+    stages: Dict[str, Any] = {}
+    request: Dict[str, Any] = {}
+    # Who submitted the job, when known (recorded with its stored archive).
+    user_id: Optional[str] = None
+    error: Optional[str] = None
+    result_file: Optional[str] = None
+    created_at: str
+    updated_at: str
+
+
+def _now() -> str:
+    return datetime.utcnow().isoformat() + "Z"
+
+
+class JobStore:
+    """
+    One directory per job holding `job.json` (rewritten atomically after every
+    state change) and, once finished, the result artifact. The methods do
+    blocking file I/O; `JobManager` calls them from worker threads.
+    """
+
+    def __init__(self, directory: Path = DEFAULT_JOBS_DIR) -> None:
+        self.directory = Path(directory)
+
+    def job_dir(self, job_id: str) -> Path:
+        return self.directory / job_id
+
+    def save(self, job: Job) -> None:
+        self.write_job(job.id, self.dump(job))
+
+    @staticmethod
+    def dump(job: Job) -> str:
+        """Stamp `updated_at` and serialize `job` for `write_job()`."""
+        job.updated_at = _now()
+        return job.model_dump_json()
+
+    def write_job(self, job_id: str, data: str) -> None:
+        path = self.job_dir(job_id) / "job.json"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"job.json.{uuid.uuid4().hex}.tmp")
+        tmp_path.write_text(data, encoding="utf-8")
+        os.replace(tmp_path, path)
+
+    def load(self, job_id: str) -> Optional[Job]:
+        path = self.job_dir(job_id) / "job.json"
+        try:
+            return Job.model_validate_json(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+    def load_all(self) -> List[Job]:
+        if not self.directory.exists():
+            return []
+        jobs = []
+        for child in self.directory.iterdir():
+            if child.is_dir():
+                job = self.load(child.name)
+                if job is not None:
+                    jobs.append(job)
+        return jobs
+
+    def write_result(self, job: Job, filename: str, data: bytes) -> Path:
+        path = self.job_dir(job.id) / filename
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{filename}.{uuid.uuid4().hex}.tmp")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+        return path
+
+    def delete(self, job_id: str) -> None:
+        shutil.rmtree(self.job_dir(job_id), ignore_errors=True)
+
+
+JobRunner = Callable[[Job, "JobManager"], Awaitable[None]]
+
+
+class JobManager:
+    """
+    Bounded pool of asyncio workers executing persisted jobs.
+
+    `runner(job, manager)` implements a job kind as a sequence of
+    `manager.run_stage(...)` calls. Jobs that were queued or running when the
+    process stopped are picked up again on `start()` and skip the stages they
+    had already finished. Job state is written from worker threads, never on
+    the event loop.
+    """
+
+    def __init__(
+        self,
+        runners: Dict[str, JobRunner],
+        store: Optional[JobStore] = None,
+        workers: int = 4,
+        max_queue: int = 100,
+        retention_seconds: float = 24 * 3600,
+    ) -> None:
+        self.runners = runners
+        self.store = store or JobStore()
+        self.workers = max(1, workers)
+        self.max_queue = max_queue
+        self.retention_seconds = retention_seconds
+        self._jobs: Dict[str, Job] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        # One per job: stages running side by side must not write job.json out of order.
+        self._save_locks: Dict[str, asyncio.Lock] = {}
+
+    async def start(self) -> None:
+        self._queue = asyncio.Queue()
+        for job in sorted(await asyncio.to_thread(self.store.load_all), key=lambda j: j.created_at):
+            self._jobs[job.id] = job
+            if job.status in (JOB_QUEUED, JOB_RUNNING):
+                job.status = JOB_QUEUED
+                await self._save(job)
+                self._queue.put_nowait(job.id)
+        await self._prune()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, kind: str, request: Dict[str, Any], user_id: Optional[str] = None) -> Job:
+        if self._queue is None:
+            raise RuntimeError("JobManager has not been started")
+        if kind not in self.runners:
+            raise ValueError(f"Unknown job kind: {kind}")
+        if self._queue.qsize() >= self.max_queue:
+            raise QueueFullError("Job queue is full; try again shortly.")
+        now = _now()
+        job = Job(
+            id=uuid.uuid4().hex, kind=kind, request=request, user_id=user_id, created_at=now, updated_at=now
+        )
+        await self._save(job)
+        self._jobs[job.id] = job
+        self._queue.put_nowait(job.id)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def run_stage(self, job: Job, stage: str, produce: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Return the stored output of `stage`, or run `produce()` and persist its
+        (JSON-serializable) result before moving on.
+        """
+        if stage in job.stages:
+            return job.stages[stage]
+        job.stage = stage
+        await self._save(job)
+        output = await produce()
+        job.stages[stage] = output
+        await self._save(job)
+        return output
+
+    async def save_result(self, job: Job, filename: str, data: bytes) -> None:
+        await asyncio.to_thread(self.store.write_result, job, filename, data)
+        job.result_file = filename
+        await self._save(job)
+
+    def result_path(self, job: Job) -> Optional[Path]:
+        if job.status != JOB_SUCCEEDED or not job.result_file:
+            return None
+        return self.store.job_dir(job.id) / job.result_file
+
+    async def _worker(self) -> None:
+        assert self._queue is not None
+        while True:
+            job_id = await self._queue.get()
+            job = self._jobs.get(job_id)
+            if job is None or job.status != JOB_QUEUED:
+                continue
+            job.status = JOB_RUNNING
+            await self._save(job)
+            try:
+                await self.runners[job.kind](job, self)
+                job.status = JOB_SUCCEEDED
+                job.stage = None
+            except asyncio.CancelledError:
+                # Shutting down: leave the job as running so start() resumes it.
+                raise
+            except Exception as exc:
+                logger.exception("Job %s failed in stage %s", job.id, job.stage)
+                job.status = JOB_FAILED
+                job.error = getattr(exc, "detail", None) or str(exc)
+            await self._save(job)
+            await self._prune()
+
+    async def _save(self, job: Job) -> None:
+        lock = self._save_locks.setdefault(job.id, asyncio.Lock())
+        async with lock:
+            # Serialized here, under the lock, so a later save always writes a newer snapshot.
+            await asyncio.to_thread(self.store.write_job, job.id, self.store.dump(job))
+
+    async def _prune(self) -> None:
+        """Forget finished jobs older than the retention window."""
+        cutoff = datetime.utcnow() - timedelta(seconds=self.retention_seconds)
+        for job in list(self._jobs.values()):
+            if job.status not in (JOB_SUCCEEDED, JOB_FAILED):
+                continue
+            try:
+                updated = datetime.fromisoformat(job.updated_at.rstrip("Z"))
+            except ValueError:
+                continue
+            if updated < cutoff:
+                self._jobs.pop(job.id, None)
+                self._save_locks.pop(job.id, None)
+                await asyncio.to_thread(self.store.delete, job.id)
+
+
+__all__ = [
+    "Job",
+    "JobManager",
+    "JobStore",
+    "QueueFullError",
+    "JOB_QUEUED",
+    "JOB_RUNNING",
+    "JOB_SUCCEEDED",
+    "JOB_FAILED",
+]
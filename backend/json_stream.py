@@ -0,0 +1,77 @@
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class FileObjectStream:
+    """
+    Incremental scanner for streamed Code Generator output shaped like
+
+        {"contracts": [{"path": ..., "content": ...}, ...], "backend": [...], ...}
+
+    Feed it completion deltas as they arrive; `feed()` returns a
+    (section, file_object) pair for every object inside a top-level array whose
+    closing brace has just been received. Only string/escape state and nesting
+    are tracked per character, and only the object currently being read is
+    buffered, so each delta costs time proportional to its own length.
+    """
+
+    def __init__(self) -> None:
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape = False
+        self._key: Optional[List[str]] = None
+        self._last_key: Optional[str] = None
+        self._section: Optional[str] = None
+        self._object: Optional[List[str]] = None
+
+    def feed(self, chunk: str) -> List[Tuple[str, Dict[str, Any]]]:
+        completed: List[Tuple[str, Dict[str, Any]]] = []
+        stack = self._stack
+        for char in chunk:
+            if self._object is not None:
+                self._object.append(char)
+            if self._in_string:
+                if self._key is not None:
+                    self._key.append(char)
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._key is not None:
+                        self._last_key = _loads("".join(self._key))
+                        self._key = None
+                continue
+            if not stack and char != "{":
+                # Anything before the document (whitespace, stray prose) is ignored.
+                continue
+            if char == '"':
+                self._in_string = True
+                # Strings directly inside the top-level object are section names.
+                self._key = ['"'] if len(stack) == 1 else None
+            elif char == ":" and len(stack) == 1:
+                self._section = self._last_key if isinstance(self._last_key, str) else None
+            elif char in "{[":
+                stack.append(char)
+                if stack == ["{", "[", "{"]:
+                    self._object = ["{"]
+            elif char in "}]":
+                if stack == ["{", "[", "{"] and char == "}" and self._object is not None:
+                    file_obj = _loads("".join(self._object))
+                    self._object = None
+                    if isinstance(file_obj, dict) and file_obj.get("path") and self._section:
+                        completed.append((self._section, file_obj))
+                if stack:
+                    stack.pop()
+        return completed
+
+
+def _loads(fragment: str) -> Any:
+    try:
+        return json.loads(fragment)
+    except json.JSONDecodeError:
+        return None
+
+
+__all__ = ["FileObjectStream"]
@@ -1,23 +1,30 @@
+import asyncio
 import base64
+import hashlib
 import io
 import json
 import logging
 import os
 import re
+import time
 import zipfile
 import uuid
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
 from threading import Lock
-from typing import List, Optional, Dict, Any, Tuple
+from typing import List, Optional, Dict, Any, Tuple, Callable, Awaitable, Iterator, AsyncIterator, TypeVar
 
 import httpx
 from fastapi import FastAPI, HTTPException, Header
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, Response, StreamingResponse
 from pydantic import BaseModel, EmailStr
 
-from openai import OpenAI
+from openai import AsyncOpenAI
 from dotenv import load_dotenv
 
 try:
@@ -57,15 +64,117 @@ except Exception as e:
     SUPABASE_ANON_KEY = None
 
 try:
-    from .deploy_contracts import deploy_contract, DeploymentSkipped
+    from .deploy_contracts import deploy_contract, deploy_contracts, DeploymentSkipped
 except ImportError:
-    from deploy_contracts import deploy_contract, DeploymentSkipped
+    from deploy_contracts import deploy_contract, deploy_contracts, DeploymentSkipped
+
+try:
+    from .compile_cache import compile_cache
+except ImportError:
+    from compile_cache import compile_cache
+
+try:
+    from .deployment_registry import deployment_registry
+except ImportError:
+    from deployment_registry import deployment_registry
+
+try:
+    from .deployment_tracker import TERMINAL_STATUSES, deployment_tracker
+except ImportError:
+    from deployment_tracker import TERMINAL_STATUSES, deployment_tracker
+
+try:
+    from .web3_provider import provider_manager
+except ImportError:
+    from web3_provider import provider_manager
+
+try:
+    from .solc_manager import solc_manager
+except ImportError:
+    from solc_manager import solc_manager
+
+try:
+    from .agent_cache import AgentCache, agent_cache
+except ImportError:
+    from agent_cache import AgentCache, agent_cache
+
+try:
+    from .artifact_store import ArtifactSpool, artifact_store
+except ImportError:
+    from artifact_store import ArtifactSpool, artifact_store
+
+try:
+    from .singleflight import SingleFlight
+except ImportError:
+    from singleflight import SingleFlight
+
+try:
+    from . import metrics
+except ImportError:
+    import metrics
+
+try:
+    from .json_stream import FileObjectStream
+except ImportError:
+    from json_stream import FileObjectStream
+
+try:
+    from .project_store import project_store
+except ImportError:
+    from project_store import project_store
+
+try:
+    from .repo_templates import CONNECTION_API, TEMPLATE_PATHS, address_placeholder, render_repo_files
+except ImportError:
+    from repo_templates import CONNECTION_API, TEMPLATE_PATHS, address_placeholder, render_repo_files
+
+try:
+    from .jobs import JOB_FAILED, JOB_SUCCEEDED, Job, JobManager, QueueFullError
+except ImportError:
+    from jobs import JOB_FAILED, JOB_SUCCEEDED, Job, JobManager, QueueFullError
+
+try:
+    from .resilience import CircuitBreaker, CircuitOpenError, HedgePolicy, RetryPolicy
+except ImportError:
+    from resilience import CircuitBreaker, CircuitOpenError, HedgePolicy, RetryPolicy
 
 
 # ---------- FastAPI setup ----------
 
 load_dotenv()  # Load .env values (RPC_URL, PRIVATE_KEY, etc.) if present
-app = FastAPI()
+
+
+# How often stored archives past their age limit are removed.
+ARTIFACT_GC_INTERVAL_SECONDS = float(os.getenv("ARTIFACT_GC_INTERVAL_SECONDS", "3600"))
+
+
+async def _collect_artifacts_periodically() -> None:
+    while True:
+        try:
+            await run_in_threadpool(artifact_store.gc)
+        except Exception:
+            logger.exception("Artifact GC failed")
+        await asyncio.sleep(ARTIFACT_GC_INTERVAL_SECONDS)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    artifact_gc = asyncio.create_task(_collect_artifacts_periodically())
+    await job_manager.start()
+    await deployment_tracker.start()
+    # Pre-warm compilers in the background; requests needing one that is still
+    # downloading wait on the same install instead of starting another.
+    warm_versions = os.getenv("SOLC_WARM_VERSIONS", str(solc_manager.default_version)).split(",")
+    solc_warmup = asyncio.create_task(run_in_threadpool(solc_manager.warm, warm_versions))
+    yield
+    solc_warmup.cancel()
+    artifact_gc.cancel()
+    await job_manager.stop()
+    await deployment_tracker.stop()
+    await client.close()
+
+
+app = FastAPI(lifespan=lifespan)
 logger = logging.getLogger(__name__)
 
 app.add_middleware(
@@ -74,13 +183,39 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Content-Disposition", "ETag", "X-Generation-Id", "X-Report-Url"],
 )
 
 # ---------- OpenAI client ----------
 
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# One pooled HTTP client shared by every agent call. Generations are I/O bound,
+# so a single worker can keep hundreds of them in flight on the event loop.
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "200"))
+OPENAI_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("OPENAI_MAX_KEEPALIVE_CONNECTIONS", "50"))
+
+_openai_http_client = httpx.AsyncClient(
+    limits=httpx.Limits(
+        max_connections=OPENAI_MAX_CONNECTIONS,
+        max_keepalive_connections=OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=60.0,
+    ),
+    timeout=httpx.Timeout(120.0, connect=10.0),
+)
+# Retries are handled by _call_openai_json (see llm_retry_policy), not the SDK.
+client = AsyncOpenAI(
+    api_key=os.getenv("OPENAI_API_KEY"),
+    http_client=_openai_http_client,
+    max_retries=0,
+)
 DEFAULT_MODEL = os.getenv("OPENAI_MODEL", "gpt-5.1")
 
+# Idle interval after which streaming endpoints send an SSE comment so proxies
+# don't close the connection while an agent is still thinking.
+SSE_HEARTBEAT_SECONDS = float(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
+
+# Opt-in: deploy every generated contract file that compiles standalone, not just the first one.
+DEPLOY_ALL_CONTRACTS = os.getenv("DEPLOY_ALL_CONTRACTS", "0").lower() in ("1", "true", "yes")
+
 SUPABASE_EMAIL_REDIRECT_URL = os.getenv("SUPABASE_EMAIL_REDIRECT_URL", "http://localhost:3000")
 SUPABASE_RESET_REDIRECT_URL = os.getenv("SUPABASE_RESET_REDIRECT_URL", f"{SUPABASE_EMAIL_REDIRECT_URL.rstrip('/')}/reset-password")
 
@@ -126,6 +261,10 @@ class FrameworkResponse(BaseModel):
 class ZipRequest(IdeaRequest):
     # Frontend can pass back the already-generated framework
     framework: Optional[FrameworkResponse] = None
+    # Saved project the archive belongs to, recorded in the artifact index
+    project_id: Optional[str] = None
+    # Deploy again even if the deployment registry holds an identical contract
+    force_redeploy: bool = False
 
 
 class AgentTrace(BaseModel):
@@ -144,8 +283,75 @@ class MultiAgentResult(BaseModel):
 class ZipResponse(BaseModel):
     zip_base64: str
     security_report: Optional[Dict[str, Any]] = None
+    security_report_error: Optional[str] = None  # the audit failed; the archive is still valid
+    deployment: Optional[Dict[str, Any]] = None
+    deployment_error: Optional[str] = None
+    # Stored copy; signed-in users can download it again from artifact_url
+    artifact_id: Optional[str] = None
+    artifact_url: Optional[str] = None
+
+
+class ArtifactItem(BaseModel):
+    artifact_id: str
+    size: int
+    filename: str
+    created_at: str
+    project_ids: List[str]
+    download_url: str
+
+
+class ZipReportResponse(BaseModel):
+    generation_id: str
+    stage: str  # code | deploy | package | done | failed
+    files: List[str] = []  # archive entries written so far
+    error: Optional[str] = None
+    security_report: Optional[Dict[str, Any]] = None
+    security_report_error: Optional[str] = None
+    deployment: Optional[Dict[str, Any]] = None
+    deployment_error: Optional[str] = None
+    # Stored copy of the finished archive
+    artifact_id: Optional[str] = None
+    artifact_url: Optional[str] = None
+
+
+class DeploymentStatusResponse(BaseModel):
+    deployment_id: str
+    status: str  # pending | confirmed | failed | timeout | replaced
+    tx_hash: str
+    address: str
+    contract_name: Optional[str] = None
+    network: Optional[str] = None
+    submitted_at: float
+    confirmed_at: Optional[float] = None
+    block_number: Optional[int] = None
+    gas_used: Optional[int] = None
+    error: Optional[str] = None
+    speed_ups: int = 0  # times a stuck transaction was re-sent with a higher gas price
+
+
+class JobSubmitResponse(BaseModel):
+    job_id: str
+    status: str
+    status_url: str
+    result_url: str
+
+
+class JobStatusResponse(BaseModel):
+    job_id: str
+    kind: str
+    status: str  # queued | running | succeeded | failed
+    stage: Optional[str] = None
+    completed_stages: List[str]
+    error: Optional[str] = None
+    created_at: str
+    updated_at: str
+    result_url: Optional[str] = None
+    security_report: Optional[Dict[str, Any]] = None
+    security_report_error: Optional[str] = None
     deployment: Optional[Dict[str, Any]] = None
     deployment_error: Optional[str] = None
+    artifact_id: Optional[str] = None
+    artifact_url: Optional[str] = None
 
 
 # ---------- Auth Pydantic models ----------
@@ -208,34 +414,10 @@ class ProjectListItem(BaseModel):
 
 # ---------- Local fallback storage for projects ----------
 
-PROJECTS_CACHE_PATH = Path(__file__).resolve().parent / "data" / "projects.json"
 SUPABASE_SETUP_DOC = Path(__file__).resolve().parents[1] / "SUPABASE_SETUP.md"
-_projects_lock = Lock()
 _missing_table_warning_emitted = False
 
 
-def _ensure_projects_file() -> None:
-    PROJECTS_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
-    if not PROJECTS_CACHE_PATH.exists():
-        PROJECTS_CACHE_PATH.write_text("{}", encoding="utf-8")
-
-
-def _read_local_projects() -> Dict[str, List[Dict[str, Any]]]:
-    _ensure_projects_file()
-    try:
-        with PROJECTS_CACHE_PATH.open("r", encoding="utf-8") as handle:
-            data = json.load(handle)
-            return data if isinstance(data, dict) else {}
-    except (json.JSONDecodeError, OSError):
-        return {}
-
-
-def _write_local_projects(data: Dict[str, List[Dict[str, Any]]]) -> None:
-    _ensure_projects_file()
-    with PROJECTS_CACHE_PATH.open("w", encoding="utf-8") as handle:
-        json.dump(data, handle, indent=2)
-
-
 def _log_missing_projects_table_warning() -> None:
     global _missing_table_warning_emitted
     if _missing_table_warning_emitted:
@@ -256,41 +438,19 @@ def _is_projects_table_missing_error(error: Exception) -> bool:
 
 
 def _save_project_locally(record: Dict[str, Any]) -> Dict[str, Any]:
-    with _projects_lock:
-        data = _read_local_projects()
-        user_projects = data.get(record["user_id"], [])
-        user_projects = [proj for proj in user_projects if proj.get("id") != record["id"]]
-        user_projects.insert(0, record)
-        data[record["user_id"]] = user_projects
-        _write_local_projects(data)
-    return record
+    return project_store.save(record)
 
 
 def _list_local_projects(user_id: str) -> List[Dict[str, Any]]:
-    with _projects_lock:
-        data = _read_local_projects()
-        return list(data.get(user_id, []))
+    return project_store.list(user_id)
 
 
 def _get_local_project(user_id: str, project_id: str) -> Optional[Dict[str, Any]]:
-    with _projects_lock:
-        data = _read_local_projects()
-        for record in data.get(user_id, []):
-            if record.get("id") == project_id:
-                return record
-    return None
+    return project_store.get(user_id, project_id)
 
 
 def _delete_local_project(user_id: str, project_id: str) -> bool:
-    with _projects_lock:
-        data = _read_local_projects()
-        user_projects = data.get(user_id, [])
-        new_projects = [proj for proj in user_projects if proj.get("id") != project_id]
-        if len(new_projects) == len(user_projects):
-            return False
-        data[user_id] = new_projects
-        _write_local_projects(data)
-    return True
+    return project_store.delete(user_id, project_id)
 
 
 def _dict_to_project_response(record: Dict[str, Any]) -> ProjectResponse:
@@ -348,12 +508,184 @@ def get_user_id_from_token(authorization: Optional[str] = None) -> Optional[str]
 
 # ---------- OpenAI helper ----------
 
-def _call_openai_json(system_prompt: str, user_prompt: str) -> Dict[str, Any]:
+T = TypeVar("T")
+
+llm_retry_policy = RetryPolicy(
+    max_attempts=int(os.getenv("LLM_MAX_ATTEMPTS", "3")),
+    base_delay=float(os.getenv("LLM_RETRY_BASE_DELAY", "1.0")),
+    max_delay=float(os.getenv("LLM_RETRY_MAX_DELAY", "20.0")),
+)
+llm_circuit_breaker = CircuitBreaker(
+    failure_threshold=int(os.getenv("LLM_CIRCUIT_FAILURE_THRESHOLD", "5")),
+    reset_timeout=float(os.getenv("LLM_CIRCUIT_RESET_SECONDS", "30")),
+)
+# Optional hedging: when an agent call outlives the LLM_HEDGE_PERCENTILE of that
+# agent's recent latencies, fire a duplicate and keep whichever answers first.
+llm_hedge_policy = HedgePolicy(
+    enabled=os.getenv("LLM_HEDGE_ENABLED", "0").lower() in ("1", "true", "yes"),
+    percentile=float(os.getenv("LLM_HEDGE_PERCENTILE", "0.95")),
+    min_samples=int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20")),
+    budget_ratio=float(os.getenv("LLM_HEDGE_BUDGET", "0.1")),
+    min_delay=float(os.getenv("LLM_HEDGE_MIN_DELAY", "1.0")),
+)
+
+
+async def _create_completion(agent_name: str, **request: Any) -> Any:
     """
-    Call the Chat Completions API and force a JSON object output.
+    One logical completion attempt, hedged when llm_hedge_policy says so.
+    An error from one request is only raised if the other one fails too. A
+    losing hedge is cancelled; a primary beaten by its hedge is left to finish
+    in the background, because the hedge delay is learned from primaries'
+    latencies and recording the winner's instead would keep shortening it.
+    """
+    delay = llm_hedge_policy.trigger_delay(agent_name)
+    started = time.perf_counter()
+    primary = asyncio.ensure_future(client.chat.completions.create(**request))
+
+    def observe_primary(task: asyncio.Future) -> None:
+        if task.cancelled() or task.exception() is None:
+            # A cancelled primary still ran at least this long.
+            llm_hedge_policy.observe(agent_name, time.perf_counter() - started)
+
+    primary.add_done_callback(observe_primary)
+    pending = {primary}
+    try:
+        if delay is not None:
+            done, _ = await asyncio.wait(pending, timeout=delay)
+            if not done and llm_hedge_policy.try_acquire():
+                metrics.LLM_HEDGES.inc(agent=agent_name)
+                pending.add(asyncio.ensure_future(client.chat.completions.create(**request)))
+
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is not primary:
+                        metrics.LLM_HEDGE_WINS.inc(agent=agent_name)
+                        pending.discard(primary)
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
+
+class AgentUsageStats:
+    """
+    Running per-agent totals (prompt size, token usage, ...) for /api/agent-stats.
+    """
+
+    def __init__(self) -> None:
+        self._lock = Lock()
+        self._agents: Dict[str, Dict[str, float]] = {}
+
+    def record(self, agent: str, **values: float) -> None:
+        with self._lock:
+            entry = self._agents.setdefault(agent, {})
+            for key, value in values.items():
+                entry[key] = entry.get(key, 0) + value
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            agents = {agent: dict(values) for agent, values in self._agents.items()}
+        for values in agents.values():
+            if values.get("prompt_tokens"):
+                values["cached_token_ratio"] = round(
+                    values.get("cached_tokens", 0) / values["prompt_tokens"], 4
+                )
+        return agents
+
+
+agent_usage_stats = AgentUsageStats()
+
+
+def _estimate_tokens(text: str) -> int:
+    # ~4 characters per token for English prose and JSON; good enough for sizing.
+    return (len(text) + 3) // 4
+
+
+async def _with_llm_retries(
+    agent_name: str,
+    attempt_call: Callable[[], Awaitable[T]],
+    can_retry: Callable[[], bool] = lambda: True,
+) -> T:
+    """
+    Run one logical LLM request under the shared retry policy and circuit breaker.
+
+    Transient failures (429, 5xx, timeouts, connection errors) are retried with
+    jittered backoff, honoring Retry-After. While the circuit breaker is open
+    calls fail fast with a 503 instead of waiting on a degraded provider.
+    `can_retry` lets streaming callers refuse a retry once output has already
+    been handed downstream.
     """
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            is_probe = llm_circuit_breaker.before_call()
+        except CircuitOpenError as e:
+            metrics.LLM_FAILURES.inc(agent=agent_name, kind="circuit_open")
+            raise HTTPException(
+                status_code=503,
+                detail=f"OpenAI JSON call failed: {e}",
+                headers={"Retry-After": str(int(e.retry_after + 0.999))},
+            )
+
+        try:
+            result = await attempt_call()
+        except asyncio.CancelledError:
+            # Cancelled callers say nothing about the provider; free the probe slot.
+            if is_probe:
+                llm_circuit_breaker.release_probe()
+            raise
+        except Exception as e:
+            reason = llm_retry_policy.classify(e)
+            if reason is None:
+                # The provider answered; the request itself was bad.
+                llm_circuit_breaker.record_success()
+                metrics.LLM_FAILURES.inc(agent=agent_name, kind="fatal")
+                raise HTTPException(status_code=500, detail=f"OpenAI JSON call failed: {e}")
+            llm_circuit_breaker.record_failure()
+            metrics.LLM_FAILURES.inc(agent=agent_name, kind=reason)
+            if attempt >= llm_retry_policy.max_attempts or not can_retry():
+                raise HTTPException(
+                    status_code=503,
+                    detail=f"OpenAI JSON call failed after {attempt} attempts: {e}",
+                )
+            delay = llm_retry_policy.delay(attempt, e)
+            metrics.LLM_RETRIES.inc(agent=agent_name, reason=reason)
+            logger.warning(
+                "Agent %s: OpenAI call failed (%s), retrying in %.1fs", agent_name, reason, delay
+            )
+            await asyncio.sleep(delay)
+            continue
+
+        llm_circuit_breaker.record_success()
+        return result
+
+
+def _parse_agent_json(agent_name: str, text: Optional[str]) -> Dict[str, Any]:
     try:
-        completion = client.chat.completions.create(
+        return json.loads(text)
+    except (TypeError, json.JSONDecodeError) as e:
+        metrics.AGENT_JSON_PARSE_FAILURES.inc(agent=agent_name)
+        raise HTTPException(status_code=500, detail=f"OpenAI JSON call returned invalid JSON: {e}")
+
+
+async def _call_openai_json(
+    system_prompt: str,
+    user_prompt: str,
+    agent_name: str = "unknown",
+) -> Dict[str, Any]:
+    """
+    Call the Chat Completions API and force a JSON object output.
+    Token usage (including provider prefix-cache hits) is recorded per agent.
+    Retries and the circuit breaker are handled by _with_llm_retries.
+    """
+    async def attempt() -> Tuple[Any, str]:
+        completion = await _create_completion(
+            agent_name,
             model=DEFAULT_MODEL,
             messages=[
                 {"role": "system", "content": system_prompt},
@@ -362,22 +694,131 @@ def _call_openai_json(system_prompt: str, user_prompt: str) -> Dict[str, Any]:
             response_format={"type": "json_object"},
             timeout=120.0,  # 60 second timeout per agent call
         )
-        text = completion.choices[0].message.content
-        return json.loads(text)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"OpenAI JSON call failed: {e}")
+        return completion, completion.choices[0].message.content
+
+    completion, text = await _with_llm_retries(agent_name, attempt)
+    _record_completion_usage(agent_name, completion)
+    return _parse_agent_json(agent_name, text)
+
+
+async def _stream_openai_json(
+    system_prompt: str,
+    user_prompt: str,
+    agent_name: str,
+    on_text: Callable[[str], None],
+) -> Dict[str, Any]:
+    """
+    Streaming variant of _call_openai_json: `on_text` receives every content
+    delta as it arrives, and the parsed object is returned at the end.
+
+    A failed attempt is only retried if no delta was delivered yet. Streams are
+    not hedged, since a duplicate would deliver the same output twice.
+    """
+    received = False
+
+    async def attempt() -> Tuple[str, Any]:
+        nonlocal received
+        stream = await client.chat.completions.create(
+            model=DEFAULT_MODEL,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt},
+            ],
+            response_format={"type": "json_object"},
+            stream=True,
+            stream_options={"include_usage": True},
+            timeout=120.0,
+        )
+        parts: List[str] = []
+        usage_chunk = None
+        async for chunk in stream:
+            if getattr(chunk, "usage", None) is not None:
+                usage_chunk = chunk
+            for choice in chunk.choices:
+                delta = choice.delta.content
+                if delta:
+                    received = True
+                    parts.append(delta)
+                    on_text(delta)
+        return "".join(parts), usage_chunk
+
+    text, usage_chunk = await _with_llm_retries(agent_name, attempt, can_retry=lambda: not received)
+    if usage_chunk is not None:
+        _record_completion_usage(agent_name, usage_chunk)
+    return _parse_agent_json(agent_name, text)
+
+
+def _record_completion_usage(agent_name: str, completion: Any) -> None:
+    usage = getattr(completion, "usage", None)
+    if usage is None:
+        return
+    details = getattr(usage, "prompt_tokens_details", None)
+    prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+    completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+    cached_tokens = getattr(details, "cached_tokens", 0) or 0
+    agent_usage_stats.record(
+        agent_name,
+        completions=1,
+        prompt_tokens=prompt_tokens,
+        completion_tokens=completion_tokens,
+        cached_tokens=cached_tokens,
+    )
+    metrics.AGENT_PROMPT_TOKENS.observe(prompt_tokens, agent=agent_name)
+    metrics.AGENT_COMPLETION_TOKENS.observe(completion_tokens, agent=agent_name)
+    if cached_tokens:
+        metrics.AGENT_CACHED_PROMPT_TOKENS.inc(cached_tokens, agent=agent_name)
+
+
+# "prefix_cache" keeps everything static for an agent (shared rules, role,
+# instructions, JSON shape) at the start of the prompt and the per-request idea
+# and context at the end, so the provider can reuse its cached prompt prefix.
+# "legacy" is the original layout with the instructions after the context.
+AGENT_PROMPT_LAYOUT = os.getenv("AGENT_PROMPT_LAYOUT", "prefix_cache").lower()
+
+AGENT_SYSTEM_PREAMBLE = """
+You are a specialized agent in a multi-agent system that turns product ideas into Web3 project plans.
+You will receive the user's idea plus JSON context from other agents.
+
+Rules:
+- Output only a single JSON object.
+- Do not wrap it in backticks.
+- Do not include explanations outside of the JSON.
+""".strip()
 
 
-def run_agent(
+def _render_agent_prompts(
     name: str,
     description: str,
     idea: IdeaRequest,
     instructions: str,
     shared_context: Dict[str, Any],
-) -> Dict[str, Any]:
-    """
-    Generic agent runner.
-    """
+) -> Tuple[str, str]:
+    context_json = json.dumps(shared_context, separators=(",", ":"), ensure_ascii=False)
+    idea_block = f"""
+User Idea:
+- Idea: {idea.idea}
+- Stage: {idea.stage}
+- Industry: {idea.industry or "unspecified"}
+    """.strip()
+
+    if AGENT_PROMPT_LAYOUT != "legacy":
+        system_prompt = f"""
+{AGENT_SYSTEM_PREAMBLE}
+
+You are '{name}'.
+Your job: {description}.
+
+Your task:
+{instructions.strip()}
+        """.strip()
+        user_prompt = f"""
+{idea_block}
+
+Shared context from other agents (as JSON):
+{context_json}
+        """.strip()
+        return system_prompt, user_prompt
+
     system_prompt = (
         f"You are '{name}', a specialized agent in a multi-agent system. "
         f"Your job: {description}. "
@@ -386,13 +827,10 @@ def run_agent(
     )
 
     user_prompt = f"""
-User Idea:
-- Idea: {idea.idea}
-- Stage: {idea.stage}
-- Industry: {idea.industry or "unspecified"}
+{idea_block}
 
 Shared context from other agents (as JSON):
-{json.dumps(shared_context, indent=2)}
+{context_json}
 
 Your task:
 {instructions}
@@ -402,8 +840,94 @@ Rules:
 - Do not wrap it in backticks.
 - Do not include explanations outside of the JSON.
     """.strip()
+    return system_prompt, user_prompt
+
+
+def _prepare_agent_call(
+    name: str,
+    description: str,
+    idea: IdeaRequest,
+    instructions: str,
+    shared_context: Dict[str, Any],
+) -> Tuple[str, str, str]:
+    """Render the prompts, record their size and return (system, user, cache key)."""
+    system_prompt, user_prompt = _render_agent_prompts(
+        name, description, idea, instructions, shared_context
+    )
+
+    prompt_chars = len(system_prompt) + len(user_prompt)
+    prompt_tokens = _estimate_tokens(system_prompt) + _estimate_tokens(user_prompt)
+    agent_usage_stats.record(
+        name,
+        runs=1,
+        prompt_chars=prompt_chars,
+        prompt_tokens_estimate=prompt_tokens,
+    )
+    logger.info("Agent %s prompt: %d chars (~%d tokens)", name, prompt_chars, prompt_tokens)
+    return system_prompt, user_prompt, AgentCache.make_key(DEFAULT_MODEL, system_prompt, user_prompt)
+
+
+async def run_agent(
+    name: str,
+    description: str,
+    idea: IdeaRequest,
+    instructions: str,
+    shared_context: Dict[str, Any],
+) -> Dict[str, Any]:
+    """
+    Generic agent runner.
+    """
+    system_prompt, user_prompt, cache_key = _prepare_agent_call(
+        name, description, idea, instructions, shared_context
+    )
+
+    # Identical prompts (re-clicked Build, /api/generate-zip re-running the
+    # framework pipeline) are served from the cache instead of the API.
+    cached = await agent_cache.aget(cache_key)
+    if cached is not None:
+        return cached
+
+    with metrics.AGENT_LATENCY_SECONDS.time(agent=name):
+        output = await _call_openai_json(system_prompt, user_prompt, agent_name=name)
+    await agent_cache.aput(cache_key, output)
+    return output
+
+
+async def run_agent_streaming(
+    name: str,
+    description: str,
+    idea: IdeaRequest,
+    instructions: str,
+    shared_context: Dict[str, Any],
+    on_file: Callable[[str, Dict[str, Any]], None],
+) -> Dict[str, Any]:
+    """
+    run_agent for agents whose output is {"<section>": [{"path", "content"}, ...]}.
+    The completion is streamed and `on_file(section, file_obj)` is called as
+    soon as each file object is complete. Cache hits replay every file at once.
+    """
+    system_prompt, user_prompt, cache_key = _prepare_agent_call(
+        name, description, idea, instructions, shared_context
+    )
+
+    cached = await agent_cache.aget(cache_key)
+    if cached is not None:
+        for section, files in cached.items():
+            for file_obj in files if isinstance(files, list) else []:
+                if isinstance(file_obj, dict) and file_obj.get("path"):
+                    on_file(section, file_obj)
+        return cached
 
-    return _call_openai_json(system_prompt, user_prompt)
+    parser = FileObjectStream()
+
+    def on_text(delta: str) -> None:
+        for section, file_obj in parser.feed(delta):
+            on_file(section, file_obj)
+
+    with metrics.AGENT_LATENCY_SECONDS.time(agent=name):
+        output = await _stream_openai_json(system_prompt, user_prompt, name, on_text)
+    await agent_cache.aput(cache_key, output)
+    return output
 
 
 # ---------- Deployment helpers ----------
@@ -431,6 +955,35 @@ def _select_contract_for_deployment(code_plan: Dict[str, Any]) -> Tuple[Optional
     return None, None
 
 
+_IMPORT_RE = re.compile(r"""^\s*import\s+[^;]*?["']([^"']+)["']""", re.MULTILINE)
+
+
+def _select_contracts_for_deployment(code_plan: Dict[str, Any]) -> Dict[str, str]:
+    """
+    Every generated .sol file that compiles on its own: files importing
+    packages (`@openzeppelin/...`), or importing such a file, are left out
+    because node_modules is not available to the backend compiler.
+    """
+    sources = {}
+    for file_obj in code_plan.get("contracts") or []:
+        content = (file_obj.get("content") or "").strip()
+        path = (file_obj.get("path") or "").strip().lstrip("/")
+        if content and path.endswith(".sol"):
+            sources[path] = content
+
+    excluded = {path for path, source in sources.items() if any(i.startswith("@") for i in _IMPORT_RE.findall(source))}
+    changed = True
+    while changed:
+        excluded_names = {Path(path).name for path in excluded}
+        newly = {
+            path for path, source in sources.items()
+            if path not in excluded and any(Path(i).name in excluded_names for i in _IMPORT_RE.findall(source))
+        }
+        excluded |= newly
+        changed = bool(newly)
+    return {path: source for path, source in sources.items() if path not in excluded}
+
+
 def _build_fallback_contract(project_hint: str) -> Tuple[str, str]:
     safe_hint = (project_hint or "Auto-generated project").replace("\n", " ")[:80]
     source = f"""// Fallback contract deployed automatically for: {safe_hint}
@@ -453,7 +1006,7 @@ contract AutoDeployedContract {{
     return "AutoDeployedContract", source
 
 
-def _inject_contract_address(file_content: str, deployment: Dict[str, str]) -> str:
+def _inject_contract_address(file_content: str, deployment: Dict[str, Any]) -> str:
     address = deployment.get("address")
     if not address:
         return file_content
@@ -462,11 +1015,18 @@ def _inject_contract_address(file_content: str, deployment: Dict[str, str]) -> s
         if placeholder in file_content:
             file_content = file_content.replace(placeholder, address)
             replaced = True
+    contracts = deployment.get("contracts") or []
+    for contract in contracts:
+        placeholder = address_placeholder(contract["name"])
+        if placeholder in file_content:
+            file_content = file_content.replace(placeholder, contract["address"])
+            replaced = True
     if not replaced:
-        header = (
-            f"// Auto-generated connection details\n"
-            f"// Deployed contract: {address} on {deployment.get('network', 'testnet')}\n\n"
-        )
+        network = deployment.get("network", "testnet")
+        lines = [f"// Deployed contract: {address} on {network}"]
+        if contracts:
+            lines = [f"// Deployed {c['name']}: {c['address']} on {network}" for c in contracts]
+        header = "// Auto-generated connection details\n" + "\n".join(lines) + "\n\n"
         file_content = header + file_content
     return file_content
 
@@ -483,15 +1043,72 @@ def build_repo_zip(
     """
     Build a GitHub-style repo as a zip, based on the code_plan JSON.
     """
+    with metrics.ZIP_BUILD_SECONDS.time():
+        return _build_repo_zip(framework, code_plan, report_markdown, deployment, deployment_error)
+
+
+def _build_repo_zip(
+    framework: FrameworkResponse,
+    code_plan: Dict[str, Any],
+    report_markdown: str,
+    deployment: Optional[Dict[str, str]],
+    deployment_error: Optional[str],
+) -> bytes:
     buf = io.BytesIO()
     with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
-        # 1) README
-        def bullet_block(items: List[str]) -> str:
-            if not items:
-                return "- (none)"
-            return "\n".join(f"- {item}" for item in items)
+        for path, content in iter_repo_entries(
+            framework, code_plan, report_markdown, deployment, deployment_error
+        ):
+            zf.writestr(path, content)
+
+    buf.seek(0)
+    return buf.getvalue()
+
+
+class _ZipChunkSink:
+    """
+    Write-only, non-seekable file object for zipfile. Compressed bytes pile up
+    here until `drain()` hands them to the response; zipfile notices it cannot
+    seek and writes data descriptors after each entry instead. With a `spool`,
+    every byte is also written (and hashed) into the artifact store.
+    """
+
+    def __init__(self, spool: Optional[ArtifactSpool] = None) -> None:
+        self._chunks: List[bytes] = []
+        self._spool = spool
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        if self._spool is not None:
+            self._spool.write(data)
+        return len(data)
 
-        readme_content = f"""# Auto-generated Web3 Project
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def iter_repo_entries(
+    framework: FrameworkResponse,
+    code_plan: Dict[str, Any],
+    report_markdown: str,
+    deployment: Optional[Dict[str, str]] = None,
+    deployment_error: Optional[str] = None,
+) -> Iterator[Tuple[str, str]]:
+    """
+    Yield (path, content) for every file of the generated repo, in archive order.
+    """
+    # 1) README
+    def bullet_block(items: List[str]) -> str:
+        if not items:
+            return "- (none)"
+        return "\n".join(f"- {item}" for item in items)
+
+    readme_content = f"""# Auto-generated Web3 Project
 
 ## Summary
 
@@ -523,49 +1140,62 @@ def build_repo_zip(
 
 ## On-chain Deployment
 """
-        if deployment:
-            readme_content += (
-                f"This contract has been deployed to **{deployment.get('network', 'testnet')}**.\n\n"
-                f"- Address: `{deployment.get('address')}`\n"
-                f"- Explorer: {deployment.get('explorer_url') or 'N/A'}\n"
-                f"- Tx Hash: {deployment.get('tx_hash') or 'N/A'}\n\n"
-            )
-        elif deployment_error:
-            readme_content += (
-                "Automatic deployment attempted but failed:\n\n"
-                f"> {deployment_error}\n\n"
-                "Use Hardhat scripts in this repo to deploy manually once the issue is resolved.\n\n"
-            )
-        else:
-            readme_content += (
-                "Deployment has not been run yet. Use the provided Hardhat scripts when ready.\n\n"
+    if deployment:
+        readme_content += (
+            f"This contract was {'already deployed' if deployment.get('reused') else 'deployed'} "
+            f"to **{deployment.get('network', 'testnet')}**.\n\n"
+            f"- Address: `{deployment.get('address')}`\n"
+            f"- Explorer: {deployment.get('explorer_url') or 'N/A'}\n"
+            f"- Tx Hash: {deployment.get('tx_hash') or 'N/A'}\n"
+            f"- Status at generation time: {deployment.get('status') or 'confirmed'}\n\n"
+        )
+        contracts = deployment.get("contracts") or []
+        if len(contracts) > 1:
+            readme_content += "All deployed contracts (also in `deployment.json`):\n\n"
+            readme_content += "".join(
+                f"- {c['name']}: `{c['address']}` ({c.get('explorer_url') or 'N/A'})\n" for c in contracts
             )
+            readme_content += "\n"
+        for skipped in deployment.get("skipped") or []:
+            readme_content += f"- Not deployed: {skipped['name']} ({skipped['reason']})\n"
+    elif deployment_error:
+        readme_content += (
+            "Automatic deployment attempted but failed:\n\n"
+            f"> {deployment_error}\n\n"
+            "Use Hardhat scripts in this repo to deploy manually once the issue is resolved.\n\n"
+        )
+    else:
+        readme_content += (
+            "Deployment has not been run yet. Use the provided Hardhat scripts when ready.\n\n"
+        )
 
-        readme_content += f"""---
+    readme_content += f"""---
 
 ## Detailed Report
 
 {report_markdown}
 """
 
-        zf.writestr("README.md", readme_content)
-
-        # 2) Code files from the Code Generator agent
-        for section in ["contracts", "backend", "frontend"]:
-            files = code_plan.get(section, [])
-            for file_obj in files:
-                path = file_obj.get("path")
-                content = file_obj.get("content", "")
-                if not path:
-                    continue
-                normalized_path = path.lstrip("/")
-                if deployment and normalized_path.lower() == "web3/connection.js":
-                    content = _inject_contract_address(content, deployment)
-                zf.writestr(normalized_path, content)
-
-        # 3) If the CodeGen agent didn't create a docs file, add one
-        if "docs/ARCHITECTURE.md" not in zf.namelist():
-            arch = f"""# Architecture Overview
+    yield "README.md", readme_content
+
+    # 2) Code files from the Code Generator agent
+    written = set()
+    for section in ["contracts", "backend", "frontend"]:
+        files = code_plan.get(section, [])
+        for file_obj in files:
+            path = file_obj.get("path")
+            content = file_obj.get("content", "")
+            if not path:
+                continue
+            normalized_path = path.lstrip("/")
+            if deployment and normalized_path.lower() == "web3/connection.js":
+                content = _inject_contract_address(content, deployment)
+            written.add(normalized_path)
+            yield normalized_path, content
+
+    # 3) If the CodeGen agent didn't create a docs file, add one
+    if "docs/ARCHITECTURE.md" not in written:
+        arch = f"""# Architecture Overview
 
 This document describes the architecture generated by the multi-agent system.
 
@@ -576,34 +1206,67 @@ This document describes the architecture generated by the multi-agent system.
 
 Use this as a starting point and extend as needed.
 """
-            zf.writestr("docs/ARCHITECTURE.md", arch)
+        yield "docs/ARCHITECTURE.md", arch
 
-        if deployment:
-            zf.writestr("deployment.json", json.dumps(deployment, indent=2))
-
-    buf.seek(0)
-    return buf.getvalue()
+    if deployment:
+        yield "deployment.json", json.dumps(deployment, indent=2)
 
 
 # ---------- Multi-agent framework pipeline (fast-ish path) ----------
 
-def run_framework_pipeline(idea_req: IdeaRequest) -> Tuple[FrameworkResponse, List[AgentTrace], Dict[str, Any]]:
+@dataclass(frozen=True)
+class AgentSpec:
     """
-    Run all reasoning / design agents needed to build the FrameworkResponse.
-    This does NOT generate code or build the ZIP.
+    Declarative description of one agent in a pipeline.
+    `reads` lists the `shared` keys the agent depends on; its output is stored
+    under `key` once it finishes. `context_paths` optionally narrows what the
+    agent is shown to dotted paths inside those keys (e.g. "chain.web3_library");
+    by default it sees every key in `reads`.
     """
-    shared: Dict[str, Any] = {}
-    traces: List[AgentTrace] = []
+    key: str
+    name: str
+    description: str
+    trace_description: str
+    instructions: str
+    reads: Tuple[str, ...] = ()
+    context_paths: Tuple[str, ...] = ()
+    optional: bool = False
 
-    # 1) Product Planner Agent
-    planner_output = run_agent(
-        name="Product Planner",
-        description=(
-            "Turn the raw idea into a clear product concept with target users, "
-            "problems, value propositions, and success metrics."
-        ),
-        idea=idea_req,
-        instructions="""
+    def context_for(self, shared: Dict[str, Any]) -> Dict[str, Any]:
+        return _slice_context(shared, self.context_paths or self.reads)
+
+
+def _slice_context(context: Dict[str, Any], paths: Tuple[str, ...]) -> Dict[str, Any]:
+    """
+    Copy only the given dotted paths out of `context`, preserving nesting.
+    Missing paths are skipped.
+    """
+    sliced: Dict[str, Any] = {}
+    for path in paths:
+        parts = path.split(".")
+        value: Any = context
+        for part in parts:
+            if not isinstance(value, dict) or part not in value:
+                break
+            value = value[part]
+        else:
+            target = sliced
+            for part in parts[:-1]:
+                target = target.setdefault(part, {})
+            target[parts[-1]] = value
+    return sliced
+
+
+PRODUCT_PLANNER_AGENT = AgentSpec(
+    key="planner",
+    name="Product Planner",
+    description=(
+        "Turn the raw idea into a clear product concept with target users, "
+        "problems, value propositions, and success metrics."
+    ),
+    trace_description="High-level product strategy",
+    reads=(),
+    instructions="""
 Return JSON like:
 {
   "summary": "One paragraph summary of the product (max 80 words).",
@@ -617,25 +1280,20 @@ Constraints:
 - Each array must have AT MOST 4 items.
 - Each item must be a short phrase (max ~12 words).
 - Focus ONLY on the core product and main users, not every possible persona.
-        """,
-        shared_context=shared,
-    )
-    shared["planner"] = planner_output
-    traces.append(AgentTrace(
-        name="Product Planner",
-        description="High-level product strategy",
-        output=planner_output
-    ))
-
-    # 2) Blockchain Architect Agent
-    chain_output = run_agent(
-        name="Blockchain Architect",
-        description=(
-            "Choose a chain, token model, and high-level Web3 integration for the product. "
-            "Optimize for the chosen ecosystem and developer experience when relevant."
-        ),
-        idea=idea_req,
-          instructions="""
+    """,
+)
+
+
+BLOCKCHAIN_ARCHITECT_AGENT = AgentSpec(
+    key="chain",
+    name="Blockchain Architect",
+    description=(
+        "Choose a chain, token model, and high-level Web3 integration for the product. "
+        "Optimize for the chosen ecosystem and developer experience when relevant."
+    ),
+    trace_description="Chain / tokenomics / Web3 flows",
+    reads=("planner",),
+    instructions="""
 Using the 'planner' output and the raw idea, choose the BEST chain and Web3 stack for this specific product.
 
 Your responsibilities:
@@ -698,25 +1356,30 @@ Constraints:
 - "web3_integration": MAX 4 items, each a short phrase.
 - If you include "alternative_chains", keep it to at most 2 items.
 - Always set "token_and_governance.need_token" explicitly to true or false.
-        """,
-        shared_context=shared,
-    )
-    shared["chain"] = chain_output
-    traces.append(AgentTrace(
-        name="Blockchain Architect",
-        description="Chain / tokenomics / Web3 flows",
-        output=chain_output
-    ))
-
-    # 3) Full-Stack Architect Agent
-    app_output = run_agent(
-        name="Full-Stack Architect",
-        description=(
-            "Design the required frontend components, backend services, APIs, and data flows "
-            "to implement the product, including where Web3 interactions live."
-        ),
-        idea=idea_req,
-        instructions="""
+    """,
+)
+
+
+FULL_STACK_ARCHITECT_AGENT = AgentSpec(
+    key="app",
+    name="Full-Stack Architect",
+    description=(
+        "Design the required frontend components, backend services, APIs, and data flows "
+        "to implement the product, including where Web3 interactions live."
+    ),
+    trace_description="Frontend + backend + API design",
+    reads=("planner", "chain"),
+    context_paths=(
+        "planner.summary",
+        "planner.user_segments",
+        "planner.value_proposition",
+        "planner.problems",
+        "chain.recommended_chain",
+        "chain.web3_library",
+        "chain.web3_integration",
+        "chain.token_and_governance",
+    ),
+    instructions="""
 Using 'planner' and 'chain' outputs, design the app architecture.
 
 Return JSON like:
@@ -745,25 +1408,30 @@ Constraints:
 - backend_services: MAX 5 items.
 - api_endpoints: MAX 5 endpoints, but try to keep these as minimal as possible like around 4.
 - next_steps: MAX 5 steps. Focus on the shortest path to MVP, not long roadmaps.
-        """,
-        shared_context=shared,
-    )
-    shared["app"] = app_output
-    traces.append(AgentTrace(
-        name="Full-Stack Architect",
-        description="Frontend + backend + API design",
-        output=app_output
-    ))
-
-    # 4) Smart Contract Engineer Agent
-    contracts_output = run_agent(
-        name="Smart Contract Engineer",
-        description=(
-            "Propose the concrete smart contracts needed and their responsibilities. "
-            "Keep them minimal but realistic for a testnet deployment."
-        ),
-        idea=idea_req,
-        instructions="""
+    """,
+)
+
+
+SMART_CONTRACT_ENGINEER_AGENT = AgentSpec(
+    key="contracts",
+    name="Smart Contract Engineer",
+    description=(
+        "Propose the concrete smart contracts needed and their responsibilities. "
+        "Keep them minimal but realistic for a testnet deployment."
+    ),
+    trace_description="On-chain contract design",
+    reads=("planner", "chain", "app"),
+    context_paths=(
+        "planner.summary",
+        "planner.value_proposition",
+        "chain.recommended_chain",
+        "chain.web3_integration",
+        "chain.token_and_governance",
+        "app.frontend_components",
+        "app.backend_services",
+        "app.api_endpoints",
+    ),
+    instructions="""
 Using 'planner', 'chain', and 'app' outputs, design the smart contracts.
 
 Return JSON like:
@@ -791,26 +1459,29 @@ Constraints:
 - key_functions: MAX 5 per contract.
 - events: MAX 5 per contract.
 - Only include contracts that are absolutely necessary for the core product.
-        """,
-        shared_context=shared,
-    )
-    shared["contracts"] = contracts_output
-    traces.append(AgentTrace(
-        name="Smart Contract Engineer",
-        description="On-chain contract design",
-        output=contracts_output
-    ))
-
-    # 5) Tokenomics Designer Agent (optional)
-    try:
-        tokenomics_output = run_agent(
-            name="Tokenomics Designer",
-            description=(
-                "Design a simple, sane token distribution for the protocol, only if "
-                "a token actually makes sense based on the planner + chain outputs."
-            ),
-            idea=idea_req,
-                instructions="""
+    """,
+)
+
+
+TOKENOMICS_DESIGNER_AGENT = AgentSpec(
+    key="tokenomics",
+    name="Tokenomics Designer",
+    description=(
+        "Design a simple, sane token distribution for the protocol, only if "
+        "a token actually makes sense based on the planner + chain outputs."
+    ),
+    trace_description="Simple token distribution (if a token is needed)",
+    reads=("planner", "chain"),
+    context_paths=(
+        "planner.summary",
+        "planner.user_segments",
+        "planner.value_proposition",
+        "chain.recommended_chain",
+        "chain.rationale",
+        "chain.token_and_governance",
+    ),
+    optional=True,
+    instructions="""
 Using 'planner' and 'chain' outputs:
 
 First, inspect `chain.token_and_governance.need_token` if it is present in the shared context.
@@ -856,18 +1527,130 @@ Constraints:
   * Percents should roughly add up to 100; the backend will normalize them.
   * tokenSymbol: 3–10 uppercase letters, project-appropriate.
   * Make allocations and healthSummary consistent with the specific product and chain context.
-            """,
-            shared_context=shared,
-        )
-        shared["tokenomics"] = tokenomics_output
-        traces.append(AgentTrace(
-            name="Tokenomics Designer",
-            description="Simple token distribution (if a token is needed)",
-            output=tokenomics_output
-        ))
-    except Exception as e:
-        print(f"Tokenomics agent error: {e}")
-        shared["tokenomics"] = None
+    """,
+)
+
+
+FRAMEWORK_AGENTS: List[AgentSpec] = [
+    PRODUCT_PLANNER_AGENT,
+    BLOCKCHAIN_ARCHITECT_AGENT,
+    FULL_STACK_ARCHITECT_AGENT,
+    SMART_CONTRACT_ENGINEER_AGENT,
+    TOKENOMICS_DESIGNER_AGENT,
+]
+
+
+async def _run_agent_graph(
+    idea_req: IdeaRequest,
+    specs: List[AgentSpec],
+    shared: Dict[str, Any],
+    on_trace: Optional[Callable[[AgentTrace], Awaitable[None]]] = None,
+) -> List[AgentTrace]:
+    """
+    Run agents as a dependency graph: every agent starts as soon as the `shared`
+    keys it reads are available, so independent agents run concurrently.
+    Outputs are written into `shared`; traces are returned in `specs` order.
+    Optional agents that fail store None instead of aborting the pipeline.
+    `on_trace` is awaited with each trace as soon as its agent finishes.
+    """
+    provided = set(shared) | {spec.key for spec in specs}
+    for spec in specs:
+        missing = [key for key in spec.reads if key not in provided]
+        if missing:
+            raise ValueError(f"Agent '{spec.name}' reads unknown context keys: {missing}")
+        unread = [path for path in spec.context_paths if path.split(".", 1)[0] not in spec.reads]
+        if unread:
+            raise ValueError(f"Agent '{spec.name}' context paths outside its reads: {unread}")
+
+    outputs: Dict[str, Optional[Dict[str, Any]]] = {}
+    pending = list(specs)
+    running: Dict[asyncio.Task, AgentSpec] = {}
+    try:
+        while pending or running:
+            for spec in [s for s in pending if all(key in shared for key in s.reads)]:
+                pending.remove(spec)
+                context = spec.context_for(shared)
+                task = asyncio.create_task(run_agent(
+                    name=spec.name,
+                    description=spec.description,
+                    idea=idea_req,
+                    instructions=spec.instructions,
+                    shared_context=context,
+                ))
+                running[task] = spec
+            if not running:
+                raise ValueError(f"Agent graph has a dependency cycle: {[s.name for s in pending]}")
+
+            done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                spec = running.pop(task)
+                try:
+                    output = task.result()
+                except Exception as e:
+                    if not spec.optional:
+                        raise
+                    print(f"{spec.name} agent error: {e}")
+                    output = None
+                shared[spec.key] = output
+                outputs[spec.key] = output
+                if on_trace and output is not None:
+                    await on_trace(_agent_trace(spec, output))
+    finally:
+        for task in running:
+            task.cancel()
+
+    return [
+        _agent_trace(spec, outputs[spec.key])
+        for spec in specs
+        if outputs.get(spec.key) is not None
+    ]
+
+
+def _agent_trace(spec: AgentSpec, output: Dict[str, Any]) -> AgentTrace:
+    return AgentTrace(name=spec.name, description=spec.trace_description, output=output)
+
+
+# Identical generation requests that arrive while one is already running share
+# its result instead of starting their own pipeline.
+_pipeline_flights = SingleFlight()
+
+
+def _idea_flight_key(idea_req: IdeaRequest) -> str:
+    def normalize(value: Optional[str]) -> str:
+        return " ".join((value or "").split()).casefold()
+
+    parts = [normalize(idea_req.idea), normalize(idea_req.stage), normalize(idea_req.industry)]
+    return hashlib.sha256(json.dumps(parts).encode("utf-8")).hexdigest()
+
+
+async def run_framework_pipeline(
+    idea_req: IdeaRequest,
+    on_trace: Optional[Callable[[AgentTrace], Awaitable[None]]] = None,
+) -> Tuple[FrameworkResponse, List[AgentTrace], Dict[str, Any]]:
+    """
+    Run all reasoning / design agents needed to build the FrameworkResponse.
+    This does NOT generate code or build the ZIP.
+
+    Concurrent calls with the same normalized (idea, stage, industry) join a
+    single in-flight run. Streaming callers (`on_trace`) always run their own.
+    """
+    if on_trace is not None:
+        return await _run_framework_pipeline(idea_req, on_trace)
+    key = f"framework:{_idea_flight_key(idea_req)}"
+    return await _pipeline_flights.do(key, lambda: _run_framework_pipeline(idea_req))
+
+
+async def _run_framework_pipeline(
+    idea_req: IdeaRequest,
+    on_trace: Optional[Callable[[AgentTrace], Awaitable[None]]] = None,
+) -> Tuple[FrameworkResponse, List[AgentTrace], Dict[str, Any]]:
+    """
+    Agents run as a graph (see FRAMEWORK_AGENTS): Tokenomics only needs the
+    planner and chain outputs, so it runs alongside the Full-Stack / Smart
+    Contract branch.
+    """
+    shared: Dict[str, Any] = {}
+    traces = await _run_agent_graph(idea_req, FRAMEWORK_AGENTS, shared, on_trace=on_trace)
 
     # ---------- Build final framework object ----------
 
@@ -896,26 +1679,33 @@ Constraints:
 
 # ---------- Code generation + zip pipeline (slow path) ----------
 
-def run_code_generation_pipeline(
+async def run_code_generation_pipeline(
     idea_req: IdeaRequest,
     framework: FrameworkResponse
-) -> Tuple[Dict[str, Any], Dict[str, Any]]:
-    """
-    Use the high-level framework to generate concrete code files + security review.
-    This is only called when the user clicks 'Download ZIP'.
+) -> Dict[str, Any]:
     """
-    shared: Dict[str, Any] = {
-        "framework": framework.model_dump()
-    }
+    Use the high-level framework to generate concrete code files.
+    This is only called when the user clicks 'Download ZIP'; the security review
+    runs separately (see run_security_audit) so it can overlap deployment.
 
-    # Code Generator Agent
-    code_output = run_agent(
-        name="Code Generator",
-        description=(
-            "Generate a JSON plan of minimal but runnable code files for smart contracts and a simple app."
-        ),
-        idea=idea_req,
-        instructions="""
+    Concurrent calls for the same idea and framework join a single in-flight run.
+    """
+    framework_hash = hashlib.sha256(
+        json.dumps(framework.model_dump(), sort_keys=True).encode("utf-8")
+    ).hexdigest()
+    key = f"code:{_idea_flight_key(idea_req)}:{framework_hash}"
+    return await _pipeline_flights.do(key, lambda: _run_code_generation_pipeline(idea_req, framework))
+
+
+CODE_GENERATOR_AGENT = AgentSpec(
+    key="code",
+    name="Code Generator",
+    description=(
+        "Generate a JSON plan of minimal but runnable code files for smart contracts and a simple app."
+    ),
+    trace_description="Generated source files",
+    reads=("framework",),
+    instructions="""
 Using the 'framework' object (summary, user_segments, value_proposition, recommended_chain,
 smart_contracts, frontend_components, backend_services, web3_integration, next_steps):
 
@@ -927,13 +1717,12 @@ Generate a JSON plan of concrete source files that ALWAYS follow this repo struc
 - contracts/TicketValidator.sol
 - frontend/src/main.tsx
 - frontend/src/App.tsx
-- hardhat.config.js
-- package.json
-- scripts/deploy.js
-- test/smoke.test.js
-- web3/connection.js
 - README.md (optional, only if useful)
 
+The backend renders the Hardhat config, package.json, deploy script, smoke test,
+frontend/index.html and web3/connection.js itself; do NOT include them.
+""" + CONNECTION_API + """
+
 Return JSON EXACTLY like this shape:
 
 {
@@ -955,26 +1744,6 @@ Return JSON EXACTLY like this shape:
     {
       "path": "backend/main.py",
       "content": "# FastAPI backend exposing minimal endpoints used by the frontend..."
-    },
-    {
-      "path": "hardhat.config.js",
-      "content": "// Hardhat config for compiling and deploying the contracts..."
-    },
-    {
-      "path": "package.json",
-      "content": "{ /* npm scripts for hardhat, tests, and frontend dev */ }"
-    },
-    {
-      "path": "scripts/deploy.js",
-      "content": "// Script to deploy the contracts using Hardhat..."
-    },
-    {
-      "path": "test/smoke.test.js",
-      "content": "// Basic smoke test to ensure contracts deploy and core functions work..."
-    },
-    {
-      "path": "web3/connection.js",
-      "content": "// Helper to connect to the deployed contracts from the frontend..."
     }
   ],
   "frontend": [
@@ -994,24 +1763,33 @@ Constraints:
 - All paths must be relative to the repo root exactly as written above.
 - The Solidity code must be syntactically valid and compilable by Hardhat with Solidity ^0.8.x.
 - The Python backend must be valid and runnable (no pseudo-code).
-- The JS/TS files must be valid TypeScript/JavaScript.
+- The TS/TSX files must be valid TypeScript.
 - Keep each file reasonably short and focused; do not bloat the code.
 - Do NOT add extra top-level sections to the JSON (only 'contracts', 'backend', 'frontend').
 - Do NOT change the keys or structure of the JSON.
-        """,
-        shared_context=shared,
-    )
-    shared["code"] = code_output
+    """,
+)
 
-    # Security Auditor Agent
-    security_output = run_agent(
-        name="Security Auditor",
-        description=(
-            "Review the proposed smart contracts and generated code for common Web3 security issues "
-            "and provide a concise risk assessment."
-        ),
-        idea=idea_req,
-        instructions="""
+
+SECURITY_AUDITOR_AGENT = AgentSpec(
+    key="security",
+    name="Security Auditor",
+    description=(
+        "Review the proposed smart contracts and generated code for common Web3 security issues "
+        "and provide a concise risk assessment."
+    ),
+    trace_description="Security review of the generated code",
+    reads=("framework", "code"),
+    # The frontend files carry little audit signal and are the bulk of the code.
+    context_paths=(
+        "framework.summary",
+        "framework.recommended_chain",
+        "framework.smart_contracts",
+        "framework.web3_integration",
+        "code.contracts",
+        "code.backend",
+    ),
+    instructions="""
 Using the 'framework' and 'code' outputs, perform a high-level security review.
 
 Return JSON like:
@@ -1033,32 +1811,254 @@ Constraints:
 - warnings: MAX 3 items.
 - recommendations: MAX 3 items.
 - Each item must be 1 concise sentence focused on the most important risks.
-        """,
-        shared_context=shared,
+    """,
+)
+
+
+# ---------- Per-section code generation ----------
+
+# "sections" generates contracts, backend and frontend as parallel calls that
+# share the framework context; "single" uses one Code Generator call for all.
+CODEGEN_MODE = os.getenv("CODEGEN_MODE", "sections").lower()
+
+CODE_SECTION_FILES: Dict[str, List[str]] = {
+    "contracts": [
+        "contracts/TicketNFT.sol",
+        "contracts/TicketMarketplace.sol",
+        "contracts/TicketValidator.sol",
+    ],
+    # Hardhat config, package.json, scripts and web3/connection.js come from
+    # repo_templates (see TEMPLATE_PATHS), not from the model.
+    "backend": [
+        "backend/main.py",
+    ],
+    "frontend": [
+        "frontend/src/main.tsx",
+        "frontend/src/App.tsx",
+    ],
+}
+
+CODE_SECTION_RULES: Dict[str, str] = {
+    "contracts": "- The Solidity code must be syntactically valid and compilable by Hardhat with Solidity ^0.8.x.",
+    "backend": "- The Python backend must be valid and runnable (no pseudo-code).",
+    "frontend": (
+        "- The TS/TSX files must be valid TypeScript.\n"
+        "- The React app should talk to the contracts through web3/connection.js.\n"
+        + CONNECTION_API
+    ),
+}
+
+
+def _code_section_instructions(section: str) -> str:
+    all_files = "\n".join(
+        [f"- {path}" for files in CODE_SECTION_FILES.values() for path in files]
+        + [f"- {path} (rendered by the backend)" for path in TEMPLATE_PATHS]
+    )
+    own_files = "\n".join(f"- {path}" for path in CODE_SECTION_FILES[section])
+    example = ",\n".join(
+        f'    {{\n      "path": "{path}",\n      "content": "/* full file contents */"\n    }}'
+        for path in CODE_SECTION_FILES[section]
     )
+    return f"""
+Using the 'framework' object (summary, user_segments, value_proposition, recommended_chain,
+smart_contracts, frontend_components, backend_services, web3_integration, next_steps):
 
-    return code_output, security_output
+The generated repo ALWAYS has this structure; other agents and the backend write the remaining
+files in parallel, so reference them by exactly these paths and contract names:
 
+{all_files}
 
-# ---------- Endpoints ----------
+You write ONLY the '{section}' section:
 
-@app.post("/api/generate-framework", response_model=MultiAgentResult)
-def generate_framework(idea_req: IdeaRequest) -> MultiAgentResult:
+{own_files}
+
+Return JSON EXACTLY like this shape:
+
+{{
+  "{section}": [
+{example}
+  ]
+}}
+
+Constraints:
+- You MUST use exactly those paths and filenames.
+- All paths must be relative to the repo root exactly as written above.
+{CODE_SECTION_RULES[section]}
+- Keep each file reasonably short and focused; do not bloat the code.
+- Do NOT add any top-level key other than '{section}'.
+"""
+
+
+CODE_SECTION_AGENTS: List[AgentSpec] = [
+    AgentSpec(
+        key=f"code_{section}",
+        name=f"Code Generator ({section})",
+        description=(
+            f"Generate the {section} files of a minimal but runnable Web3 project as a JSON plan."
+        ),
+        trace_description=f"Generated {section} files",
+        reads=("framework",),
+        instructions=_code_section_instructions(section),
+    )
+    for section in CODE_SECTION_FILES
+]
+
+
+def _merge_code_sections(shared: Dict[str, Any]) -> Dict[str, Any]:
+    """Combine per-section outputs into the single Code Generator shape."""
+    code_plan: Dict[str, Any] = {}
+    for section in CODE_SECTION_FILES:
+        output = shared.get(f"code_{section}") or {}
+        files = output.get(section)
+        code_plan[section] = files if isinstance(files, list) else []
+    return code_plan
+
+
+def _add_rendered_files(
+    code_plan: Dict[str, Any],
+    framework: FrameworkResponse,
+) -> List[Tuple[str, Dict[str, str]]]:
     """
-    FAST PATH:
-    Orchestrates multiple agents to:
-    1) Plan the product
-    2) Design the blockchain architecture
-    3) Design frontend/backend + Web3 flows
-    4) Propose concrete smart contracts
-    5) Design tokenomics (if relevant)
+    Put the locally rendered boilerplate (repo_templates) into `code_plan`,
+    replacing any model-written file at the same path. Returns (section, file)
+    pairs for the rendered files.
+    """
+    template_paths = set(TEMPLATE_PATHS)
+    for section, files in code_plan.items():
+        if isinstance(files, list):
+            code_plan[section] = [
+                f for f in files
+                if not (isinstance(f, dict) and (f.get("path") or "").lstrip("/") in template_paths)
+            ]
+    rendered = []
+    contracts = code_plan.get("contracts") or []
+    for file_obj in render_repo_files(framework.recommended_chain, framework.web3_library, contracts):
+        section = "frontend" if file_obj["path"].startswith("frontend/") else "backend"
+        code_plan.setdefault(section, []).append(file_obj)
+        rendered.append((section, file_obj))
+    return rendered
 
-    Does NOT generate code or ZIP. That happens in /api/generate-zip.
+
+async def _run_code_generation_pipeline(
+    idea_req: IdeaRequest,
+    framework: FrameworkResponse
+) -> Dict[str, Any]:
+    shared: Dict[str, Any] = {
+        "framework": framework.model_dump()
+    }
+    if CODEGEN_MODE == "sections":
+        # Wall time is the slowest section instead of one call emitting every file.
+        await _run_agent_graph(idea_req, CODE_SECTION_AGENTS, shared)
+        code_plan = _merge_code_sections(shared)
+    else:
+        await _run_agent_graph(idea_req, [CODE_GENERATOR_AGENT], shared)
+        code_plan = shared["code"]
+    _add_rendered_files(code_plan, framework)
+    return code_plan
+
+
+async def stream_code_generation(
+    idea_req: IdeaRequest,
+    framework: FrameworkResponse,
+    on_file: Callable[[str, Dict[str, Any]], None],
+) -> Dict[str, Any]:
+    """
+    run_code_generation_pipeline with streamed completions: `on_file(section,
+    file_obj)` is called for every file as soon as the model has finished it,
+    and the merged code plan is returned at the end. Not coalesced with
+    identical requests, since every caller needs its own callbacks.
+    """
+    shared: Dict[str, Any] = {
+        "framework": framework.model_dump()
+    }
+    if CODEGEN_MODE == "sections":
+        specs = CODE_SECTION_AGENTS
+    else:
+        specs = [CODE_GENERATOR_AGENT]
+    started = time.perf_counter()
+    first_file = True
+
+    def emitter(spec: AgentSpec) -> Callable[[str, Dict[str, Any]], None]:
+        # Section agents only contribute their own section to the merged plan.
+        sections = {spec.key[len("code_"):]} if spec in CODE_SECTION_AGENTS else set(CODE_SECTION_FILES)
+
+        def emit(section: str, file_obj: Dict[str, Any]) -> None:
+            nonlocal first_file
+            if section not in sections or file_obj["path"].lstrip("/") in TEMPLATE_PATHS:
+                return
+            if first_file:
+                first_file = False
+                metrics.CODEGEN_FIRST_FILE_SECONDS.observe(time.perf_counter() - started)
+            on_file(section, file_obj)
+
+        return emit
+
+    tasks = [
+        asyncio.create_task(run_agent_streaming(
+            name=spec.name,
+            description=spec.description,
+            idea=idea_req,
+            instructions=spec.instructions,
+            shared_context=spec.context_for(shared),
+            on_file=emitter(spec),
+        ))
+        for spec in specs
+    ]
+    try:
+        outputs = await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+    for spec, output in zip(specs, outputs):
+        shared[spec.key] = output
+    if CODEGEN_MODE == "sections":
+        code_plan = _merge_code_sections(shared)
+    else:
+        code_plan = shared["code"]
+    # Rendered files need the finished contracts (names, constructors).
+    for section, file_obj in _add_rendered_files(code_plan, framework):
+        on_file(section, file_obj)
+    return code_plan
+
+
+async def run_security_audit(
+    idea_req: IdeaRequest,
+    framework: FrameworkResponse,
+    code_output: Dict[str, Any]
+) -> Dict[str, Any]:
     """
-    framework, traces, shared = run_framework_pipeline(idea_req)
+    Review the generated code. Nothing downstream (compile, deploy, zip) reads
+    the report, so callers run this alongside those steps and join at the end.
+    """
+    shared: Dict[str, Any] = {
+        "framework": framework.model_dump(),
+        "code": code_output,
+    }
+    await _run_agent_graph(idea_req, [SECURITY_AUDITOR_AGENT], shared)
+    return shared["security"]
+
+
+async def _join_security_audit(audit: Awaitable[Dict[str, Any]]) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """
+    Wait for an audit started alongside deployment. By then the contract may be
+    broadcast and the archive stored, so a failed audit is returned as
+    (None, error) instead of failing the whole request.
+    """
+    try:
+        return await audit, None
+    except Exception as exc:
+        logger.warning("Security audit failed: %s", exc)
+        return None, _error_detail(exc)
+
+
+def _error_detail(exc: BaseException) -> str:
+    return getattr(exc, "detail", None) or str(exc)
 
-    # Normalize tokenomics output (if present)
-    tokenomics_data = shared.get("tokenomics")
+
+# ---------- Endpoints ----------
+
+def _normalize_tokenomics(tokenomics_data: Optional[Dict[str, Any]]) -> None:
+    """Rescale tokenomics allocation percents (in place) so they sum to 100."""
     if tokenomics_data and isinstance(tokenomics_data, dict) and tokenomics_data.get("hasToken") is True:
         allocations = tokenomics_data.get("allocations", [])
         if allocations:
@@ -1069,6 +2069,14 @@ def generate_framework(idea_req: IdeaRequest) -> MultiAgentResult:
                         alloc["percent"] = round((alloc["percent"] / max(total_percent, 1)) * 100, 1)
                 allocations[-1]["percent"] = 100 - sum(a.get("percent", 0) for a in allocations[:-1])
 
+
+async def _build_framework_result(
+    idea_req: IdeaRequest,
+    on_trace: Optional[Callable[[AgentTrace], Awaitable[None]]] = None,
+) -> MultiAgentResult:
+    framework, traces, shared = await run_framework_pipeline(idea_req, on_trace=on_trace)
+    _normalize_tokenomics(shared.get("tokenomics"))
+
     return MultiAgentResult(
         framework=framework,
         agent_traces=traces,
@@ -1077,64 +2085,725 @@ def generate_framework(idea_req: IdeaRequest) -> MultiAgentResult:
     )
 
 
+def _sse_event(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.post("/api/generate-framework", response_model=MultiAgentResult)
+async def generate_framework(idea_req: IdeaRequest) -> MultiAgentResult:
+    """
+    FAST PATH:
+    Orchestrates multiple agents to:
+    1) Plan the product
+    2) Design the blockchain architecture
+    3) Design frontend/backend + Web3 flows
+    4) Propose concrete smart contracts
+    5) Design tokenomics (if relevant)
+
+    Does NOT generate code or ZIP. That happens in /api/generate-zip.
+    """
+    return await _build_framework_result(idea_req)
+
+
+@app.post("/api/generate-framework/stream")
+async def generate_framework_stream(idea_req: IdeaRequest) -> StreamingResponse:
+    """
+    Streaming variant of /api/generate-framework using Server-Sent Events.
+
+    Events:
+    - `trace`: one AgentTrace, sent as soon as that agent finishes
+    - `result`: the final MultiAgentResult (framework + normalized tokenomics)
+    - `error`: {"detail", "status_code"} if the pipeline fails
+
+    Comment lines are sent while agents are running so proxies see traffic
+    long before the full pipeline completes.
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def on_trace(trace: AgentTrace) -> None:
+        await queue.put(("trace", trace.model_dump()))
+
+    async def produce() -> None:
+        try:
+            result = await _build_framework_result(idea_req, on_trace=on_trace)
+            await queue.put(("result", result.model_dump()))
+        except HTTPException as exc:
+            await queue.put(("error", {"detail": exc.detail, "status_code": exc.status_code}))
+        except Exception as exc:
+            logger.exception("Streaming framework generation failed")
+            await queue.put(("error", {"detail": str(exc), "status_code": 500}))
+        finally:
+            await queue.put(None)
+
+    async def event_stream():
+        producer = asyncio.create_task(produce())
+        try:
+            yield ": stream opened\n\n"
+            while True:
+                try:
+                    item = await asyncio.wait_for(queue.get(), timeout=SSE_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if item is None:
+                    break
+                event, data = item
+                yield _sse_event(event, data)
+        finally:
+            # Client disconnected (or we are done): stop any agents still running.
+            producer.cancel()
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+MINIMAL_REPORT = (
+    "## Auto-Generated Web3 Project\n\n"
+    "This project was generated by a multi-agent pipeline (planner, chain architect, "
+    "app architect, contracts, code, and security). Use this repo as a starting point "
+    "and customize it for your real product."
+)
+
+
+async def _resolve_framework(zip_req: ZipRequest) -> FrameworkResponse:
+    # If frontend didn't send back the framework, we can re-run it here:
+    if zip_req.framework is None:
+        framework, _, _ = await run_framework_pipeline(zip_req)
+        return framework
+    return zip_req.framework
+
+
+async def _deploy_generated_contract(
+    zip_req: ZipRequest,
+    framework: FrameworkResponse,
+    code_output: Dict[str, Any],
+) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """
+    Deploy the generated contracts (every one with DEPLOY_ALL_CONTRACTS, else
+    the first), or the fallback contract. Returns (details, error).
+    """
+    deployment_details: Optional[Dict[str, Any]] = None
+    deployment_error: Optional[str] = None
+    try:
+        # Compilation and RPC calls are blocking; keep them off the event loop.
+        sources = _select_contracts_for_deployment(code_output) if DEPLOY_ALL_CONTRACTS else {}
+        if sources:
+            deployment_details = await deploy_contracts(sources, zip_req.force_redeploy)
+        else:
+            contract_name, solidity_source = _select_contract_for_deployment(code_output)
+            if solidity_source:
+                lower_source = solidity_source.lower()
+                if 'import "@' in lower_source or "import '@" in lower_source:
+                    logger.info("Detected external imports in contract. Using fallback deployment contract.")
+                    contract_name, solidity_source = _build_fallback_contract(
+                        zip_req.idea or framework.summary or "Auto project"
+                    )
+            if solidity_source:
+                deployment_details = await run_in_threadpool(
+                    deploy_contract, solidity_source, contract_name, zip_req.force_redeploy
+                )
+    except DeploymentSkipped as skipped:
+        logger.info("Skipping deployment: %s", skipped)
+    except Exception as exc:
+        deployment_error = str(exc)
+        logger.error("Contract deployment failed: %s", exc)
+    return deployment_details, deployment_error
+
+
 @app.post("/api/generate-zip", response_model=ZipResponse)
-def generate_zip(zip_req: ZipRequest) -> ZipResponse:
+async def generate_zip(
+    zip_req: ZipRequest,
+    authorization: Optional[str] = Header(default=None)
+) -> ZipResponse:
     """
     SLOW PATH:
     Triggered only when the user clicks "Download ZIP".
 
     Uses the high-level framework (from /api/generate-framework, if provided)
     to generate code + security review, then builds and returns a base64 ZIP.
+    The archive is also kept in the artifact store (see /api/artifacts).
     """
-    # If frontend didn't send back the framework, we can re-run it here:
-    if zip_req.framework is None:
-        framework, _, _ = run_framework_pipeline(zip_req)
-    else:
-        framework = zip_req.framework
+    framework = await _resolve_framework(zip_req)
 
-    # Generate code + security review
-    code_output, security_output = run_code_generation_pipeline(zip_req, framework)
+    code_output = await run_code_generation_pipeline(zip_req, framework)
 
-    deployment_details: Optional[Dict[str, str]] = None
-    deployment_error: Optional[str] = None
-    contract_name, solidity_source = _select_contract_for_deployment(code_output)
-    if solidity_source:
-        lower_source = solidity_source.lower()
-        if 'import "@' in lower_source or "import '@" in lower_source:
-            logger.info("Detected external imports in contract. Using fallback deployment contract.")
-            contract_name, solidity_source = _build_fallback_contract(zip_req.idea or framework.summary or "Auto project")
-
-    if solidity_source:
-        try:
-            deployment_details = deploy_contract(solidity_source, contract_name)
-        except DeploymentSkipped as skipped:
-            logger.info("Skipping deployment: %s", skipped)
-        except Exception as exc:
-            deployment_error = str(exc)
-            logger.error("Contract deployment failed: %s", exc)
-
-    minimal_report = (
-        "## Auto-Generated Web3 Project\n\n"
-        "This project was generated by a multi-agent pipeline (planner, chain architect, "
-        "app architect, contracts, code, and security). Use this repo as a starting point "
-        "and customize it for your real product."
-    )
-
-    zip_bytes = build_repo_zip(
-        framework,
-        code_output,
-        minimal_report,
-        deployment=deployment_details,
-        deployment_error=deployment_error,
-    )
+    # The audit only reads the code, so it runs while we compile, deploy and zip.
+    audit_task = asyncio.create_task(run_security_audit(zip_req, framework, code_output))
+    try:
+        deployment_details, deployment_error = await _deploy_generated_contract(zip_req, framework, code_output)
+
+        zip_bytes = await run_in_threadpool(
+            build_repo_zip,
+            framework,
+            code_output,
+            MINIMAL_REPORT,
+            deployment=deployment_details,
+            deployment_error=deployment_error,
+        )
+        user_id = await run_in_threadpool(get_user_id_from_token, authorization) if authorization else None
+        artifact = await run_in_threadpool(
+            artifact_store.put, zip_bytes, user_id=user_id, project_id=zip_req.project_id
+        )
+        security_output, security_error = await _join_security_audit(audit_task)
+    finally:
+        audit_task.cancel()
     zip_b64 = base64.b64encode(zip_bytes).decode("utf-8")
 
     return ZipResponse(
         zip_base64=zip_b64,
         security_report=security_output,
+        security_report_error=security_error,
         deployment=deployment_details,
         deployment_error=deployment_error,
+        artifact_id=artifact["id"],
+        artifact_url=_artifact_url(artifact["id"], user_id),
+    )
+
+
+# ---------- Streaming ZIP download ----------
+
+GENERATION_REPORTS_MAX = int(os.getenv("GENERATION_REPORTS_MAX", "256"))
+
+# Written only once the deployment address is known.
+HELD_BACK_PATHS = {"web3/connection.js"}
+
+# generation_id -> progress, audit task and deployment outcome, for the report endpoint.
+_generation_reports: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+
+def _log_audit_failure(task: asyncio.Task) -> None:
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning("Security audit failed: %s", task.exception())
+
+
+def _start_generation(generation_id: str) -> Dict[str, Any]:
+    entry: Dict[str, Any] = {
+        "stage": "code",
+        "files": [],
+        "error": None,
+        "audit": None,
+        "deployment": None,
+        "deployment_error": None,
+        "artifact_id": None,
+        "artifact_url": None,
+        "finished": asyncio.Event(),
+    }
+    _generation_reports[generation_id] = entry
+    while len(_generation_reports) > GENERATION_REPORTS_MAX:
+        _generation_reports.popitem(last=False)
+    return entry
+
+
+async def _stream_generated_zip(
+    zip_req: ZipRequest,
+    framework: FrameworkResponse,
+    progress: Dict[str, Any],
+    user_id: Optional[str] = None,
+) -> AsyncIterator[bytes]:
+    """
+    Generate code, deploy and zip as one pipeline feeding the response: each
+    file goes into the archive (and `progress`) as soon as the model finishes
+    it. The README, web3/connection.js and deployment.json depend on the
+    deployment, so they are written last. The finished archive is also kept
+    in the artifact store.
+    """
+    spool = await run_in_threadpool(artifact_store.spool)
+    sink = _ZipChunkSink(spool)
+    zf = zipfile.ZipFile(sink, "w", zipfile.ZIP_DEFLATED)
+    written = set()
+    files: asyncio.Queue = asyncio.Queue()
+    codegen = asyncio.create_task(
+        stream_code_generation(zip_req, framework, lambda section, file_obj: files.put_nowait(file_obj))
     )
+    codegen.add_done_callback(lambda _: files.put_nowait(None))
+
+    async def write(path: str, content: str) -> bytes:
+        await run_in_threadpool(zf.writestr, path, content)
+        written.add(path)
+        progress["files"].append(path)
+        return sink.drain()
+
+    try:
+        while True:
+            file_obj = await files.get()
+            if file_obj is None:
+                break
+            path = file_obj["path"].lstrip("/")
+            if path.lower() in HELD_BACK_PATHS or path in written:
+                continue
+            chunk = await write(path, file_obj.get("content", ""))
+            if chunk:
+                yield chunk
+        code_output = await codegen
+
+        progress["stage"] = "deploy"
+        audit_task = asyncio.create_task(run_security_audit(zip_req, framework, code_output))
+        audit_task.add_done_callback(_log_audit_failure)
+        progress["audit"] = audit_task
+        deployment_details, deployment_error = await _deploy_generated_contract(zip_req, framework, code_output)
+        progress["deployment"] = deployment_details
+        progress["deployment_error"] = deployment_error
+
+        progress["stage"] = "package"
+        for path, content in iter_repo_entries(
+            framework, code_output, MINIMAL_REPORT, deployment_details, deployment_error
+        ):
+            if path in written:
+                continue
+            chunk = await write(path, content)
+            if chunk:
+                yield chunk
+        zf.close()
+        # Central directory, written on close.
+        chunk = sink.drain()
+        if chunk:
+            yield chunk
+        artifact = await run_in_threadpool(spool.commit, user_id=user_id, project_id=zip_req.project_id)
+        spool = None
+        progress["artifact_id"] = artifact["id"]
+        progress["artifact_url"] = _artifact_url(artifact["id"], user_id)
+        progress["stage"] = "done"
+    except Exception as exc:
+        progress["stage"] = "failed"
+        progress["error"] = getattr(exc, "detail", None) or str(exc)
+        logger.error("Streaming ZIP generation failed: %s", progress["error"])
+        raise
+    finally:
+        codegen.cancel()
+        if spool is not None:
+            spool.discard()
+        if progress["stage"] not in ("done", "failed"):
+            # The client went away mid-download.
+            progress["stage"] = "failed"
+            progress["error"] = "Download was interrupted"
+        if progress["stage"] != "done" and progress["audit"] is not None:
+            progress["audit"].cancel()
+        progress["finished"].set()
+
+
+@app.post("/api/generate-zip/download")
+async def download_generated_zip(
+    zip_req: ZipRequest,
+    authorization: Optional[str] = Header(default=None)
+) -> StreamingResponse:
+    """
+    Binary variant of /api/generate-zip: the archive is streamed as
+    application/zip while the code is still being generated, with no base64
+    copy. Files are written as soon as the model finishes them.
+
+    Progress, the security report and deployment details are served from
+    GET /api/generate-zip/{generation_id}/report (see the X-Generation-Id
+    header). A failure after the response has started aborts the transfer;
+    the report then carries the error. The finished archive is stored like
+    the one from /api/generate-zip; its artifact_url is in the report.
+    """
+    framework = await _resolve_framework(zip_req)
+    user_id = await run_in_threadpool(get_user_id_from_token, authorization) if authorization else None
+
+    generation_id = uuid.uuid4().hex
+    progress = _start_generation(generation_id)
+    return StreamingResponse(
+        _stream_generated_zip(zip_req, framework, progress, user_id),
+        media_type="application/zip",
+        headers={
+            "Content-Disposition": 'attachment; filename="web3-starter.zip"',
+            "X-Generation-Id": generation_id,
+            "X-Report-Url": f"/api/generate-zip/{generation_id}/report",
+        },
+    )
+
+
+@app.get("/api/generate-zip/{generation_id}/report", response_model=ZipReportResponse)
+async def get_generation_report(generation_id: str, wait: bool = True) -> ZipReportResponse:
+    """
+    Progress, security report and deployment details for a streamed download.
+    By default waits until generation and the audit have finished; with
+    `wait=false` it returns the current progress immediately.
+    """
+    entry = _generation_reports.get(generation_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired generation id")
+    if wait:
+        await entry["finished"].wait()
+
+    security_report = security_error = None
+    audit = entry["audit"]
+    if audit is not None and entry["stage"] == "done":
+        if wait:
+            # asyncio.wait neither raises the audit's error nor cancels it if this request goes away.
+            await asyncio.wait([audit])
+        if audit.done():
+            if audit.cancelled():
+                security_error = "Security audit was cancelled"
+            elif audit.exception() is not None:
+                # Already logged by _log_audit_failure.
+                security_error = _error_detail(audit.exception())
+            else:
+                security_report = audit.result()
+    return ZipReportResponse(
+        generation_id=generation_id,
+        stage=entry["stage"],
+        files=list(entry["files"]),
+        error=entry["error"],
+        security_report=security_report,
+        security_report_error=security_error,
+        deployment=entry["deployment"],
+        deployment_error=entry["deployment_error"],
+        artifact_id=entry["artifact_id"],
+        artifact_url=entry["artifact_url"],
+    )
+
+
+# ---------- Deployment tracking ----------
+
+@app.get("/api/deployments/{deployment_id}", response_model=DeploymentStatusResponse)
+async def get_deployment(deployment_id: str, wait: float = 0) -> DeploymentStatusResponse:
+    """
+    Confirmation status of a submitted deployment. With `wait` (seconds, up to
+    60) the call returns as soon as the deployment finishes or the wait expires.
+    """
+    record = deployment_tracker.get(deployment_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired deployment id")
+    if wait > 0 and record["status"] not in TERMINAL_STATUSES:
+
+        async def until_finished() -> None:
+            async for _ in deployment_tracker.watch(deployment_id):
+                pass
+
+        try:
+            await asyncio.wait_for(until_finished(), timeout=min(wait, 60.0))
+        except asyncio.TimeoutError:
+            pass
+        record = deployment_tracker.get(deployment_id) or record
+    return DeploymentStatusResponse(**record)
+
+
+@app.get("/api/deployments/{deployment_id}/events")
+async def stream_deployment(deployment_id: str) -> StreamingResponse:
+    """Server-Sent Events: a `deployment` event per status change, ending once it is finished."""
+    if deployment_tracker.get(deployment_id) is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired deployment id")
+
+    async def event_stream():
+        updates = deployment_tracker.watch(deployment_id).__aiter__()
+        next_update = asyncio.ensure_future(updates.__anext__())
+        try:
+            yield ": stream opened\n\n"
+            while True:
+                done, _ = await asyncio.wait({next_update}, timeout=SSE_HEARTBEAT_SECONDS)
+                if not done:
+                    yield ": keep-alive\n\n"
+                    continue
+                try:
+                    record = next_update.result()
+                except StopAsyncIteration:
+                    break
+                yield _sse_event("deployment", record)
+                next_update = asyncio.ensure_future(updates.__anext__())
+        finally:
+            next_update.cancel()
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# ---------- Stored artifacts ----------
+
+def _artifact_url(artifact_id: Optional[str], user_id: Optional[str]) -> Optional[str]:
+    """Download URL of a stored archive; only signed-in users can download theirs again."""
+    return f"/api/artifacts/{artifact_id}" if artifact_id and user_id else None
+
+
+def _artifact_item(record: Dict[str, Any]) -> ArtifactItem:
+    return ArtifactItem(
+        artifact_id=record["id"],
+        size=record["size"],
+        filename=record["filename"],
+        created_at=datetime.utcfromtimestamp(record["created_at"]).isoformat() + "Z",
+        project_ids=[ref["project_id"] for ref in record["refs"] if ref.get("project_id")],
+        download_url=f"/api/artifacts/{record['id']}",
+    )
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+@app.get("/api/artifacts", response_model=List[ArtifactItem])
+async def list_artifacts(
+    project_id: Optional[str] = None,
+    authorization: Optional[str] = Header(default=None)
+) -> List[ArtifactItem]:
+    """
+    Archives generated for the authenticated user, newest first, optionally
+    narrowed to one saved project.
+    """
+    user_id = await run_in_threadpool(get_user_id_from_token, authorization)
+    if not user_id:
+        raise HTTPException(status_code=401, detail="Authentication required. Please provide a valid Authorization token.")
+    records = await run_in_threadpool(artifact_store.list, user_id=user_id, project_id=project_id)
+    return [_artifact_item(record) for record in records]
+
+
+@app.get("/api/artifacts/{artifact_id}")
+async def download_artifact(
+    artifact_id: str,
+    if_none_match: Optional[str] = Header(default=None),
+    authorization: Optional[str] = Header(default=None)
+):
+    """
+    Download a stored archive generated for the authenticated user. The id is
+    the SHA-256 of its bytes and is used as a strong ETag, so If-None-Match
+    revalidation returns 304; Range and If-Range requests return 206 for
+    resuming interrupted downloads.
+    """
+    user_id = await run_in_threadpool(get_user_id_from_token, authorization)
+    if not user_id:
+        raise HTTPException(status_code=401, detail="Authentication required. Please provide a valid Authorization token.")
+    # Someone else's archive is reported as missing, not forbidden.
+    record = await run_in_threadpool(artifact_store.get, artifact_id, user_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="Artifact not found")
+    etag = f'"{artifact_id}"'
+    headers = {"ETag": etag, "Cache-Control": "private, max-age=31536000, immutable"}
+    if if_none_match and _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return FileResponse(
+        artifact_store.path_for(artifact_id),
+        media_type="application/zip",
+        filename=record["filename"],
+        headers=headers,
+    )
+
+
+# ---------- Background ZIP jobs ----------
+
+async def _run_zip_job(job: Job, jobs: JobManager) -> None:
+    """
+    Stages of /api/generate-zip as a resumable job. Each stage's output is
+    persisted, so a restarted worker continues from the first unfinished one.
+    """
+    zip_req = ZipRequest(**job.request)
+
+    async def framework_stage() -> Dict[str, Any]:
+        return (await _resolve_framework(zip_req)).model_dump()
+
+    framework = FrameworkResponse(**await jobs.run_stage(job, "framework", framework_stage))
+
+    async def code_stage() -> Dict[str, Any]:
+        return await run_code_generation_pipeline(zip_req, framework)
+
+    code_output = await jobs.run_stage(job, "code", code_stage)
+
+    async def audit_stage() -> Dict[str, Any]:
+        report, error = await _join_security_audit(run_security_audit(zip_req, framework, code_output))
+        return {"security_report": report, "security_report_error": error}
+
+    async def deploy_stage() -> Dict[str, Any]:
+        details, error = await _deploy_generated_contract(zip_req, framework, code_output)
+        return {"deployment": details, "deployment_error": error}
+
+    async def zip_stage(deploy_output: Dict[str, Any]) -> Dict[str, Any]:
+        zip_bytes = await run_in_threadpool(
+            build_repo_zip,
+            framework,
+            code_output,
+            MINIMAL_REPORT,
+            deployment=deploy_output["deployment"],
+            deployment_error=deploy_output["deployment_error"],
+        )
+        await jobs.save_result(job, "repo.zip", zip_bytes)
+        artifact = await run_in_threadpool(
+            artifact_store.put, zip_bytes, user_id=job.user_id, project_id=zip_req.project_id
+        )
+        return {"size": len(zip_bytes), "artifact_id": artifact["id"]}
+
+    async def package() -> None:
+        deploy_output = await jobs.run_stage(job, "deploy", deploy_stage)
+        await jobs.run_stage(job, "zip", lambda: zip_stage(deploy_output))
+
+    # Same overlap as /api/generate-zip: audit alongside deploy -> zip.
+    audit_task = asyncio.create_task(jobs.run_stage(job, "audit", audit_stage))
+    try:
+        await package()
+        await audit_task
+    finally:
+        audit_task.cancel()
+
+
+job_manager = JobManager(
+    runners={"generate-zip": _run_zip_job},
+    workers=int(os.getenv("JOB_WORKERS", "4")),
+    max_queue=int(os.getenv("JOB_QUEUE_MAX", "100")),
+    retention_seconds=float(os.getenv("JOB_RETENTION_HOURS", "24")) * 3600,
+)
+
+
+def _job_status(job: Job) -> JobStatusResponse:
+    deploy_stage = job.stages.get("deploy") or {}
+    audit_stage = job.stages.get("audit") or {}
+    artifact_id = (job.stages.get("zip") or {}).get("artifact_id")
+    return JobStatusResponse(
+        job_id=job.id,
+        kind=job.kind,
+        status=job.status,
+        stage=job.stage,
+        completed_stages=list(job.stages),
+        error=job.error,
+        created_at=job.created_at,
+        updated_at=job.updated_at,
+        result_url=f"/api/jobs/{job.id}/result" if job.status == JOB_SUCCEEDED else None,
+        security_report=audit_stage.get("security_report"),
+        security_report_error=audit_stage.get("security_report_error"),
+        deployment=deploy_stage.get("deployment"),
+        deployment_error=deploy_stage.get("deployment_error"),
+        artifact_id=artifact_id,
+        artifact_url=_artifact_url(artifact_id, job.user_id),
+    )
+
+
+@app.post("/api/jobs/generate-zip", response_model=JobSubmitResponse, status_code=202)
+async def submit_generate_zip_job(
+    zip_req: ZipRequest,
+    authorization: Optional[str] = Header(default=None)
+) -> JobSubmitResponse:
+    """
+    Queue the /api/generate-zip pipeline and return immediately.
+    Poll GET /api/jobs/{job_id} for progress, then download GET /api/jobs/{job_id}/result
+    (with the same Authorization header, if the job was submitted with one).
+    """
+    user_id = await run_in_threadpool(get_user_id_from_token, authorization) if authorization else None
+    try:
+        job = await job_manager.submit("generate-zip", zip_req.model_dump(), user_id=user_id)
+    except QueueFullError as exc:
+        raise HTTPException(status_code=503, detail=str(exc), headers={"Retry-After": "30"})
+    return JobSubmitResponse(
+        job_id=job.id,
+        status=job.status,
+        status_url=f"/api/jobs/{job.id}",
+        result_url=f"/api/jobs/{job.id}/result",
+    )
+
+
+async def _get_caller_job(job_id: str, authorization: Optional[str]) -> Job:
+    """
+    The job, if the caller may see it: a job submitted by a signed-in user
+    belongs to that user; an anonymous one to whoever holds its id.
+    """
+    job = job_manager.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job.user_id is not None:
+        user_id = await run_in_threadpool(get_user_id_from_token, authorization) if authorization else None
+        if not user_id:
+            raise HTTPException(status_code=401, detail="Authentication required. Please provide a valid Authorization token.")
+        if user_id != job.user_id:
+            raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@app.get("/api/jobs/{job_id}", response_model=JobStatusResponse)
+async def get_job_status(
+    job_id: str,
+    authorization: Optional[str] = Header(default=None)
+) -> JobStatusResponse:
+    return _job_status(await _get_caller_job(job_id, authorization))
+
+
+@app.get("/api/jobs/{job_id}/result")
+async def get_job_result(
+    job_id: str,
+    authorization: Optional[str] = Header(default=None)
+) -> FileResponse:
+    job = await _get_caller_job(job_id, authorization)
+    if job.status == JOB_FAILED:
+        raise HTTPException(status_code=409, detail=f"Job failed: {job.error}")
+    path = job_manager.result_path(job)
+    if path is None or not path.exists():
+        raise HTTPException(status_code=409, detail=f"Job is {job.status}; result not ready yet")
+    return FileResponse(path, media_type="application/zip", filename="web3-starter.zip")
+
+
+def _collect_component_metrics():
+    cache = agent_cache.stats()
+    yield ("kairo_agent_cache_hits_total", "counter", "Agent cache hits (memory and disk).",
+           cache["memory_hits"] + cache["disk_hits"])
+    yield ("kairo_agent_cache_misses_total", "counter", "Agent cache misses.", cache["misses"])
+    yield ("kairo_agent_cache_entries", "gauge", "Agent cache entries held in memory.", cache["memory_entries"])
+    yield ("kairo_llm_circuit_open", "gauge", "1 while the LLM circuit breaker is rejecting calls.",
+           0 if llm_circuit_breaker.state == CircuitBreaker.CLOSED else 1)
+    yield ("kairo_job_queue_depth", "gauge", "Background jobs waiting for a worker.", job_manager.queue_depth())
+    flights = _pipeline_flights.stats()
+    yield ("kairo_pipeline_in_flight", "gauge", "Generation pipelines currently running.", flights["in_flight"])
+    yield ("kairo_pipeline_coalesced_total", "counter", "Requests that joined an in-flight pipeline.",
+           flights["coalesced"])
+    compiles = compile_cache.stats()
+    yield ("kairo_compile_cache_hits_total", "counter", "Compile cache hits (memory and disk).",
+           compiles["memory_hits"] + compiles["disk_hits"])
+    yield ("kairo_compile_cache_misses_total", "counter", "Compile cache misses.", compiles["misses"])
+    solc = solc_manager.stats()
+    yield ("kairo_solc_installs_total", "counter", "solc compilers downloaded by this process.", solc["installs"])
+    deployments = deployment_tracker.stats()
+    yield ("kairo_deployments_pending", "gauge", "Submitted deployments awaiting a receipt.", deployments["pending"])
+    yield ("kairo_deploy_speed_ups_total", "counter", "Stuck deployments re-sent with a higher gas price.",
+           deployments["speed_ups"])
+    registry = deployment_registry.stats()
+    yield ("kairo_deployment_registry_hits_total", "counter", "Deployments answered from the deployment registry.",
+           registry["hits"])
+    rpc = provider_manager.stats()
+    yield ("kairo_rpc_batches_total", "counter", "JSON-RPC batches sent for deployment parameters.",
+           rpc["batches"])
+    artifacts = artifact_store.stats()
+    yield ("kairo_artifact_store_bytes", "gauge", "Bytes of generated archives kept in the artifact store.",
+           artifacts["bytes"])
+
+
+metrics.registry.register_collector(_collect_component_metrics)
+
+
+@app.get("/metrics")
+def prometheus_metrics() -> PlainTextResponse:
+    """Prometheus text-format metrics (agent latency/tokens, solc, deploy, zip)."""
+    return PlainTextResponse(metrics.registry.render(), media_type=metrics.PROMETHEUS_CONTENT_TYPE)
+
+
+@app.get("/api/agent-stats")
+def agent_stats():
+    """
+    Per-agent totals since startup. Divide by `runs` for per-call averages
+    (e.g. prompt_chars / runs is the average prompt size). `cached_token_ratio`
+    is the share of billed prompt tokens served from the provider prefix cache.
+    """
+    return JSONResponse(agent_usage_stats.snapshot())
+
+
+@app.get("/api/agent-cache/stats")
+def agent_cache_stats():
+    """Hit/miss counters and size of the agent output cache."""
+    return JSONResponse(agent_cache.stats())
+
+
+@app.get("/api/compile-cache/stats")
+def compile_cache_stats():
+    """Hit/miss counters and size of the solc output cache."""
+    return JSONResponse(compile_cache.stats())
+
+
+@app.get("/api/deployment-registry/stats")
+def deployment_registry_stats():
+    """Reuse counters and size of the deployment registry."""
+    return JSONResponse(deployment_registry.stats())
 
 
 # ---------- Auth routes ----------
@@ -0,0 +1,267 @@
+"""
+Minimal in-process metrics with Prometheus text exposition.
+
+Counters and histograms keep a few integers per label set behind a lock, so
+recording on the hot path is a dict lookup, a bisect and an increment.
+"""
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from threading import Lock
+from typing import Callable, Dict, Iterable, Iterator, List, Sequence, Tuple
+
+LabelValues = Tuple[str, ...]
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 90, 120, 180)
+TOKEN_BUCKETS = (100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000, 64000)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in items
+        ]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [count per bucket..., count above last bucket, sum]
+        self._values: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * (len(self.buckets) + 2)
+            state[index] += 1
+            state[-1] += value
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, list(state)) for key, state in self._values.items())
+        lines = []
+        for key, state in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), state[:-1]):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {_format_value(cumulative)}"
+                )
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(state[-1])}")
+            lines.append(f"{self.name}_count{labels} {_format_value(cumulative)}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Callable[[], Iterable[Tuple[str, str, str, float]]]] = []
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector: Callable[[], Iterable[Tuple[str, str, str, float]]]) -> None:
+        """
+        Register a callback evaluated at scrape time. It yields
+        (name, type, help, value) tuples for values owned by other components.
+        """
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            for name, kind, documentation, value in collector():
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {kind}")
+                lines.append(f"{name} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+AGENT_LATENCY_SECONDS = registry.histogram(
+    "kairo_agent_latency_seconds",
+    "Wall time of agent LLM calls (cache misses only).",
+    ["agent"],
+)
+AGENT_PROMPT_TOKENS = registry.histogram(
+    "kairo_agent_prompt_tokens",
+    "Prompt tokens billed per agent call.",
+    ["agent"],
+    buckets=TOKEN_BUCKETS,
+)
+AGENT_COMPLETION_TOKENS = registry.histogram(
+    "kairo_agent_completion_tokens",
+    "Completion tokens billed per agent call.",
+    ["agent"],
+    buckets=TOKEN_BUCKETS,
+)
+AGENT_CACHED_PROMPT_TOKENS = registry.counter(
+    "kairo_agent_cached_prompt_tokens_total",
+    "Prompt tokens served from the provider prefix cache.",
+    ["agent"],
+)
+AGENT_JSON_PARSE_FAILURES = registry.counter(
+    "kairo_agent_json_parse_failures_total",
+    "Agent completions that were not valid JSON.",
+    ["agent"],
+)
+LLM_RETRIES = registry.counter(
+    "kairo_llm_retries_total",
+    "LLM calls retried after a transient failure.",
+    ["agent", "reason"],
+)
+LLM_FAILURES = registry.counter(
+    "kairo_llm_failures_total",
+    "Failed LLM call attempts by failure kind (transient reason, fatal, circuit_open).",
+    ["agent", "kind"],
+)
+LLM_HEDGES = registry.counter(
+    "kairo_llm_hedges_total",
+    "Duplicate LLM requests fired because the original was slower than the hedge trigger.",
+    ["agent"],
+)
+LLM_HEDGE_WINS = registry.counter(
+    "kairo_llm_hedge_wins_total",
+    "Hedged LLM requests that answered before the original.",
+    ["agent"],
+)
+SOLC_COMPILE_SECONDS = registry.histogram(
+    "kairo_solc_compile_seconds",
+    "Time spent compiling Solidity sources.",
+)
+CONTRACT_DEPLOY_SECONDS = registry.histogram(
+    "kairo_contract_deploy_seconds",
+    "Time to build, sign and broadcast a deployment transaction.",
+)
+DEPLOY_CONFIRM_SECONDS = registry.histogram(
+    "kairo_deploy_confirm_seconds",
+    "Time from broadcasting a deployment until its receipt was seen.",
+)
+CODEGEN_FIRST_FILE_SECONDS = registry.histogram(
+    "kairo_codegen_first_file_seconds",
+    "Time from starting streamed code generation until its first complete file.",
+)
+ZIP_BUILD_SECONDS = registry.histogram(
+    "kairo_zip_build_seconds",
+    "Time spent building the generated repository archive.",
+)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+__all__ = [
+    "Counter",
+    "Histogram",
+    "MetricsRegistry",
+    "registry",
+    "AGENT_LATENCY_SECONDS",
+    "AGENT_PROMPT_TOKENS",
+    "AGENT_COMPLETION_TOKENS",
+    "AGENT_CACHED_PROMPT_TOKENS",
+    "AGENT_JSON_PARSE_FAILURES",
+    "LLM_RETRIES",
+    "LLM_FAILURES",
+    "LLM_HEDGES",
+    "LLM_HEDGE_WINS",
+    "SOLC_COMPILE_SECONDS",
+    "CONTRACT_DEPLOY_SECONDS",
+    "DEPLOY_CONFIRM_SECONDS",
+    "CODEGEN_FIRST_FILE_SECONDS",
+    "ZIP_BUILD_SECONDS",
+    "PROMETHEUS_CONTENT_TYPE",
+]
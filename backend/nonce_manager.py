@@ -0,0 +1,369 @@
+import logging
+import os
+from dataclasses import dataclass, field
+from threading import Lock
+from typing import Any, Dict, Optional, Set, Tuple
+
+from web3 import Web3
+try:
+    from web3.exceptions import Web3RPCError
+except ImportError:  # web3.py before v7 raises ValueError for JSON-RPC errors
+    Web3RPCError = ValueError
+
+try:
+    from .web3_provider import ChainClient
+except ImportError:
+    from web3_provider import ChainClient
+
+logger = logging.getLogger(__name__)
+
+# Node error messages meaning our idea of the account's next nonce is stale.
+_NONCE_ERRORS = (
+    "nonce too low",
+    "nonce too high",
+    "replacement transaction underpriced",
+)
+# Node error messages meaning it already has this exact signed transaction.
+_KNOWN_TX_ERRORS = (
+    "already known",
+    "known transaction",
+)
+# Gas limit of a plain ETH transfer, used for gap-filling self-transfers.
+_TRANSFER_GAS = 21000
+
+
+def is_nonce_error(exc: Exception) -> bool:
+    message = str(exc).lower()
+    return any(marker in message for marker in _NONCE_ERRORS)
+
+
+def is_known_transaction_error(exc: Exception) -> bool:
+    message = str(exc).lower()
+    return any(marker in message for marker in _KNOWN_TX_ERRORS)
+
+
+@dataclass
+class _AccountNonces:
+    lock: Lock = field(default_factory=Lock)
+    next_nonce: Optional[int] = None
+    # Allocated but not yet broadcast.
+    reserved: Set[int] = field(default_factory=set)
+    # Given back after a failed send; handed out again before new ones.
+    released: Set[int] = field(default_factory=set)
+    # Sends that failed in transport, so they may or may not have reached the
+    # node: nonce -> tx hash. Their nonces stay reserved until checked.
+    uncertain: Dict[int, str] = field(default_factory=dict)
+    # Broadcast and not yet settled: nonce -> signer, transaction and every hash sent for it.
+    in_flight: Dict[int, Dict[str, Any]] = field(default_factory=dict)
+
+
+class NonceManager:
+    """
+    Hands out nonces per (endpoint, account) so concurrent deployments from one
+    key never sign the same nonce.
+
+    The first allocation starts from the chain's pending count; after that
+    nonces come from a local counter (never below the chain's count when the
+    caller passes it in). A nonce the node rejects is given back and reused
+    first; if a later nonce is already in flight, the gap is filled right away
+    with a zero-value self-transfer, since the later transaction cannot be
+    mined until something uses it. Nonce errors from the node resync the
+    counter from chain and retry with a fresh nonce, and an "already known"
+    reply counts as a successful send. A send that fails in transport may
+    still have gone out, so its nonce stays reserved until the node shows the
+    transaction (a success) or a pending count at or below the nonce (never
+    used, so released).
+    `speed_up()` re-signs a stuck in-flight transaction with a higher gas price.
+    """
+
+    def __init__(self, bump_percent: float = 15.0, max_send_attempts: int = 3) -> None:
+        # Nodes only accept a replacement paying at least 10% more.
+        self.bump_percent = max(bump_percent, 10.0)
+        self.max_send_attempts = max(1, max_send_attempts)
+        self._accounts: Dict[Tuple[str, str], _AccountNonces] = {}
+        self._lock = Lock()
+        self._counters = {
+            "allocated": 0,
+            "resyncs": 0,
+            "released": 0,
+            "uncertain": 0,
+            "gap_fills": 0,
+            "speed_ups": 0,
+        }
+
+    def send(
+        self,
+        client: ChainClient,
+        account: Any,
+        transaction: Dict[str, Any],
+        chain_nonce: Optional[int] = None,
+    ) -> Tuple[str, int]:
+        """
+        Sign `transaction` (everything but the nonce) with `account` under a
+        freshly allocated nonce and broadcast it. `chain_nonce` is the
+        account's pending transaction count if the caller already fetched it.
+        Returns (tx_hash, nonce).
+        """
+        state = self._state(client.rpc_url, account.address)
+        if state.uncertain:
+            self._check_uncertain(client, account, state)
+        for attempt in range(self.max_send_attempts):
+            if chain_nonce is None and state.next_nonce is None:
+                chain_nonce = client.pending_nonce(account.address)
+            nonce = self._allocate(state, chain_nonce)
+            signed = {**transaction, "nonce": nonce}
+            try:
+                raw_tx, tx_hash = _sign(account, signed)
+            except Exception:
+                self._release(state, nonce)
+                raise
+            try:
+                _broadcast(client, raw_tx, tx_hash)
+            except Exception as exc:
+                if not _is_rejection(exc):
+                    # Timed out or lost the connection: the node may have it anyway.
+                    logger.warning("Sending nonce %d for %s failed in transport: %s", nonce, account.address, exc)
+                    with state.lock:
+                        state.uncertain[nonce] = tx_hash
+                    with self._lock:
+                        self._counters["uncertain"] += 1
+                    if self._check_uncertain(client, account, state).get(nonce):
+                        self._mark_in_flight(state, nonce, account, signed, tx_hash)
+                        return tx_hash, nonce
+                    raise
+                if is_nonce_error(exc) and attempt + 1 < self.max_send_attempts:
+                    logger.warning("Nonce %d for %s rejected (%s); resyncing", nonce, account.address, exc)
+                    with state.lock:
+                        state.reserved.discard(nonce)
+                    chain_nonce = self.resync(client, account.address)
+                    continue
+                self._release(state, nonce)
+                self._fill_gaps(client, account, state, signed)
+                raise
+            self._mark_in_flight(state, nonce, account, signed, tx_hash)
+            return tx_hash, nonce
+        raise RuntimeError("Unable to allocate a usable nonce")
+
+    def resync(self, client: ChainClient, address: str) -> int:
+        """Reset the local counter from the chain's pending count, past anything still reserved."""
+        chain_nonce = client.pending_nonce(address)
+        state = self._state(client.rpc_url, address)
+        with state.lock:
+            busy = [n for n in state.reserved | set(state.in_flight) if n >= chain_nonce]
+            state.next_nonce = max([chain_nonce] + [n + 1 for n in busy])
+            state.released = {n for n in state.released if n >= chain_nonce}
+        with self._lock:
+            self._counters["resyncs"] += 1
+        return chain_nonce
+
+    def speed_up(self, client: ChainClient, address: str, nonce: int) -> Optional[str]:
+        """
+        Rebroadcast the in-flight transaction using `nonce` with a bumped gas
+        price. Returns the replacement hash, or None if there is nothing to
+        replace any more (already mined or settled).
+        """
+        state = self._state(client.rpc_url, address)
+        with state.lock:
+            entry = state.in_flight.get(nonce)
+            if entry is None:
+                return None
+            transaction = dict(entry["transaction"])
+            account = entry["account"]
+        bumped = int(transaction["gasPrice"] * (100 + self.bump_percent) / 100) + 1
+        transaction["gasPrice"] = max(bumped, client.gas_price())
+        raw_tx, tx_hash = _sign(account, transaction)
+        try:
+            _broadcast(client, raw_tx, tx_hash)
+        except Exception as exc:
+            if is_nonce_error(exc):
+                # The original (or another replacement) got in first.
+                return None
+            raise
+        with state.lock:
+            entry = state.in_flight.get(nonce)
+            if entry is not None:
+                entry["transaction"] = transaction
+                entry["hashes"].append(tx_hash)
+        with self._lock:
+            self._counters["speed_ups"] += 1
+        logger.info("Replaced stuck tx for %s nonce %d with %s", address, nonce, tx_hash)
+        return tx_hash
+
+    def settle(self, rpc_url: str, address: str, nonce: int) -> None:
+        """Forget an in-flight transaction once it is mined, replaced or abandoned."""
+        state = self._state(rpc_url, address)
+        with state.lock:
+            state.in_flight.pop(nonce, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+            accounts = list(self._accounts.values())
+        in_flight = 0
+        unresolved = 0
+        for state in accounts:
+            with state.lock:
+                in_flight += len(state.in_flight)
+                unresolved += len(state.uncertain)
+        return {**counters, "accounts": len(accounts), "in_flight": in_flight, "unresolved": unresolved}
+
+    # ---------- internals ----------
+
+    def _state(self, rpc_url: str, address: str) -> _AccountNonces:
+        key = (rpc_url, Web3.to_checksum_address(address))
+        with self._lock:
+            state = self._accounts.get(key)
+            if state is None:
+                state = self._accounts[key] = _AccountNonces()
+            return state
+
+    def _allocate(self, state: _AccountNonces, chain_nonce: Optional[int]) -> int:
+        with state.lock:
+            floor = chain_nonce if chain_nonce is not None else 0
+            if state.next_nonce is None:
+                state.next_nonce = floor
+            # Nonces below the chain's count were used by someone else meanwhile.
+            state.released = {n for n in state.released if n >= floor}
+            if state.released:
+                nonce = min(state.released)
+                state.released.discard(nonce)
+            else:
+                nonce = max(state.next_nonce, floor)
+                state.next_nonce = nonce + 1
+            state.reserved.add(nonce)
+        with self._lock:
+            self._counters["allocated"] += 1
+        return nonce
+
+    def _release(self, state: _AccountNonces, nonce: int) -> None:
+        with state.lock:
+            state.reserved.discard(nonce)
+            state.released.add(nonce)
+            # Wind the counter back over a released tail instead of leaving a gap.
+            while state.next_nonce is not None and state.next_nonce - 1 in state.released:
+                state.next_nonce -= 1
+                state.released.discard(state.next_nonce)
+        with self._lock:
+            self._counters["released"] += 1
+
+    def _mark_in_flight(
+        self, state: _AccountNonces, nonce: int, account: Any, transaction: Dict[str, Any], tx_hash: str
+    ) -> None:
+        with state.lock:
+            state.reserved.discard(nonce)
+            state.uncertain.pop(nonce, None)
+            state.in_flight[nonce] = {"account": account, "transaction": transaction, "hashes": [tx_hash]}
+
+    def _check_uncertain(self, client: ChainClient, account: Any, state: _AccountNonces) -> Dict[int, bool]:
+        """
+        Ask the node about sends that failed in transport. Returns
+        {nonce: reached_node} for the ones it could settle; the rest stay
+        reserved for the next check.
+        """
+        with state.lock:
+            uncertain = dict(state.uncertain)
+        if not uncertain:
+            return {}
+        calls = [("eth_getTransactionByHash", [tx_hash]) for tx_hash in uncertain.values()]
+        calls.append(("eth_getTransactionCount", [account.address, "pending"]))
+        try:
+            results = client.batch(calls)
+        except Exception as exc:
+            logger.warning("Could not check unconfirmed sends for %s: %s", account.address, exc)
+            return {}
+        pending = int(results[-1], 16) if isinstance(results[-1], str) else int(results[-1])
+        outcome = {nonce: bool(found) for nonce, found in zip(uncertain, results)}
+        never_sent = [nonce for nonce, found in outcome.items() if not found and pending <= nonce]
+        with state.lock:
+            for nonce in outcome:
+                state.uncertain.pop(nonce, None)
+                # Sent (the caller that owned it records it as in flight), or
+                # used by another transaction: either way the nonce is gone.
+                state.reserved.discard(nonce)
+        for nonce in never_sent:
+            self._release(state, nonce)
+        if never_sent:
+            self._fill_gaps(client, account, state, None)
+        return outcome
+
+    def _fill_gaps(
+        self, client: ChainClient, account: Any, state: _AccountNonces, template: Optional[Dict[str, Any]]
+    ) -> None:
+        """Use every released nonce below an in-flight one with a zero-value self-transfer."""
+        with state.lock:
+            top = max(state.in_flight, default=None)
+            gaps = sorted(n for n in state.released if top is not None and n < top)
+            for nonce in gaps:
+                state.released.discard(nonce)
+                state.reserved.add(nonce)
+        if not gaps:
+            return
+        try:
+            gas_price = max((template or {}).get("gasPrice") or 0, client.gas_price())
+            chain_id = (template or {}).get("chainId") or client.chain_id
+        except Exception as exc:
+            logger.warning("Could not fill nonce gap for %s: %s", account.address, exc)
+            for nonce in gaps:
+                self._release(state, nonce)
+            return
+        for nonce in gaps:
+            transfer = {
+                "from": account.address,
+                "to": account.address,
+                "value": 0,
+                "gas": _TRANSFER_GAS,
+                "gasPrice": gas_price,
+                "chainId": chain_id,
+                "nonce": nonce,
+            }
+            try:
+                _broadcast(client, *_sign(account, transfer))
+            except Exception as exc:
+                logger.warning("Could not fill nonce gap %d for %s: %s", nonce, account.address, exc)
+                if is_nonce_error(exc):
+                    # Something else used it meanwhile.
+                    with state.lock:
+                        state.reserved.discard(nonce)
+                else:
+                    self._release(state, nonce)
+                continue
+            with state.lock:
+                state.reserved.discard(nonce)
+            with self._lock:
+                self._counters["gap_fills"] += 1
+            logger.info("Filled nonce gap %d for %s with a self-transfer", nonce, account.address)
+
+
+def _sign(account: Any, transaction: Dict[str, Any]) -> Tuple[bytes, str]:
+    """Sign `transaction`; returns the raw bytes and the transaction hash."""
+    signed_txn = account.sign_transaction(transaction)
+    raw_tx = getattr(signed_txn, "rawTransaction", None) or getattr(
+        signed_txn, "raw_transaction", None
+    )
+    if raw_tx is None:
+        raise RuntimeError("Unable to access raw transaction bytes on SignedTransaction.")
+    return raw_tx, Web3.to_hex(signed_txn.hash)
+
+
+def _broadcast(client: ChainClient, raw_tx: bytes, tx_hash: str) -> None:
+    try:
+        client.web3.eth.send_raw_transaction(raw_tx)
+    except Exception as exc:
+        if is_known_transaction_error(exc):
+            # The node already has this exact transaction, e.g. from an
+            # earlier attempt whose reply was lost.
+            return
+        raise
+
+
+def _is_rejection(exc: Exception) -> bool:
+    """Whether the node answered the send with an error (as opposed to it failing in transport)."""
+    return isinstance(exc, (Web3RPCError, ValueError))
+
+
+nonce_manager = NonceManager(
+    bump_percent=float(os.getenv("NONCE_GAS_BUMP_PERCENT", "15")),
+    max_send_attempts=int(os.getenv("NONCE_MAX_SEND_ATTEMPTS", "3")),
+)
+
+__all__ = ["NonceManager", "is_known_transaction_error", "is_nonce_error", "nonce_manager"]
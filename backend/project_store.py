@@ -0,0 +1,170 @@
+import json
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+from threading import Lock
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = Path(__file__).resolve().parent / "data" / "projects.db"
+LEGACY_JSON_PATH = Path(__file__).resolve().parent / "data" / "projects.json"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS projects (
+    id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    created_at TEXT NOT NULL DEFAULT '',
+    data TEXT NOT NULL,
+    saved_seq INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS store_meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+_INDEXES = """
+DROP INDEX IF EXISTS projects_user_created;
+CREATE INDEX IF NOT EXISTS projects_user_saved ON projects (user_id, saved_seq DESC);
+"""
+
+
+class ProjectStore:
+    """
+    Local fallback storage for saved projects when Supabase is unavailable.
+
+    Projects live in one SQLite database in WAL mode: readers never wait for
+    the writer, each save or delete is a single transaction, and lookups go
+    through the primary key (id) or the (user_id, saved_seq) index instead of
+    reading every user's projects. Every thread gets its own connection.
+    `saved_seq` increases with every save, so a user's list is most recently
+    saved first, as it was in `projects.json`. The first open imports that
+    file once, keeping its order; it is left in place and not read again.
+    """
+
+    def __init__(self, path: Path = DEFAULT_DB_PATH, legacy_json_path: Optional[Path] = LEGACY_JSON_PATH) -> None:
+        self.path = Path(path)
+        self.legacy_json_path = Path(legacy_json_path) if legacy_json_path else None
+        self._local = threading.local()
+        self._init_lock = Lock()
+        self._initialized = False
+
+    def save(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        """Insert or replace `record` (which carries its `id` and `user_id`) and move it to the top."""
+        conn = self._connect()
+        # Take the write lock before reading the next saved_seq.
+        conn.execute("BEGIN IMMEDIATE")
+        with conn:
+            self._upsert(conn, record)
+        return record
+
+    def list(self, user_id: str) -> List[Dict[str, Any]]:
+        """The user's projects, most recently saved first."""
+        rows = self._connect().execute(
+            "SELECT data FROM projects WHERE user_id = ? ORDER BY saved_seq DESC",
+            (user_id,),
+        ).fetchall()
+        return [json.loads(data) for (data,) in rows]
+
+    def get(self, user_id: str, project_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connect().execute(
+            "SELECT data FROM projects WHERE id = ? AND user_id = ?",
+            (project_id, user_id),
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def delete(self, user_id: str, project_id: str) -> bool:
+        conn = self._connect()
+        with conn:
+            cursor = conn.execute("DELETE FROM projects WHERE id = ? AND user_id = ?", (project_id, user_id))
+        return cursor.rowcount > 0
+
+    # ---------- internals ----------
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            # With WAL, NORMAL never corrupts the database on a crash; at worst
+            # the last commits before a power loss are rolled back.
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        if not self._initialized:
+            with self._init_lock:
+                if not self._initialized:
+                    conn.executescript(_SCHEMA)
+                    self._add_saved_seq(conn)
+                    conn.executescript(_INDEXES)
+                    self._migrate_legacy_json(conn)
+                    self._initialized = True
+        return conn
+
+    @staticmethod
+    def _add_saved_seq(conn: sqlite3.Connection) -> None:
+        """Databases created before saved_seq existed: number their rows in the order they were listed."""
+        def has_column() -> bool:
+            return "saved_seq" in [row[1] for row in conn.execute("PRAGMA table_info(projects)")]
+
+        if has_column():
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        with conn:
+            if has_column():
+                return
+            conn.execute("ALTER TABLE projects ADD COLUMN saved_seq INTEGER NOT NULL DEFAULT 0")
+            conn.execute(
+                "UPDATE projects SET saved_seq = (SELECT COUNT(*) FROM projects AS older "
+                "WHERE (older.created_at, older.rowid) <= (projects.created_at, projects.rowid))"
+            )
+
+    @staticmethod
+    def _upsert(conn: sqlite3.Connection, record: Dict[str, Any]) -> None:
+        # Caller holds the write lock, so two saves cannot take the same saved_seq.
+        conn.execute(
+            "INSERT INTO projects (id, user_id, created_at, data, saved_seq) "
+            "VALUES (?, ?, ?, ?, (SELECT COALESCE(MAX(saved_seq), 0) + 1 FROM projects)) "
+            "ON CONFLICT(id) DO UPDATE SET user_id = excluded.user_id, "
+            "created_at = excluded.created_at, data = excluded.data, saved_seq = excluded.saved_seq",
+            (record["id"], record["user_id"], record.get("created_at") or "", json.dumps(record)),
+        )
+
+    def _migrate_legacy_json(self, conn: sqlite3.Connection) -> None:
+        migrated = "SELECT 1 FROM store_meta WHERE key = 'legacy_json_migrated'"
+        if self.legacy_json_path is None or conn.execute(migrated).fetchone():
+            return
+        legacy = self._read_legacy_json()
+        if legacy is None:
+            # Unreadable: leave it unmigrated so the next start tries again.
+            return
+        # IMMEDIATE takes the write lock up front, so two processes starting
+        # together cannot both import the file.
+        conn.execute("BEGIN IMMEDIATE")
+        with conn:
+            if conn.execute(migrated).fetchone():
+                return
+            imported = 0
+            for user_id, records in legacy.items():
+                # Lists are most recently saved first; import oldest first so saved_seq keeps that order.
+                for record in reversed(records) if isinstance(records, list) else []:
+                    if isinstance(record, dict) and record.get("id"):
+                        self._upsert(conn, {**record, "user_id": record.get("user_id") or user_id})
+                        imported += 1
+            conn.execute("INSERT INTO store_meta (key, value) VALUES ('legacy_json_migrated', ?)", (str(imported),))
+        if imported:
+            logger.info("Imported %d projects from %s", imported, self.legacy_json_path)
+
+    def _read_legacy_json(self) -> Optional[Dict[str, Any]]:
+        try:
+            with self.legacy_json_path.open("r", encoding="utf-8") as handle:
+                data = json.load(handle)
+        except FileNotFoundError:
+            return {}
+        except (OSError, json.JSONDecodeError) as exc:
+            logger.warning("Could not import legacy projects file: %s", exc)
+            return None
+        return data if isinstance(data, dict) else {}
+
+
+project_store = ProjectStore()
+
+__all__ = ["ProjectStore", "project_store"]
@@ -0,0 +1,370 @@
+"""
+Deterministic renderers for the boilerplate files of a generated repo.
+
+Hardhat config, package.json, the deploy script, the smoke test, the web3
+connection helper and the Vite entry page depend only on the contract names
+(and constructor signatures), the recommended chain and the web3 library, so
+they are rendered here instead of being written token by token by the model.
+"""
+import json
+import re
+from string import Template
+from typing import Any, Dict, List, Optional, Tuple
+
+TEMPLATE_PATHS = (
+    "hardhat.config.js",
+    "package.json",
+    "scripts/deploy.js",
+    "test/smoke.test.js",
+    "web3/connection.js",
+    "frontend/index.html",
+)
+
+DEFAULT_SOLIDITY_VERSION = "0.8.20"
+
+# recommended_chain keyword -> (hardhat network name, chain id, public testnet RPC)
+CHAIN_NETWORKS: Dict[str, Tuple[str, int, str]] = {
+    "base": ("baseSepolia", 84532, "https://sepolia.base.org"),
+    "arbitrum": ("arbitrumSepolia", 421614, "https://sepolia-rollup.arbitrum.io/rpc"),
+    "optimism": ("optimismSepolia", 11155420, "https://sepolia.optimism.io"),
+    "polygon": ("polygonAmoy", 80002, "https://rpc-amoy.polygon.technology"),
+    "avalanche": ("avalancheFuji", 43113, "https://api.avax-test.network/ext/bc/C/rpc"),
+    "bnb": ("bscTestnet", 97, "https://data-seed-prebsc-1-s1.binance.org:8545"),
+    "bsc": ("bscTestnet", 97, "https://data-seed-prebsc-1-s1.binance.org:8545"),
+    "ethereum": ("sepolia", 11155111, "https://rpc.sepolia.org"),
+}
+DEFAULT_CHAIN = "base"
+
+# npm package (also the key used for web3_library) -> version range
+LIBRARY_VERSIONS = {
+    "ethers": "^6.13.0",
+    "web3": "^4.11.0",
+    "viem": "^2.21.0",
+}
+
+# What the frontend agent is told about web3/connection.js, which it cannot see.
+CONNECTION_API = """
+web3/connection.js is generated by the backend and exports:
+- CONTRACT_ADDRESS: address of the deployed primary contract
+- CONTRACT_ADDRESSES: object mapping every contract name to its deployed address
+- CONTRACT_NAMES: array of the contract names in contracts/
+- CHAIN_ID, RPC_URL
+- connectWallet(): asks the browser wallet for accounts, returns the selected address
+- getContract(abi, address = CONTRACT_ADDRESS): contract instance bound to the wallet signer
+""".strip()
+
+
+def address_placeholder(contract_name: str) -> str:
+    """Placeholder in web3/connection.js replaced with `contract_name`'s deployed address."""
+    return f"<DEPLOYED_{contract_name}_ADDRESS>"
+
+
+def render_repo_files(
+    recommended_chain: Optional[str],
+    web3_library: Optional[str],
+    contracts: List[Dict[str, Any]],
+) -> List[Dict[str, str]]:
+    """
+    Render every TEMPLATE_PATHS file as {"path", "content"} from the generated
+    contract files (used for contract names, constructor arguments and the
+    pragma) plus the chain and web3 library chosen by the Blockchain Architect.
+    """
+    specs = _contract_specs(contracts)
+    network, chain_id, rpc_url = _network_for(recommended_chain)
+    library = _library_for(web3_library)
+    solidity_version = _solidity_version(contracts)
+    names = [spec["name"] for spec in specs]
+
+    return [
+        {"path": "hardhat.config.js", "content": _render_hardhat_config(solidity_version, network, chain_id, rpc_url)},
+        {"path": "package.json", "content": _render_package_json(library, network)},
+        {"path": "scripts/deploy.js", "content": _render_deploy_script(specs)},
+        {"path": "test/smoke.test.js", "content": _render_smoke_test(specs)},
+        {"path": "web3/connection.js", "content": _render_connection(library, names, chain_id, rpc_url)},
+        {"path": "frontend/index.html", "content": _FRONTEND_INDEX},
+    ]
+
+
+# ---------- inputs ----------
+
+_CONTRACT_RE = re.compile(r"^\s*(abstract\s+)?contract\s+([A-Za-z_][A-Za-z0-9_]*)", re.MULTILINE)
+_CONSTRUCTOR_RE = re.compile(r"constructor\s*\(([^)]*)\)")
+_PRAGMA_RE = re.compile(r"pragma\s+solidity\s+[^0-9;]*([0-9]+\.[0-9]+\.[0-9]+)")
+
+
+def _contract_specs(contracts: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """One deployable contract per .sol file: its name and constructor parameters."""
+    specs = []
+    for file_obj in contracts:
+        source = file_obj.get("content") or ""
+        path = file_obj.get("path") or ""
+        if not path.endswith(".sol"):
+            continue
+        stem = path.rsplit("/", 1)[-1][: -len(".sol")]
+        declared = [(bool(abstract), name) for abstract, name in _CONTRACT_RE.findall(source)]
+        concrete = [name for abstract, name in declared if not abstract]
+        if stem in concrete or not concrete:
+            name = stem
+        else:
+            name = concrete[0]
+        specs.append({"name": name, "params": _constructor_params(source)})
+    return specs
+
+
+def _constructor_params(source: str) -> List[Tuple[str, str]]:
+    match = _CONSTRUCTOR_RE.search(source)
+    if not match or not match.group(1).strip():
+        return []
+    params = []
+    for raw in match.group(1).split(","):
+        tokens = raw.split()
+        if not tokens:
+            continue
+        param_type = tokens[0]
+        name = tokens[-1] if len(tokens) > 1 else ""
+        params.append((param_type, name))
+    return params
+
+
+def _solidity_version(contracts: List[Dict[str, Any]]) -> str:
+    versions = []
+    for file_obj in contracts:
+        for version in _PRAGMA_RE.findall(file_obj.get("content") or ""):
+            versions.append(tuple(int(part) for part in version.split(".")))
+    if not versions:
+        return DEFAULT_SOLIDITY_VERSION
+    return ".".join(str(part) for part in max(versions))
+
+
+def _network_for(recommended_chain: Optional[str]) -> Tuple[str, int, str]:
+    chain = (recommended_chain or "").lower()
+    for keyword, network in CHAIN_NETWORKS.items():
+        if keyword in chain:
+            return network
+    return CHAIN_NETWORKS[DEFAULT_CHAIN]
+
+
+def _library_for(web3_library: Optional[str]) -> str:
+    library = (web3_library or "").lower()
+    if "viem" in library or "wagmi" in library:
+        return "viem"
+    if "web3" in library and "ethers" not in library:
+        return "web3"
+    return "ethers"
+
+
+def _constructor_args(params: List[Tuple[str, str]], deployer: str, deployed: List[str]) -> List[str]:
+    """JS expressions for constructor arguments; addresses wire up earlier contracts by name."""
+    args = []
+    for param_type, name in params:
+        if param_type.endswith("]"):
+            args.append("[]")
+        elif param_type == "address":
+            key = name.strip("_").lower()
+            match = next(
+                (contract for contract in deployed if key and (key in contract.lower() or contract.lower().endswith(key))),
+                None,
+            )
+            args.append(f"await deployed.{match}.getAddress()" if match else f"{deployer}.address")
+        elif param_type == "bool":
+            args.append("false")
+        elif param_type == "string":
+            args.append(json.dumps(name.strip("_") or "example"))
+        elif param_type == "bytes32":
+            args.append("ethers.ZeroHash")
+        elif param_type == "bytes":
+            args.append('"0x"')
+        elif param_type.startswith("bytes"):
+            # Fixed-size bytesN must be exactly N zero bytes, as the backend deploy passes them.
+            args.append(json.dumps("0x" + "00" * int(param_type[len("bytes"):])))
+        else:
+            args.append("0")
+    return args
+
+
+# ---------- renderers ----------
+
+def _render_hardhat_config(solidity_version: str, network: str, chain_id: int, rpc_url: str) -> str:
+    return Template("""require("@nomicfoundation/hardhat-toolbox");
+require("dotenv").config();
+
+const accounts = process.env.PRIVATE_KEY ? [process.env.PRIVATE_KEY] : [];
+
+/** @type import('hardhat/config').HardhatUserConfig */
+module.exports = {
+  solidity: {
+    version: "$solidity_version",
+    settings: { optimizer: { enabled: true, runs: 200 } },
+  },
+  networks: {
+    $network: {
+      url: process.env.RPC_URL || "$rpc_url",
+      chainId: $chain_id,
+      accounts,
+    },
+  },
+};
+""").substitute(solidity_version=solidity_version, network=network, chain_id=chain_id, rpc_url=rpc_url)
+
+
+def _render_package_json(library: str, network: str) -> str:
+    dependencies = {
+        "react": "^18.3.1",
+        "react-dom": "^18.3.1",
+        library: LIBRARY_VERSIONS[library],
+    }
+    package = {
+        "name": "web3-starter",
+        "version": "0.1.0",
+        "private": True,
+        "scripts": {
+            "compile": "hardhat compile",
+            "test": "hardhat test",
+            "deploy": f"hardhat run scripts/deploy.js --network {network}",
+            "deploy:local": "hardhat run scripts/deploy.js",
+            "dev": "vite frontend",
+            "build": "vite build frontend",
+        },
+        "dependencies": dependencies,
+        "devDependencies": {
+            "@nomicfoundation/hardhat-toolbox": "^5.0.0",
+            "@types/react": "^18.3.3",
+            "@types/react-dom": "^18.3.0",
+            "@vitejs/plugin-react": "^4.3.1",
+            "dotenv": "^16.4.5",
+            "hardhat": "^2.22.10",
+            "typescript": "^5.5.4",
+            "vite": "^5.4.2",
+        },
+    }
+    return json.dumps(package, indent=2) + "\n"
+
+
+def _deploy_lines(specs: List[Dict[str, Any]], signer: str, indent: str) -> List[str]:
+    """Deploy every contract in order into a `deployed` object keyed by name."""
+    lines = []
+    deployed: List[str] = []
+    for spec in specs:
+        name = spec["name"]
+        args = ", ".join(_constructor_args(spec["params"], signer, deployed))
+        lines.append(f'{indent}deployed.{name} = await ethers.deployContract("{name}", [{args}]);')
+        lines.append(f"{indent}await deployed.{name}.waitForDeployment();")
+        deployed.append(name)
+    return lines
+
+
+def _render_deploy_script(specs: List[Dict[str, Any]]) -> str:
+    lines = _deploy_lines(specs, "deployer", "  ")
+    for spec in specs:
+        lines.append(f'  console.log("{spec["name"]} deployed to", await deployed.{spec["name"]}.getAddress());')
+    body = "\n".join(lines) if lines else '  console.log("No contracts to deploy.");'
+    return Template("""const { ethers } = require("hardhat");
+
+async function main() {
+  const [deployer] = await ethers.getSigners();
+  console.log("Deploying with", deployer.address);
+  const deployed = {};
+
+$body
+}
+
+main().catch((error) => {
+  console.error(error);
+  process.exitCode = 1;
+});
+""").substitute(body=body)
+
+
+def _render_smoke_test(specs: List[Dict[str, Any]]) -> str:
+    setup = "\n".join(_deploy_lines(specs, "owner", "    "))
+    cases = "\n\n".join(
+        f'  it("deploys {spec["name"]}", async function () {{\n'
+        f'    expect(await deployed.{spec["name"]}.getAddress()).to.be.properAddress;\n'
+        f"  }});"
+        for spec in specs
+    ) or '  it("has no contracts yet", function () {});'
+    return Template("""const { expect } = require("chai");
+const { ethers } = require("hardhat");
+
+describe("Smoke test", function () {
+  const deployed = {};
+
+  before(async function () {
+    const [owner] = await ethers.getSigners();
+$setup
+  });
+
+$cases
+});
+""").substitute(setup=setup, cases=cases)
+
+
+def _render_connection(library: str, names: List[str], chain_id: int, rpc_url: str) -> str:
+    imports, body = _CONNECTION_BODIES[library]
+    header = Template("""// Generated connection helper. Addresses are filled in after deployment.
+$imports
+
+export const CONTRACT_ADDRESS = "<DEPLOYED_CONTRACT_ADDRESS>";
+export const CONTRACT_ADDRESSES = $addresses;
+export const CONTRACT_NAMES = $names;
+export const CHAIN_ID = $chain_id;
+export const RPC_URL = "$rpc_url";
+
+export async function connectWallet() {
+  if (!window.ethereum) throw new Error("No browser wallet found");
+  const accounts = await window.ethereum.request({ method: "eth_requestAccounts" });
+  return accounts[0];
+}
+""").substitute(
+        imports=imports,
+        addresses=json.dumps({name: address_placeholder(name) for name in names}),
+        names=json.dumps(names),
+        chain_id=chain_id,
+        rpc_url=rpc_url,
+    )
+    return header + "\n" + body
+
+
+# library -> (import line, getContract implementation)
+_CONNECTION_BODIES: Dict[str, Tuple[str, str]] = {
+    "ethers": ('import { BrowserProvider, Contract } from "ethers";', """export async function getContract(abi, address = CONTRACT_ADDRESS) {
+  const provider = new BrowserProvider(window.ethereum);
+  const signer = await provider.getSigner();
+  return new Contract(address, abi, signer);
+}
+"""),
+    "web3": ('import Web3 from "web3";', """export async function getContract(abi, address = CONTRACT_ADDRESS) {
+  const web3 = new Web3(window.ethereum);
+  const [from] = await web3.eth.getAccounts();
+  const contract = new web3.eth.Contract(abi, address);
+  contract.defaultAccount = from;
+  return contract;
+}
+"""),
+    "viem": (
+        'import { createWalletClient, createPublicClient, custom, http, getContract as viemContract } from "viem";',
+        """export async function getContract(abi, address = CONTRACT_ADDRESS) {
+  const [account] = await window.ethereum.request({ method: "eth_requestAccounts" });
+  const walletClient = createWalletClient({ account, transport: custom(window.ethereum) });
+  const publicClient = createPublicClient({ transport: http(RPC_URL) });
+  return viemContract({ address, abi, client: { public: publicClient, wallet: walletClient } });
+}
+""",
+    ),
+}
+
+_FRONTEND_INDEX = """<!doctype html>
+<html lang="en">
+  <head>
+    <meta charset="UTF-8" />
+    <meta name="viewport" content="width=device-width, initial-scale=1.0" />
+    <title>Web3 Starter</title>
+  </head>
+  <body>
+    <div id="root"></div>
+    <script type="module" src="/src/main.tsx"></script>
+  </body>
+</html>
+"""
+
+__all__ = ["CONNECTION_API", "TEMPLATE_PATHS", "address_placeholder", "render_repo_files"]
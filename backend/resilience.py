@@ -0,0 +1,217 @@
+import email.utils
+import random
+import time
+from collections import deque
+from threading import Lock
+from typing import Any, Deque, Dict, Optional
+
+RETRYABLE_STATUS_CODES = {408, 409, 429}
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling the provider while the circuit breaker is open."""
+
+    def __init__(self, retry_after: float) -> None:
+        super().__init__(f"LLM provider circuit is open; retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class RetryPolicy:
+    """
+    Decide whether a failed LLM call is worth retrying and how long to wait.
+
+    Rate limits, 5xx responses, timeouts and connection errors are transient;
+    everything else (bad request, auth, invalid model, ...) fails immediately.
+    Delays use full-jitter exponential backoff unless the provider sent a
+    Retry-After header, which takes precedence.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 3,
+        base_delay: float = 1.0,
+        max_delay: float = 20.0,
+        max_retry_after: float = 60.0,
+    ) -> None:
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+
+    def classify(self, exc: BaseException) -> Optional[str]:
+        """Return a short reason for transient errors, or None if not retryable."""
+        name = type(exc).__name__
+        if name in ("APITimeoutError", "TimeoutException", "ReadTimeout", "ConnectTimeout") or isinstance(
+            exc, TimeoutError
+        ):
+            return "timeout"
+        if name in ("APIConnectionError", "ConnectError", "RemoteProtocolError") or isinstance(
+            exc, ConnectionError
+        ):
+            return "connection"
+        status = getattr(exc, "status_code", None)
+        if status == 429:
+            return "rate_limited"
+        if isinstance(status, int) and (status >= 500 or status in RETRYABLE_STATUS_CODES):
+            return f"http_{status}"
+        return None
+
+    def delay(self, attempt: int, exc: Optional[BaseException] = None) -> float:
+        """Seconds to wait before retry number `attempt` (1-based)."""
+        retry_after = _retry_after_seconds(exc)
+        if retry_after is not None:
+            return min(retry_after, self.max_retry_after)
+        ceiling = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+        return random.uniform(0, ceiling)
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    After `failure_threshold` transient failures in a row the circuit opens and
+    calls fail fast for `reset_timeout` seconds. Then a single probe call is let
+    through (half-open); its outcome closes or re-opens the circuit. A probe
+    that ends without an outcome (cancelled) must hand its slot back with
+    `release_probe()`.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0) -> None:
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state
+
+    def before_call(self) -> bool:
+        """Raise CircuitOpenError if the call may not run; returns True if it is the half-open probe."""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return False
+            remaining = self._opened_at + self.reset_timeout - time.monotonic()
+            if self._state == self.OPEN and remaining <= 0:
+                self._state = self.HALF_OPEN
+                self._probe_in_flight = False
+            if self._state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            raise CircuitOpenError(max(remaining, 1.0))
+
+    def release_probe(self) -> None:
+        """Let the next call probe again after the probe ended without an outcome."""
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._probe_in_flight = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._probe_in_flight = False
+
+
+class HedgePolicy:
+    """
+    Decide when to fire a duplicate ("hedge") of a slow call.
+
+    Latencies are tracked per key (agent name) over a sliding window; once a key
+    has `min_samples` observations, a call still running after the configured
+    percentile of that window is hedged. Hedges draw from a token bucket that
+    earns `budget_ratio` tokens per call, capping hedge volume at roughly that
+    fraction of traffic.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = False,
+        percentile: float = 0.95,
+        min_samples: int = 20,
+        window: int = 200,
+        budget_ratio: float = 0.1,
+        min_delay: float = 1.0,
+        max_burst: float = 10.0,
+    ) -> None:
+        self.enabled = enabled
+        self.percentile = min(max(percentile, 0.0), 1.0)
+        self.min_samples = max(1, min_samples)
+        self.window = window
+        self.budget_ratio = budget_ratio
+        self.min_delay = min_delay
+        self.max_burst = max_burst
+        self._latencies: Dict[str, Deque[float]] = {}
+        self._tokens = 0.0
+        self._lock = Lock()
+
+    def observe(self, key: str, latency: float) -> None:
+        with self._lock:
+            samples = self._latencies.get(key)
+            if samples is None:
+                samples = self._latencies[key] = deque(maxlen=self.window)
+            samples.append(latency)
+
+    def trigger_delay(self, key: str) -> Optional[float]:
+        """Seconds after which a call for `key` should be hedged, or None."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            self._tokens = min(self._tokens + self.budget_ratio, self.max_burst)
+            samples = self._latencies.get(key)
+            if not samples or len(samples) < self.min_samples:
+                return None
+            ordered = sorted(samples)
+        index = min(int(self.percentile * len(ordered)), len(ordered) - 1)
+        return max(ordered[index], self.min_delay)
+
+    def try_acquire(self) -> bool:
+        """Spend one hedge from the budget; False if the budget is exhausted."""
+        with self._lock:
+            if self._tokens < 1.0:
+                return False
+            self._tokens -= 1.0
+            return True
+
+
+def _retry_after_seconds(exc: Optional[BaseException]) -> Optional[float]:
+    response: Any = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms:
+        try:
+            return max(float(retry_after_ms) / 1000.0, 0.0)
+        except ValueError:
+            pass
+    retry_after = headers.get("retry-after")
+    if not retry_after:
+        return None
+    try:
+        return max(float(retry_after), 0.0)
+    except ValueError:
+        try:
+            parsed = email.utils.parsedate_to_datetime(retry_after)
+        except (TypeError, ValueError):
+            return None
+        return max(parsed.timestamp() - time.time(), 0.0)
+
+
+__all__ = ["CircuitBreaker", "CircuitOpenError", "HedgePolicy", "RetryPolicy"]
@@ -0,0 +1,153 @@
+import logging
+import os
+import re
+from pathlib import Path
+from threading import Lock
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from packaging.version import Version
+from solcx import get_installable_solc_versions, get_installed_solc_versions, install_solc
+from solcx.install import get_executable, select_pragma_version
+
+logger = logging.getLogger(__name__)
+
+_PRAGMA_RE = re.compile(r"pragma\s+solidity\s+([^;]+);")
+
+
+class SolcUnavailable(RuntimeError):
+    """Raised when no installed (or, offline, installable) solc satisfies a pragma."""
+
+
+class SolcManager:
+    """
+    Map `pragma solidity` constraints to solc binaries without per-request installs.
+
+    Versions already on disk (the py-solc-x folder, SOLCX_BINARY_PATH if set)
+    are scanned once and kept in a version -> binary map. A pragma resolves to
+    the newest installed version that satisfies every pragma in the source;
+    only when none does is a version downloaded: the default if it fits,
+    otherwise the newest matching release. Sources without a pragma use the
+    default version. With `offline=True` nothing is ever
+    downloaded, so a pre-seeded binary folder is all an air-gapped host needs.
+    """
+
+    def __init__(self, default_version: str = "0.8.20", offline: bool = False) -> None:
+        self.default_version = Version(default_version)
+        self.offline = offline
+        self._binaries: Optional[Dict[Version, Path]] = None
+        self._installable: Optional[List[Version]] = None
+        self._lock = Lock()
+        self._install_locks: Dict[Version, Lock] = {}
+        self._counters = {"resolved": 0, "installs": 0, "install_failures": 0}
+
+    def resolve(self, solidity_source: str) -> Tuple[Version, Path]:
+        """Pick a compiler for `solidity_source`, installing one only if nothing installed fits."""
+        pragmas = [p.strip() for p in _PRAGMA_RE.findall(solidity_source)]
+        # Without a pragma, stick to the configured default.
+        version = self._select(pragmas, self._installed()) if pragmas else None
+        if version is None:
+            version = self._select(pragmas, [self.default_version])
+        if version is None and not self.offline:
+            version = self._select(pragmas, self._installable_versions())
+        if version is None:
+            raise SolcUnavailable(
+                f"No {'installed ' if self.offline else ''}solc version satisfies {pragmas or 'the source'}"
+            )
+        with self._lock:
+            self._counters["resolved"] += 1
+        return version, self.binary_for(version)
+
+    def binary_for(self, version: Version) -> Path:
+        binaries = self._installed_map()
+        path = binaries.get(version)
+        if path is not None:
+            return path
+        if self.offline:
+            raise SolcUnavailable(f"solc {version} is not installed and offline mode is enabled")
+
+        with self._lock:
+            install_lock = self._install_locks.setdefault(version, Lock())
+        # One download per version even when several requests need it at once.
+        with install_lock:
+            path = binaries.get(version)
+            if path is not None:
+                return path
+            logger.info("Installing solc %s", version)
+            try:
+                install_solc(version)
+                path = get_executable(version)
+            except Exception:
+                with self._lock:
+                    self._counters["install_failures"] += 1
+                raise
+            with self._lock:
+                binaries[version] = path
+                self._counters["installs"] += 1
+            return path
+
+    def warm(self, versions: Iterable[str]) -> Dict[str, str]:
+        """
+        Make sure each version is available (installing it unless offline).
+        Failures are logged rather than raised so startup is never blocked.
+        """
+        ready = {}
+        for raw in versions:
+            raw = raw.strip()
+            if not raw:
+                continue
+            try:
+                ready[raw] = str(self.binary_for(Version(raw)))
+            except Exception as exc:
+                logger.warning("Could not prepare solc %s: %s", raw, exc)
+        return ready
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+            installed = sorted(str(v) for v in (self._binaries or {}))
+        return {**counters, "installed": installed, "offline": self.offline}
+
+    # ---------- internals ----------
+
+    @staticmethod
+    def _select(pragmas: List[str], candidates: List[Version]) -> Optional[Version]:
+        if not candidates:
+            return None
+        matching = [v for v in candidates if all(select_pragma_version(p, [v]) for p in pragmas)]
+        return max(matching) if matching else None
+
+    def _installed(self) -> List[Version]:
+        return list(self._installed_map())
+
+    def _installed_map(self) -> Dict[Version, Path]:
+        with self._lock:
+            if self._binaries is None:
+                binaries = {}
+                for version in get_installed_solc_versions():
+                    try:
+                        binaries[version] = get_executable(version)
+                    except Exception:
+                        continue
+                self._binaries = binaries
+            return self._binaries
+
+    def _installable_versions(self) -> List[Version]:
+        with self._lock:
+            cached = self._installable
+        if cached is None:
+            try:
+                cached = get_installable_solc_versions()
+            except Exception as exc:
+                logger.warning("Could not list installable solc versions: %s", exc)
+                return []
+            with self._lock:
+                self._installable = cached
+        return cached
+
+
+solc_manager = SolcManager(
+    default_version=os.getenv("SOLC_DEFAULT_VERSION", "0.8.20"),
+    offline=os.getenv("SOLC_OFFLINE", "0").lower() in ("1", "true", "yes"),
+)
+
+__all__ = ["SolcManager", "SolcUnavailable", "solc_manager"]
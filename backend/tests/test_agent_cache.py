@@ -0,0 +1,53 @@
+import asyncio
+
+from agent_cache import AgentCache
+
+
+class FakeClock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_disk_hit_keeps_the_original_expiry(tmp_path):
+    clock = FakeClock()
+    AgentCache(tmp_path, ttl_seconds=10, clock=clock).put("ab" * 32, {"x": 1})
+    clock.now += 6
+    cache = AgentCache(tmp_path, ttl_seconds=10, clock=clock)
+    assert cache.get("ab" * 32) == {"x": 1}
+    clock.now += 5
+    # Served from memory now, but the entry was written more than a TTL ago.
+    assert cache.get("ab" * 32) is None
+
+
+def test_expired_disk_entry_is_a_miss(tmp_path):
+    clock = FakeClock()
+    AgentCache(tmp_path, ttl_seconds=10, clock=clock).put("ab" * 32, {"x": 1})
+    clock.now += 10
+    cache = AgentCache(tmp_path, ttl_seconds=10, clock=clock)
+    assert cache.get("ab" * 32) is None
+    assert not list(tmp_path.glob("*/*.json"))
+
+
+def test_overwriting_a_key_does_not_grow_disk_usage(tmp_path):
+    cache = AgentCache(tmp_path)
+    cache.put("ab" * 32, {"x": "a" * 100})
+    cache.put("cd" * 32, {"x": "b" * 100})
+    for _ in range(5):
+        cache.put("ab" * 32, {"x": "a" * 100})
+    assert cache.stats()["disk_bytes"] == sum(p.stat().st_size for p in tmp_path.glob("*/*.json"))
+
+
+def test_async_round_trip_through_disk(tmp_path):
+    async def run():
+        await AgentCache(tmp_path).aput("cd" * 32, {"y": 2})
+        cache = AgentCache(tmp_path)
+        assert await cache.aget("cd" * 32) == {"y": 2}
+        assert await cache.aget("ef" * 32) is None
+        return cache.stats()
+
+    stats = asyncio.run(run())
+    assert stats["disk_hits"] == 1
+    assert stats["misses"] == 1
@@ -0,0 +1,54 @@
+import asyncio
+
+import deploy_contracts
+from deployment_tracker import DeploymentTracker
+
+
+def _ctor(*inputs):
+    return [{"type": "constructor", "inputs": [{"type": t, "name": n} for t, n in inputs]}]
+
+
+def test_address_references_never_match_the_contract_itself():
+    spec = {"name": "TokenVault", "abi": _ctor(("address", "vault"), ("uint256", "cap"), ("address", "owner"))}
+    # "vault" would match TokenVault first; it must resolve to Vault for both the order and the arguments.
+    references = deploy_contracts._address_references(spec, ["TokenVault", "Token", "Vault"])
+    assert references == {0: "Vault"}
+
+    args = deploy_contracts._constructor_args(spec["abi"], "0xDeployer", {0: "0xVault"})
+    assert args == ["0xVault", 0, "0xDeployer"]
+
+
+def _receipt(status):
+    return {"transactionHash": "0xabc", "blockNumber": "0x1", "gasUsed": "0x5208", "status": status}
+
+
+def test_wait_until_mined_follows_the_tracker(monkeypatch):
+    tracker = DeploymentTracker(providers=None, nonces=None, poll_interval=3600)
+    monkeypatch.setattr(deploy_contracts, "deployment_tracker", tracker)
+    monkeypatch.setattr(deploy_contracts, "DEPENDENCY_WAIT_SECONDS", 0.5)
+    address = "0x" + "22" * 20
+
+    async def run():
+        await tracker.start()
+        try:
+            records = {name: tracker.track("http://fake-rpc", "0x" + name, address) for name in ("ok", "reverted", "stuck")}
+            deployments = [
+                {"name": name, "deployment_id": record["deployment_id"], "address": address, "status": "pending"}
+                for name, record in records.items()
+            ]
+            deployments.append({"name": "reused", "deployment_id": "gone", "address": address, "status": "confirmed"})
+
+            async def mine():
+                await asyncio.sleep(0.05)
+                tracker._apply(records["ok"]["deployment_id"], _receipt("0x1"), None)
+                tracker._apply(records["reverted"]["deployment_id"], _receipt("0x0"), None)
+                tracker._notify()
+
+            _, errors = await asyncio.gather(mine(), deploy_contracts._wait_until_mined(deployments))
+            return deployments, errors
+        finally:
+            await tracker.stop()
+
+    deployments, errors = asyncio.run(run())
+    assert errors == {"reverted": "Deployment transaction reverted", "stuck": "Not mined within 0.5s"}
+    assert [d["status"] for d in deployments] == ["confirmed", "pending", "pending", "confirmed"]
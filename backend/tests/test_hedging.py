@@ -0,0 +1,65 @@
+import asyncio
+import os
+from types import SimpleNamespace
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("AGENT_CACHE_ENABLED", "0")
+
+import main  # noqa: E402
+from resilience import HedgePolicy  # noqa: E402
+
+
+def _fake_client(latencies):
+    """Each create() call sleeps for the next latency, then returns its index."""
+    calls = []
+
+    async def create(**request):
+        index = len(calls)
+        calls.append(index)
+        await asyncio.sleep(latencies[index])
+        return index
+
+    return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create))), calls
+
+
+def _policy():
+    policy = HedgePolicy(enabled=True, min_samples=1, min_delay=0.02, budget_ratio=1.0)
+    policy.observe("agent", 0.02)
+    return policy
+
+
+def test_hedge_win_records_the_primary_latency(monkeypatch):
+    policy = _policy()
+    fake, calls = _fake_client([0.3, 0.01])
+    monkeypatch.setattr(main, "client", fake)
+    monkeypatch.setattr(main, "llm_hedge_policy", policy)
+
+    async def run():
+        result = await main._create_completion("agent")
+        # The slow primary keeps running after the hedge has answered.
+        await asyncio.sleep(0.4)
+        return result
+
+    assert asyncio.run(run()) == 1
+    assert calls == [0, 1]
+    samples = list(policy._latencies["agent"])
+    assert len(samples) == 2
+    assert samples[-1] >= 0.3
+
+
+def test_primary_win_records_its_latency_and_cancels_the_hedge(monkeypatch):
+    policy = _policy()
+    fake, calls = _fake_client([0.05, 0.5])
+    monkeypatch.setattr(main, "client", fake)
+    monkeypatch.setattr(main, "llm_hedge_policy", policy)
+
+    async def run():
+        started = asyncio.get_running_loop().time()
+        result = await main._create_completion("agent")
+        return result, asyncio.get_running_loop().time() - started
+
+    result, elapsed = asyncio.run(run())
+    assert result == 0 and elapsed < 0.4
+    samples = list(policy._latencies["agent"])
+    assert len(samples) == 2
+    assert 0.05 <= samples[-1] < 0.4
@@ -0,0 +1,56 @@
+import json
+
+from json_stream import FileObjectStream
+
+DOCUMENT = {
+    "contracts": [
+        {"path": "contracts/Ticket.sol", "content": "contract Ticket { string s = \"}{\"; }"},
+        {"path": "contracts/Market.sol", "content": "// a \\ backslash, a \"quote\" and ] [ brackets\n"},
+    ],
+    "backend": [{"path": "server/index.js", "content": "const o = {a: [1, 2]};", "meta": {"lines": 1}}],
+    "notes": "not a file list",
+    "frontend": [],
+}
+
+
+def _feed_in_chunks(text, size):
+    stream = FileObjectStream()
+    found = []
+    for start in range(0, len(text), size):
+        found.extend(stream.feed(text[start:start + size]))
+    return found
+
+
+def _expected():
+    return [(section, file_obj) for section, files in DOCUMENT.items() if isinstance(files, list) for file_obj in files]
+
+
+def test_every_chunk_size_yields_the_same_files():
+    text = json.dumps(DOCUMENT, indent=2)
+    for size in (1, 2, 3, 7, 64, len(text)):
+        assert _feed_in_chunks(text, size) == _expected(), size
+
+
+def test_escapes_split_across_chunks():
+    text = json.dumps({"contracts": [{"path": "a\\\"b.sol", "content": "x\\\\\"y"}]})
+    # Split right after each backslash so the escaped character arrives in the next delta.
+    pieces = text.split("\\")
+    stream = FileObjectStream()
+    found = []
+    for index, piece in enumerate(pieces):
+        found.extend(stream.feed(piece + ("\\" if index < len(pieces) - 1 else "")))
+    assert found == [("contracts", {"path": 'a\\"b.sol', "content": 'x\\\\"y'})]
+
+
+def test_files_are_reported_as_soon_as_they_close():
+    stream = FileObjectStream()
+    assert stream.feed('{"contracts": [{"path": "a.sol", "content": "1"}') == [
+        ("contracts", {"path": "a.sol", "content": "1"})
+    ]
+    assert stream.feed(', {"path": "b.sol", ') == []
+    assert stream.feed('"content": "2"}]}') == [("contracts", {"path": "b.sol", "content": "2"})]
+
+
+def test_prose_before_the_document_and_objects_without_a_path_are_ignored():
+    text = 'Here is the code:\n```json\n{"contracts": [{"content": "no path"}, {"path": "a.sol", "content": ""}]}\n```'
+    assert _feed_in_chunks(text, 5) == [("contracts", {"path": "a.sol", "content": ""})]
@@ -0,0 +1,32 @@
+import asyncio
+import os
+
+import pytest
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("AGENT_CACHE_ENABLED", "0")
+
+import main  # noqa: E402
+from resilience import CircuitBreaker  # noqa: E402
+
+
+def test_cancelled_probe_does_not_wedge_the_breaker(monkeypatch):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.0)
+    monkeypatch.setattr(main, "llm_circuit_breaker", breaker)
+    breaker.before_call()
+    breaker.record_failure()
+
+    async def slow_call():
+        await asyncio.sleep(10)
+
+    async def run():
+        task = asyncio.create_task(main._with_llm_retries("test-agent", slow_call))
+        await asyncio.sleep(0)
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(run())
+    # The next call gets to probe instead of failing fast until a restart.
+    assert breaker.before_call() is True
@@ -0,0 +1,217 @@
+import hashlib
+import json
+from types import SimpleNamespace
+
+import pytest
+import requests
+
+from nonce_manager import NonceManager
+
+SENDER = "0x" + "11" * 20
+
+
+class FakeAccount:
+    address = SENDER
+
+    def sign_transaction(self, transaction):
+        raw = json.dumps(transaction, sort_keys=True).encode()
+        return SimpleNamespace(raw_transaction=raw, hash=hashlib.sha256(raw).digest())
+
+
+class FakeClient:
+    """Records every broadcast; `on_send(tx)` may raise to simulate node or transport errors."""
+
+    rpc_url = "http://fake-rpc"
+    chain_id = 1
+
+    def __init__(self, pending=5, on_send=None):
+        self.pending = pending
+        self.on_send = on_send
+        self.sent = []
+        self.known = set()
+        self.batch_error = None
+        self.web3 = SimpleNamespace(eth=SimpleNamespace(send_raw_transaction=self._send_raw))
+
+    def pending_nonce(self, address):
+        return self.pending
+
+    def gas_price(self):
+        return 10
+
+    def batch(self, calls):
+        if self.batch_error is not None:
+            raise self.batch_error
+        results = []
+        for method, params in calls:
+            if method == "eth_getTransactionByHash":
+                results.append({"hash": params[0]} if params[0] in self.known else None)
+            elif method == "eth_getTransactionCount":
+                results.append(hex(self.pending))
+        return results
+
+    def _send_raw(self, raw):
+        tx = json.loads(raw)
+        if self.on_send is not None:
+            self.on_send(tx)
+        self.sent.append(tx)
+        self.known.add("0x" + hashlib.sha256(raw).hexdigest())
+        self.pending = max(self.pending, tx["nonce"] + 1)
+
+
+def _tx():
+    return {"from": SENDER, "gasPrice": 10, "gas": 100000, "chainId": 1, "data": "0x00", "value": 0}
+
+
+def test_allocates_consecutive_nonces_from_the_pending_count():
+    manager = NonceManager()
+    client = FakeClient(pending=5)
+    account = FakeAccount()
+    assert manager.send(client, account, _tx())[1] == 5
+    assert manager.send(client, account, _tx())[1] == 6
+    # The caller's chain count never pulls the counter backwards.
+    assert manager.send(client, account, _tx(), chain_nonce=3)[1] == 7
+    assert manager.stats()["in_flight"] == 3
+
+
+def test_rejected_nonce_is_reused_by_the_next_send():
+    manager = NonceManager()
+    account = FakeAccount()
+
+    def reject_once(tx):
+        client.on_send = None
+        raise ValueError("insufficient funds for gas * price + value")
+
+    client = FakeClient(pending=5, on_send=reject_once)
+    with pytest.raises(ValueError):
+        manager.send(client, account, _tx())
+    assert manager.send(client, account, _tx())[1] == 5
+    assert manager.stats()["released"] == 1
+
+
+def test_nonce_too_low_resyncs_from_chain():
+    manager = NonceManager()
+    account = FakeAccount()
+    client = FakeClient(pending=5)
+    manager.send(client, account, _tx())
+
+    def too_low(tx):
+        if tx["nonce"] < 9:
+            raise ValueError("nonce too low")
+
+    # Another process sent three transactions from the same key.
+    client.pending = 9
+    client.on_send = too_low
+    assert manager.send(client, account, _tx())[1] == 9
+    assert manager.stats()["resyncs"] == 1
+
+
+def test_already_known_counts_as_sent():
+    manager = NonceManager()
+    account = FakeAccount()
+
+    def already_known(tx):
+        raise ValueError("already known")
+
+    client = FakeClient(pending=5, on_send=already_known)
+    tx_hash, nonce = manager.send(client, account, _tx())
+    raw = json.dumps({**_tx(), "nonce": 5}, sort_keys=True).encode()
+    assert (tx_hash, nonce) == ("0x" + hashlib.sha256(raw).hexdigest(), 5)
+    assert manager.stats()["in_flight"] == 1
+    assert manager.stats()["resyncs"] == 0
+
+
+def test_transport_failure_after_the_node_got_it_counts_as_sent():
+    manager = NonceManager()
+    account = FakeAccount()
+    client = FakeClient(pending=5)
+
+    def lost_reply(tx):
+        client.on_send = None
+        client._send_raw(json.dumps(tx, sort_keys=True).encode())
+        raise requests.ReadTimeout("read timed out")
+
+    client.on_send = lost_reply
+    assert manager.send(client, account, _tx())[1] == 5
+    assert manager.send(client, account, _tx())[1] == 6
+    assert len(client.sent) == 2
+
+
+def test_unresolved_transport_failure_keeps_the_nonce_reserved():
+    manager = NonceManager()
+    account = FakeAccount()
+
+    def unreachable(tx):
+        raise requests.ConnectionError("connection reset")
+
+    client = FakeClient(pending=5, on_send=unreachable)
+    client.batch_error = requests.ConnectionError("connection refused")
+    with pytest.raises(requests.ConnectionError):
+        manager.send(client, account, _tx())
+    assert manager.stats()["unresolved"] == 1
+
+    # Still unknown: the next send must not reuse nonce 5.
+    client.on_send = None
+    assert manager.send(client, account, _tx())[1] == 6
+
+    # The node is back and never saw nonce 5, so nonce 6 is queued behind the
+    # gap and the pending count stays at 5.
+    client.batch_error = None
+    client.pending = 5
+    assert manager.send(client, account, _tx())[1] == 7
+    assert manager.stats()["unresolved"] == 0
+    # Nonce 5 was released below in-flight 6 and 7, so it was filled right away.
+    fill = next(tx for tx in client.sent if tx["nonce"] == 5)
+    assert fill["to"] == SENDER and fill["value"] == 0 and fill["gas"] == 21000
+
+
+def test_failed_nonce_below_an_in_flight_one_is_filled():
+    manager = NonceManager()
+    account = FakeAccount()
+    client = FakeClient(pending=5)
+
+    def concurrent_send_then_reject(tx):
+        if tx["nonce"] == 5:
+            client.on_send = None
+            # Another deployment takes nonce 6 while nonce 5 is being sent.
+            assert manager.send(client, account, _tx())[1] == 6
+            raise ValueError("intrinsic gas too low")
+
+    client.on_send = concurrent_send_then_reject
+    with pytest.raises(ValueError):
+        manager.send(client, account, _tx())
+
+    assert [tx["nonce"] for tx in client.sent] == [6, 5]
+    fill = client.sent[1]
+    assert fill["to"] == SENDER and "data" not in fill
+    assert manager.stats()["gap_fills"] == 1
+    # Nothing is left to hand out below the counter.
+    assert manager.send(client, account, _tx())[1] == 7
+
+
+def test_released_tail_winds_the_counter_back():
+    manager = NonceManager()
+    account = FakeAccount()
+    client = FakeClient(pending=5)
+    manager.send(client, account, _tx())
+
+    def reject(tx):
+        raise ValueError("exceeds block gas limit")
+
+    client.on_send = reject
+    with pytest.raises(ValueError):
+        manager.send(client, account, _tx())
+    client.on_send = None
+    assert manager.stats()["gap_fills"] == 0
+    assert manager.send(client, account, _tx())[1] == 6
+
+
+def test_resync_skips_nonces_still_in_flight():
+    manager = NonceManager()
+    account = FakeAccount()
+    client = FakeClient(pending=5)
+    manager.send(client, account, _tx())
+    manager.send(client, account, _tx())
+    # A lagging node reports a pending count that misses our two transactions.
+    client.pending = 5
+    assert manager.resync(client, SENDER) == 5
+    assert manager.send(client, account, _tx())[1] == 7
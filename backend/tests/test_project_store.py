@@ -0,0 +1,84 @@
+import json
+import sqlite3
+
+from project_store import ProjectStore
+
+
+def _project(project_id, user_id="u1", created_at="2024-01-01T00:00:00"):
+    return {"id": project_id, "user_id": user_id, "created_at": created_at, "name": project_id}
+
+
+def _ids(projects):
+    return [p["id"] for p in projects]
+
+
+def test_resaved_project_moves_to_the_top(tmp_path):
+    store = ProjectStore(tmp_path / "projects.db", legacy_json_path=None)
+    store.save(_project("a", created_at="2024-01-03T00:00:00"))
+    store.save(_project("b", created_at="2024-01-01T00:00:00"))
+    store.save(_project("c", created_at="2024-01-02T00:00:00"))
+    assert _ids(store.list("u1")) == ["c", "b", "a"]
+
+    store.save({**_project("a", created_at="2024-01-03T00:00:00"), "name": "renamed"})
+    assert _ids(store.list("u1")) == ["a", "c", "b"]
+    assert store.get("u1", "a")["name"] == "renamed"
+    assert store.delete("u1", "c") is True
+    assert store.delete("u2", "a") is False
+    assert _ids(store.list("u1")) == ["a", "b"]
+
+
+def test_legacy_json_is_imported_once_in_its_own_order(tmp_path):
+    legacy = tmp_path / "projects.json"
+    # Same created_at everywhere: only the file's order says which is newest.
+    legacy.write_text(json.dumps({
+        "u1": [_project("newest"), _project("middle"), _project("oldest")],
+        "u2": [{"id": "other", "created_at": "2024-01-01T00:00:00"}, {"name": "no id"}],
+    }))
+    store = ProjectStore(tmp_path / "projects.db", legacy_json_path=legacy)
+    assert _ids(store.list("u1")) == ["newest", "middle", "oldest"]
+    # Records without a user_id take the key they were filed under.
+    assert store.get("u2", "other")["user_id"] == "u2"
+
+    store.save(_project("fresh"))
+    assert _ids(store.list("u1")) == ["fresh", "newest", "middle", "oldest"]
+
+    # A second open (e.g. after a restart) does not import the file again.
+    legacy.write_text(json.dumps({"u1": [_project("late")]}))
+    reopened = ProjectStore(tmp_path / "projects.db", legacy_json_path=legacy)
+    assert _ids(reopened.list("u1")) == ["fresh", "newest", "middle", "oldest"]
+
+
+def test_unreadable_legacy_file_is_retried(tmp_path):
+    legacy = tmp_path / "projects.json"
+    legacy.write_text("{not json")
+    assert ProjectStore(tmp_path / "projects.db", legacy_json_path=legacy).list("u1") == []
+
+    legacy.write_text(json.dumps({"u1": [_project("a")]}))
+    assert _ids(ProjectStore(tmp_path / "projects.db", legacy_json_path=legacy).list("u1")) == ["a"]
+
+
+def test_database_without_saved_seq_is_upgraded(tmp_path):
+    path = tmp_path / "projects.db"
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE projects (id TEXT PRIMARY KEY, user_id TEXT NOT NULL, created_at TEXT NOT NULL DEFAULT '', data TEXT NOT NULL);
+        CREATE INDEX projects_user_created ON projects (user_id, created_at DESC);
+        CREATE TABLE store_meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+        INSERT INTO store_meta VALUES ('legacy_json_migrated', '0');
+    """)
+    for project in (_project("old", created_at="2024-01-01"), _project("new", created_at="2024-02-01")):
+        conn.execute(
+            "INSERT INTO projects VALUES (?, ?, ?, ?)",
+            (project["id"], project["user_id"], project["created_at"], json.dumps(project)),
+        )
+    conn.commit()
+    conn.close()
+
+    store = ProjectStore(path, legacy_json_path=None)
+    assert _ids(store.list("u1")) == ["new", "old"]
+    store.save(_project("old", created_at="2024-01-01"))
+    assert _ids(store.list("u1")) == ["old", "new"]
+    plan = store._connect().execute(
+        "EXPLAIN QUERY PLAN SELECT data FROM projects WHERE user_id = ? ORDER BY saved_seq DESC", ("u1",)
+    ).fetchall()
+    assert "projects_user_saved" in str(plan)
@@ -0,0 +1,55 @@
+import asyncio
+
+import pytest
+
+from resilience import CircuitBreaker, CircuitOpenError
+
+
+def _half_open_breaker() -> CircuitBreaker:
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.0)
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    return breaker
+
+
+def test_only_one_probe_while_half_open():
+    breaker = _half_open_breaker()
+    assert breaker.before_call() is True
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_cancelled_probe_releases_the_slot():
+    breaker = _half_open_breaker()
+
+    async def probe():
+        is_probe = breaker.before_call()
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            if is_probe:
+                breaker.release_probe()
+            raise
+
+    async def run():
+        task = asyncio.create_task(probe())
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(run())
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.before_call() is True
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.before_call() is False
+
+
+def test_release_probe_is_a_no_op_when_closed():
+    breaker = CircuitBreaker()
+    breaker.release_probe()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.before_call() is False
@@ -0,0 +1,105 @@
+import asyncio
+
+import pytest
+
+from singleflight import SingleFlight
+
+
+def test_concurrent_callers_share_one_run_and_get_their_own_copy():
+    flights = SingleFlight()
+    runs = []
+
+    async def work():
+        runs.append(1)
+        await asyncio.sleep(0.01)
+        return {"files": ["a.sol"]}
+
+    async def run():
+        first, second = await asyncio.gather(flights.do("k", work), flights.do("k", work))
+        first["files"].append("mutated")
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert len(runs) == 1
+    assert second == {"files": ["a.sol"]}
+    assert first is not second
+    assert flights.stats() == {"in_flight": 0, "started": 1, "coalesced": 1}
+
+
+def test_different_keys_and_later_calls_run_separately():
+    flights = SingleFlight()
+    runs = []
+
+    async def work():
+        runs.append(1)
+        await asyncio.sleep(0)
+        return len(runs)
+
+    async def run():
+        await asyncio.gather(flights.do("a", work), flights.do("b", work))
+        # Nothing is cached once a flight lands.
+        return await flights.do("a", work)
+
+    assert asyncio.run(run()) == 3
+    assert flights.stats()["started"] == 3
+
+
+def test_exception_reaches_every_waiter():
+    flights = SingleFlight()
+
+    async def work():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    async def run():
+        return await asyncio.gather(flights.do("k", work), flights.do("k", work), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert [type(r) for r in results] == [ValueError, ValueError]
+    assert flights.stats()["in_flight"] == 0
+
+
+def test_cancelled_waiter_does_not_cancel_the_shared_work():
+    flights = SingleFlight()
+    finished = []
+
+    async def work():
+        await asyncio.sleep(0.05)
+        finished.append(1)
+        return "done"
+
+    async def run():
+        leaver = asyncio.create_task(flights.do("k", work))
+        stayer = asyncio.create_task(flights.do("k", work))
+        await asyncio.sleep(0.01)
+        leaver.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leaver
+        return await stayer
+
+    assert asyncio.run(run()) == "done"
+    assert finished == [1]
+
+
+def test_work_finishes_after_every_waiter_is_cancelled():
+    flights = SingleFlight()
+    finished = []
+
+    async def work():
+        await asyncio.sleep(0.02)
+        finished.append(1)
+        raise RuntimeError("nobody is listening")
+
+    async def run():
+        waiter = asyncio.create_task(flights.do("k", work))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        # The shielded task keeps running; its exception is retrieved, not logged as lost.
+        await asyncio.sleep(0.05)
+        return flights.stats()
+
+    stats = asyncio.run(run())
+    assert finished == [1]
+    assert stats["in_flight"] == 0
@@ -0,0 +1,48 @@
+import os
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("AGENT_CACHE_ENABLED", "0")
+
+from main import SECURITY_AUDITOR_AGENT, AgentSpec, _slice_context  # noqa: E402
+
+SHARED = {
+    "idea": "ticketing",
+    "chain": {
+        "recommended_chain": "Base",
+        "token_and_governance": {"token": "TIX", "voting": None},
+        "web3_library": "ethers",
+    },
+    "code": {"contracts": [{"path": "contracts/T.sol"}]},
+}
+
+
+def test_dotted_paths_keep_their_nesting():
+    sliced = _slice_context(SHARED, ("idea", "chain.token_and_governance.token", "chain.web3_library"))
+    assert sliced == {"idea": "ticketing", "chain": {"token_and_governance": {"token": "TIX"}, "web3_library": "ethers"}}
+
+
+def test_missing_paths_are_skipped():
+    sliced = _slice_context(SHARED, ("planner", "chain.missing", "chain.web3_library.deeper", "idea.length"))
+    assert sliced == {}
+
+
+def test_falsy_values_are_kept():
+    assert _slice_context(SHARED, ("chain.token_and_governance.voting",)) == {
+        "chain": {"token_and_governance": {"voting": None}}
+    }
+
+
+def test_whole_keys_are_shared_not_copied():
+    sliced = _slice_context(SHARED, ("code",))
+    assert sliced["code"] is SHARED["code"]
+
+
+def test_context_for_defaults_to_every_read_key():
+    spec = AgentSpec(key="x", name="X", description="", trace_description="", instructions="", reads=("idea", "code"))
+    assert spec.context_for(SHARED) == {"idea": "ticketing", "code": SHARED["code"]}
+
+
+def test_auditor_is_not_shown_frontend_sources():
+    shared = {**SHARED, "code": {"contracts": [], "backend": [], "frontend": [{"path": "app/page.tsx"}]}}
+    context = SECURITY_AUDITOR_AGENT.context_for(shared)
+    assert context["code"] == {"contracts": [], "backend": []}
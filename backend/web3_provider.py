@@ -0,0 +1,195 @@
+import logging
+import os
+import time
+from threading import Lock
+from typing import Any, Dict, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from web3 import Web3
+try:
+    from web3.middleware import geth_poa_middleware as POA_MIDDLEWARE
+except ImportError:  # web3.py v7+
+    from web3.middleware.proof_of_authority import ExtraDataToPOAMiddleware as POA_MIDDLEWARE
+
+logger = logging.getLogger(__name__)
+
+
+class RPCError(RuntimeError):
+    """Raised when a JSON-RPC call returns an error object or an unusable response."""
+
+
+class ChainClient:
+    """
+    Long-lived Web3 client for one RPC endpoint.
+
+    Requests go through a shared keep-alive session. `chain_id` never changes
+    for an endpoint, so it is fetched once; the gas price is reused for
+    `gas_price_ttl` seconds. `deployment_params()` sends whatever a contract
+    creation needs (chain id, gas price, nonce, gas estimate) as one batched
+    JSON-RPC request; `batch()` sends arbitrary calls the same way.
+    """
+
+    def __init__(self, rpc_url: str, session: requests.Session, gas_price_ttl: float, timeout: float) -> None:
+        self.rpc_url = rpc_url
+        self.gas_price_ttl = gas_price_ttl
+        self.provider = Web3.HTTPProvider(rpc_url, request_kwargs={"timeout": timeout}, session=session)
+        self.web3 = Web3(self.provider)
+        # Base Sepolia and many L2 testnets need the POA middleware
+        self.web3.middleware_onion.inject(POA_MIDDLEWARE, layer=0)
+        self._lock = Lock()
+        self._chain_id: Optional[int] = None
+        self._gas_price: Optional[Tuple[float, int]] = None
+        self._counters = {"batches": 0, "calls": 0, "gas_price_hits": 0}
+
+    @property
+    def chain_id(self) -> int:
+        with self._lock:
+            chain_id = self._chain_id
+        if chain_id is None:
+            (chain_id,) = self._batch([("eth_chainId", [])])
+            with self._lock:
+                self._chain_id = chain_id
+        return chain_id
+
+    def gas_price(self) -> int:
+        cached = self._cached_gas_price()
+        if cached is not None:
+            return cached
+        (gas_price,) = self._batch([("eth_gasPrice", [])])
+        self._remember_gas_price(gas_price)
+        return gas_price
+
+    def deployment_params(self, sender: str, data: str) -> Dict[str, int]:
+        """
+        Chain id, gas price, pending nonce and gas estimate for a contract
+        creation from `sender` with init code `data`, in a single round trip
+        (cached values are left out of the batch).
+        """
+        with self._lock:
+            chain_id = self._chain_id
+        gas_price = self._cached_gas_price()
+
+        calls: List[Tuple[str, List[Any]]] = [
+            ("eth_getTransactionCount", [sender, "pending"]),
+            ("eth_estimateGas", [{"from": sender, "data": data, "value": "0x0"}]),
+        ]
+        if chain_id is None:
+            calls.append(("eth_chainId", []))
+        if gas_price is None:
+            calls.append(("eth_gasPrice", []))
+
+        results = dict(zip((method for method, _ in calls), self._batch(calls)))
+        if chain_id is None:
+            chain_id = results["eth_chainId"]
+            with self._lock:
+                self._chain_id = chain_id
+        if gas_price is None:
+            gas_price = results["eth_gasPrice"]
+            self._remember_gas_price(gas_price)
+        return {
+            "chain_id": chain_id,
+            "gas_price": gas_price,
+            "nonce": results["eth_getTransactionCount"],
+            "gas_estimate": results["eth_estimateGas"],
+        }
+
+    def pending_nonce(self, address: str) -> int:
+        (nonce,) = self._batch([("eth_getTransactionCount", [address, "pending"])])
+        return nonce
+
+    def batch(self, calls: List[Tuple[str, List[Any]]]) -> List[Any]:
+        """Send `calls` as one JSON-RPC batch and return their raw results in order."""
+        make_batch_request = getattr(self.provider, "make_batch_request", None)
+        try:
+            if make_batch_request is not None and len(calls) > 1:
+                responses = make_batch_request(calls)
+            else:
+                # web3.py before v7 has no batch support on HTTPProvider.
+                responses = [self.provider.make_request(method, params) for method, params in calls]
+        except requests.RequestException as exc:
+            raise RPCError(f"Failed to reach RPC endpoint: {exc}") from exc
+        with self._lock:
+            self._counters["batches"] += 1
+            self._counters["calls"] += len(calls)
+
+        if not isinstance(responses, list):
+            # A batch-level failure comes back as a single error object.
+            raise RPCError(f"RPC batch failed: {_error_message(responses)}")
+        results = []
+        for (method, _), response in zip(calls, responses):
+            if response.get("error") is not None or "result" not in response:
+                raise RPCError(f"{method} failed: {_error_message(response)}")
+            results.append(response["result"])
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self._counters, "chain_id": self._chain_id}
+
+    # ---------- internals ----------
+
+    def _cached_gas_price(self) -> Optional[int]:
+        with self._lock:
+            if self._gas_price is not None and self._gas_price[0] > time.monotonic():
+                self._counters["gas_price_hits"] += 1
+                return self._gas_price[1]
+        return None
+
+    def _remember_gas_price(self, gas_price: int) -> None:
+        with self._lock:
+            self._gas_price = (time.monotonic() + self.gas_price_ttl, gas_price)
+
+    def _batch(self, calls: List[Tuple[str, List[Any]]]) -> List[int]:
+        return [int(r, 16) if isinstance(r, str) else int(r) for r in self.batch(calls)]
+
+
+def _error_message(response: Any) -> str:
+    error = response.get("error") if isinstance(response, dict) else None
+    if isinstance(error, dict):
+        return str(error.get("message") or error)
+    return str(error or response)
+
+
+class ProviderManager:
+    """
+    Process-wide `ChainClient` per RPC URL, all sharing one pooled HTTP session.
+    """
+
+    def __init__(self, pool_size: int = 20, gas_price_ttl: float = 5.0, timeout: float = 30.0) -> None:
+        self.gas_price_ttl = gas_price_ttl
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._clients: Dict[str, ChainClient] = {}
+        self._lock = Lock()
+
+    def get(self, rpc_url: str) -> ChainClient:
+        with self._lock:
+            client = self._clients.get(rpc_url)
+            if client is None:
+                client = self._clients[rpc_url] = ChainClient(
+                    rpc_url, self.session, self.gas_price_ttl, self.timeout
+                )
+            return client
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            clients = list(self._clients.values())
+        totals = {"clients": len(clients), "batches": 0, "calls": 0, "gas_price_hits": 0}
+        for client in clients:
+            for key, value in client.stats().items():
+                if key in totals:
+                    totals[key] += value
+        return totals
+
+
+provider_manager = ProviderManager(
+    pool_size=int(os.getenv("RPC_POOL_SIZE", "20")),
+    gas_price_ttl=float(os.getenv("RPC_GAS_PRICE_TTL_SECONDS", "5")),
+    timeout=float(os.getenv("RPC_TIMEOUT_SECONDS", "30")),
+)
+
+__all__ = ["ChainClient", "ProviderManager", "RPCError", "provider_manager"]